@@ -0,0 +1,80 @@
+import subprocess
+import threading
+import numpy as np
+
+# Constants
+SAMPLE_RATE = 16000
+READ_CHUNK_BYTES = 1 << 20
+
+# Function to run ffmpeg with optional input bytes on stdin and collect stdout in memory.
+# stdin and stderr are served by helper threads so large inputs cannot deadlock the pipes.
+def run_ffmpeg(cmd, input_bytes=None):
+    proc = subprocess.Popen(
+        cmd,
+        stdin=subprocess.PIPE if input_bytes is not None else subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+
+    errors = []
+
+    def feed_input():
+        try:
+            proc.stdin.write(input_bytes)
+        except BrokenPipeError:
+            pass
+        finally:
+            proc.stdin.close()
+
+    def drain_errors():
+        errors.append(proc.stderr.read())
+
+    threads = [threading.Thread(target=drain_errors, daemon=True)]
+    if input_bytes is not None:
+        threads.append(threading.Thread(target=feed_input, daemon=True))
+    for thread in threads:
+        thread.start()
+
+    buffer = bytearray()
+    while True:
+        chunk = proc.stdout.read(READ_CHUNK_BYTES)
+        if not chunk:
+            break
+        buffer += chunk
+
+    return_code = proc.wait()
+    for thread in threads:
+        thread.join()
+    if return_code != 0:
+        message = b''.join(errors).decode('utf-8', errors='replace').strip()
+        raise RuntimeError(f"ffmpeg failed: {message}")
+    return buffer
+
+# Function to decode an audio file or the bytes of an upload into a 16 kHz mono float32
+# array. The audio is piped through ffmpeg and read straight into memory, so nothing is
+# written to disk and concurrent jobs cannot collide on file names. The returned array
+# is writable and is shared by Whisper and the speaker embedding stage without copies.
+def decode_audio(source, sample_rate=SAMPLE_RATE):
+    from_bytes = isinstance(source, (bytes, bytearray, memoryview))
+    cmd = [
+        'ffmpeg', '-nostdin', '-threads', '0',
+        '-i', 'pipe:0' if from_bytes else source,
+        '-f', 'f32le', '-acodec', 'pcm_f32le', '-ac', '1', '-ar', str(sample_rate),
+        '-loglevel', 'error',
+        'pipe:1',
+    ]
+    buffer = run_ffmpeg(cmd, source if from_bytes else None)
+    usable = len(buffer) - len(buffer) % 4
+    return np.frombuffer(buffer, dtype=np.float32, count=usable // 4)
+
+# Function to encode a mono float32 waveform (e.g. after silence trimming) into a
+# compressed audio file in memory, ready to be uploaded to Deepgram
+def encode_audio(waveform, sample_rate=SAMPLE_RATE, audio_format='flac'):
+    cmd = [
+        'ffmpeg', '-nostdin',
+        '-f', 'f32le', '-ac', '1', '-ar', str(sample_rate), '-i', 'pipe:0',
+        '-f', audio_format,
+        '-loglevel', 'error',
+        'pipe:1',
+    ]
+    return bytes(run_ffmpeg(cmd, np.ascontiguousarray(waveform, dtype=np.float32).tobytes()))
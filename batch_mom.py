@@ -0,0 +1,263 @@
+import os
+import io
+import sys
+import json
+import time
+import logging
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from mom_pipeline import run_translation_and_mom
+from transcript_builder import create_transcript
+from chunked_mom import MOM_CHUNK_TOKENS, MOM_MAX_CONCURRENCY
+from multilingual_mom import token_report, MOM_FANOUT_MODE, FANOUT_MODES
+from structured_mom import render_minutes
+from meeting_archive import get_meeting_archive
+from mom_core import transcribe_audio, translate_text, create_structured_minutes, create_multilingual_minutes, name_speakers, needs_translation
+
+# Headless batch processing of many recordings without the UI:
+#
+#   python batch_mom.py recordings/ --asr-workers 8 --llm-workers 4
+#   python batch_mom.py manifest.txt --language Japanese
+#   python batch_mom.py recordings/ --languages English,Japanese,German
+#
+# The results are written next to each input (<name>.transcript.txt,
+# <name>.translated.txt, <name>.mom.txt) and <name>.mom.json is written last, so a run
+# that is interrupted can simply be started again: finished recordings are skipped. The
+# summary records the settings of the run, and a recording only counts as finished for a
+# run with the same settings (language, --languages, --fanout-mode, --vad, --chunk-tokens).
+# The structured minutes are also kept in <name>.mom.json and in the meeting archive.
+# With --languages the minutes of every language are written to <name>.mom.<language>.txt
+# and the transcript is not translated; the minutes that were generated (not translated)
+# are archived with the original transcript.
+
+# Constants
+BATCH_ASR_WORKERS = int(os.getenv("BATCH_ASR_WORKERS", "4"))
+BATCH_LLM_WORKERS = int(os.getenv("BATCH_LLM_WORKERS", "2"))
+AUDIO_EXTENSIONS = ('.mp3', '.wav', '.m4a', '.flac', '.ogg', '.webm', '.mp4')
+
+logger = logging.getLogger(__name__)
+
+# Function to list the recordings of a directory (recursively) or of a manifest file
+# with one path per line (relative paths are relative to the manifest; # starts a comment)
+def find_inputs(source):
+    if os.path.isdir(source):
+        paths = []
+        for root, dirs, files in os.walk(source):
+            dirs.sort()
+            for name in sorted(files):
+                if name.lower().endswith(AUDIO_EXTENSIONS):
+                    paths.append(os.path.join(root, name))
+        return paths
+    base_dir = os.path.dirname(os.path.abspath(source))
+    with open(source, 'r', encoding='utf-8') as f:
+        lines = [line.split('#', 1)[0].strip() for line in f]
+    return [os.path.join(base_dir, line) for line in lines if line]
+
+# Function to name the output files of a recording
+def output_paths(path):
+    stem = os.path.splitext(path)[0]
+    return {
+        "transcript": f"{stem}.transcript.txt",
+        "translated_transcript": f"{stem}.translated.txt",
+        "mom": f"{stem}.mom.txt",
+        "summary": f"{stem}.mom.json",
+    }
+
+def _write_text(path, text):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+# Function to check whether a recording was completed by an earlier run with the same settings
+def is_done(path, settings):
+    try:
+        with open(output_paths(path)["summary"], 'r', encoding='utf-8') as f:
+            summary = json.load(f)
+    except (OSError, ValueError):
+        return False
+    return summary.get("settings") == settings
+
+# Runs the recordings through two stages with their own concurrency: transcription
+# (asr_workers at a time) and translation + minutes (llm_workers at a time). A recording
+# moves on to the LLM stage as soon as its transcript is ready.
+class BatchRunner:
+    def __init__(self, language='English', asr_workers=BATCH_ASR_WORKERS, llm_workers=BATCH_LLM_WORKERS,
+                 use_cache=True, vad=False, chunk_tokens=MOM_CHUNK_TOKENS, max_concurrency=MOM_MAX_CONCURRENCY,
+                 languages=None, fanout_mode=MOM_FANOUT_MODE):
+        self.language = language
+        self.languages = languages
+        self.fanout_mode = fanout_mode
+        self.asr_workers = asr_workers
+        self.llm_workers = llm_workers
+        self.use_cache = use_cache
+        self.vad = vad
+        self.chunk_tokens = chunk_tokens
+        self.max_concurrency = max_concurrency
+        self.results = []
+        self._lock = threading.Lock()
+
+    # Function to return the settings that change the outputs of a recording
+    def settings(self):
+        if self.languages:
+            settings = {"languages": self.languages, "fanout_mode": self.fanout_mode}
+        else:
+            settings = {"language": self.language}
+        return {**settings, "vad": self.vad, "chunk_tokens": self.chunk_tokens}
+
+    # Function to transcribe one recording (ASR stage)
+    def transcribe(self, path):
+        start_time = time.time()
+        with open(path, 'rb') as f:
+            response = transcribe_audio(io.BytesIO(f.read()), use_cache=self.use_cache, vad=self.vad)
+        transcript = name_speakers(create_transcript(response), use_cache=self.use_cache)
+        _write_text(output_paths(path)["transcript"], transcript)
+        duration = response.get("metadata", {}).get("duration") or 0.0
+        return transcript, duration, time.time() - start_time
+
+    # Function to translate the transcript and generate the minutes (LLM stage)
+    def summarize(self, path, transcript, duration, transcribe_time):
+        if self.languages:
+            return self.summarize_languages(path, transcript, duration, transcribe_time)
+        translated_transcript, minutes, timings = run_translation_and_mom(
+            transcript,
+            self.language,
+            translate_text,
+            lambda text, lang: create_structured_minutes(text, lang, self.chunk_tokens, self.max_concurrency),
+            translate=needs_translation(self.language),
+        )
+        timings["transcribe_audio"] = transcribe_time
+        outputs = output_paths(path)
+        if translated_transcript:
+            _write_text(outputs["translated_transcript"], translated_transcript)
+        _write_text(outputs["mom"], render_minutes(minutes))
+        meeting_id = get_meeting_archive().add_meeting(os.path.basename(path), self.language, translated_transcript, minutes)
+        # Written last: its presence marks the recording as done
+        summary = {"input": path, "language": self.language, "settings": self.settings(), "audio_seconds": duration,
+                   "timings": timings, "meeting_id": meeting_id, "minutes": minutes}
+        _write_text(outputs["summary"], json.dumps(summary, indent=2))
+        return summary
+
+    # Function to generate the minutes in several languages (LLM stage with --languages)
+    def summarize_languages(self, path, transcript, duration, transcribe_time):
+        minutes, source_minutes, timings, structured = create_multilingual_minutes(
+            transcript, self.languages, self.fanout_mode, self.chunk_tokens, self.max_concurrency,
+        )
+        timings["transcribe_audio"] = transcribe_time
+        stem = os.path.splitext(path)[0]
+        for language, mom in minutes.items():
+            _write_text(f"{stem}.mom.{language.lower()}.txt", mom)
+        meeting_ids = {language: get_meeting_archive().add_meeting(os.path.basename(path), language, transcript, data)
+                       for language, data in structured.items()}
+        tokens = token_report(transcript, minutes, source_minutes)
+        summary = {"input": path, "languages": self.languages, "mode": self.fanout_mode, "settings": self.settings(),
+                   "audio_seconds": duration, "timings": timings, "tokens": tokens,
+                   "meeting_ids": meeting_ids, "minutes": structured}
+        _write_text(output_paths(path)["summary"], json.dumps(summary, indent=2))
+        return summary
+
+    def _record(self, path, status, audio_seconds=0.0, error=None, tokens=None):
+        with self._lock:
+            self.results.append({"input": path, "status": status, "audio_seconds": audio_seconds, "error": error, "tokens": tokens})
+        if error:
+            logger.error("%s failed: %s", path, error)
+        else:
+            logger.info("%s %s", path, status)
+
+    # Function to process all the recordings; finished ones are skipped unless force=True
+    def run(self, paths, force=False):
+        start_time = time.time()
+        todo = []
+        settings = self.settings()
+        for path in paths:
+            if not force and is_done(path, settings):
+                self._record(path, 'skipped')
+            else:
+                todo.append(path)
+
+        with ThreadPoolExecutor(max_workers=max(1, self.llm_workers), thread_name_prefix="batch-llm") as llm_pool:
+            llm_futures = []
+
+            def on_transcribed(path, future):
+                try:
+                    transcript, duration, transcribe_time = future.result()
+                except Exception as e:
+                    self._record(path, 'failed', error=str(e))
+                    return
+                llm_futures.append((path, duration, llm_pool.submit(self.summarize, path, transcript, duration, transcribe_time)))
+
+            with ThreadPoolExecutor(max_workers=max(1, self.asr_workers), thread_name_prefix="batch-asr") as asr_pool:
+                for path in todo:
+                    future = asr_pool.submit(self.transcribe, path)
+                    future.add_done_callback(lambda future, path=path: on_transcribed(path, future))
+
+            for path, duration, future in llm_futures:
+                try:
+                    summary = future.result()
+                    self._record(path, 'done', duration, tokens=summary.get("tokens"))
+                except Exception as e:
+                    self._record(path, 'failed', error=str(e))
+
+        return self.throughput(time.time() - start_time)
+
+    # Function to summarize the run: counts and throughput of the recordings processed now
+    def throughput(self, wall_seconds):
+        done = [result for result in self.results if result["status"] == 'done']
+        audio_seconds = sum(result["audio_seconds"] for result in done)
+        reports = [result["tokens"] for result in done if result["tokens"]]
+        return {
+            "saved_tokens": sum(report["saved_tokens"] for report in reports),
+            "current_tokens": sum(report["current_tokens"] for report in reports),
+            "done": len(done),
+            "skipped": sum(result["status"] == 'skipped' for result in self.results),
+            "failed": sum(result["status"] == 'failed' for result in self.results),
+            "wall_seconds": wall_seconds,
+            "audio_minutes": audio_seconds / 60,
+            "files_per_hour": len(done) * 3600 / wall_seconds if wall_seconds > 0 else 0.0,
+            "audio_minutes_per_second": audio_seconds / 60 / wall_seconds if wall_seconds > 0 else 0.0,
+        }
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate transcripts and minutes for a batch of recordings")
+    parser.add_argument("source", help="directory of recordings, or a manifest file with one path per line")
+    parser.add_argument("--language", default="English", help="language of the minutes (default English)")
+    parser.add_argument("--languages", help="comma separated languages; generates the minutes of every language without translating the transcript")
+    parser.add_argument("--fanout-mode", choices=FANOUT_MODES, default=MOM_FANOUT_MODE,
+                        help="with --languages: translate the minutes once generated, or generate every language from the transcript")
+    parser.add_argument("--asr-workers", type=int, default=BATCH_ASR_WORKERS, help="recordings transcribed at the same time")
+    parser.add_argument("--llm-workers", type=int, default=BATCH_LLM_WORKERS, help="recordings summarized at the same time")
+    parser.add_argument("--chunk-tokens", type=int, default=MOM_CHUNK_TOKENS, help="tokens per transcript chunk for long meetings")
+    parser.add_argument("--max-concurrency", type=int, default=MOM_MAX_CONCURRENCY, help="chunks of one meeting summarized in parallel")
+    parser.add_argument("--vad", action="store_true", help="trim silence before transcription")
+    parser.add_argument("--no-cache", action="store_true", help="ignore cached transcriptions")
+    parser.add_argument("--force", action="store_true", help="process recordings that were already done with the same settings")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    paths = find_inputs(args.source)
+    runner = BatchRunner(
+        language=args.language,
+        asr_workers=args.asr_workers,
+        llm_workers=args.llm_workers,
+        use_cache=not args.no_cache,
+        vad=args.vad,
+        chunk_tokens=args.chunk_tokens,
+        max_concurrency=args.max_concurrency,
+        languages=[language.strip() for language in args.languages.split(',') if language.strip()] if args.languages else None,
+        fanout_mode=args.fanout_mode,
+    )
+    summary = runner.run(paths, force=args.force)
+
+    print(f"{summary['done']} done, {summary['skipped']} skipped, {summary['failed']} failed "
+          f"in {summary['wall_seconds']:.1f} seconds")
+    print(f"Throughput: {summary['files_per_hour']:.1f} files/hour, "
+          f"{summary['audio_minutes_per_second']:.2f} audio-minutes/second "
+          f"({summary['audio_minutes']:.1f} audio minutes)")
+    if summary['current_tokens']:
+        print(f"Tokens saved by the language fan-out: about {summary['saved_tokens']} of "
+              f"{summary['current_tokens']} ({100.0 * summary['saved_tokens'] / summary['current_tokens']:.0f}%)")
+    return 1 if summary['failed'] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,45 @@
+# Benchmark of speaker clustering on synthetic 192-dim segment embeddings.
+# Run from the repository root: python -m benchmarks.bench_clustering
+import argparse
+import time
+import numpy as np
+from sklearn.cluster import AgglomerativeClustering
+from sklearn.metrics import adjusted_rand_score
+
+from diarization_clustering import cluster_speakers
+
+# Function to create embeddings of num_speakers speakers taking turns, with noise
+def synthetic_embeddings(num_segments, num_speakers, dim=192, noise=0.9, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((num_speakers, dim))
+    turn_lengths = rng.integers(1, 12, size=num_segments)
+    labels = np.repeat(rng.integers(0, num_speakers, size=num_segments), turn_lengths)[:num_segments]
+    embeddings = centers[labels] + noise * rng.standard_normal((num_segments, dim))
+    return embeddings, labels
+
+# The original clustering: fixed two speakers, Ward linkage on the raw embeddings
+def cluster_legacy(embeddings, num_speakers=2):
+    return AgglomerativeClustering(num_speakers).fit(embeddings).labels_
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark diarization clustering")
+    parser.add_argument("--segments", type=int, nargs='+', default=[250, 1000, 4000, 16000])
+    parser.add_argument("--speakers", type=int, default=4)
+    parser.add_argument("--legacy-limit", type=int, default=8000, help="skip the O(n^2) legacy path above this size")
+    args = parser.parse_args()
+
+    print(f"{args.speakers} true speakers")
+    print(f"{'segments':>9} {'method':<10} {'seconds':>8} {'speakers':>8} {'ARI':>6}")
+    for num_segments in args.segments:
+        embeddings, truth = synthetic_embeddings(num_segments, args.speakers)
+        methods = {"auto": lambda: cluster_speakers(embeddings)}
+        if num_segments <= args.legacy_limit:
+            methods["legacy"] = lambda: cluster_legacy(embeddings)
+        for name, fn in methods.items():
+            start_time = time.perf_counter()
+            labels = fn()
+            elapsed = time.perf_counter() - start_time
+            print(f"{num_segments:>9} {name:<10} {elapsed:>8.2f} {len(set(labels)):>8} {adjusted_rand_score(truth, labels):>6.3f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+# End-to-end benchmark of the Deepgram and Whisper pipelines against local stand-in
+# servers, with per-stage latency percentiles, peak RSS and throughput. Results are saved
+# as JSON so runs can be compared between commits.
+# Run from the repository root: python -m benchmarks.bench_pipeline [--compare old.json]
+import os
+import sys
+import json
+import math
+import time
+import argparse
+import contextlib
+import resource
+import tempfile
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.fixtures import synthetic_deepgram_response
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLE_AUDIO = os.path.join(ROOT, "sample_conversation.mp3")
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+
+# Function to compute the p-th percentile (nearest rank) of a list of values
+def percentile(values, p):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    rank = max(0, min(len(ordered) - 1, math.ceil(p / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+def summarize_stages(runs):
+    stages = {}
+    for timings in runs:
+        for stage, seconds in timings.items():
+            stages.setdefault(stage, []).append(seconds)
+    return {
+        stage: {"p50": percentile(values, 50), "p95": percentile(values, 95), "max": max(values), "runs": len(values)}
+        for stage, values in stages.items()
+    }
+
+# Function to report the peak resident memory of this process so far, in MB
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+# Function to point the providers at a mock server and isolate the caches. Must run
+# before mom_core is imported, since the clients are created at import time.
+def start_mock_providers(latency, tmp_dir, tokens_per_minute=None):
+    from mock_provider_server import create_server
+    server = create_server(port=0, latency=latency)
+    threading.Thread(target=server.serve_forever, name="mock-providers", daemon=True).start()
+    url = f"http://localhost:{server.server_address[1]}"
+    os.environ.update({
+        "MOM_BACKEND": "remote",
+        "DEEPGRAM_API_URL": url,
+        "OPENAI_BASE_URL": f"{url}/v1",
+        "DG_API_KEY": os.environ.get("DG_API_KEY") or "benchmark",
+        "OPEN_AI_TOKEN": os.environ.get("OPEN_AI_TOKEN") or "benchmark",
+        "TRANSCRIPTION_CACHE_DIR": os.path.join(tmp_dir, "transcriptions"),
+        "COMPLETION_CACHE_PATH": os.path.join(tmp_dir, "completions.sqlite3"),
+        "DIARIZATION_CACHE_DIR": os.path.join(tmp_dir, "diarization"),
+    })
+    if tokens_per_minute:
+        os.environ["OPENAI_TOKENS_PER_MINUTE"] = str(tokens_per_minute)
+    return server
+
+# Function to run the Deepgram pipeline once with every cache bypassed; returns stage timings
+def run_deepgram_once(audio_bytes, language):
+    import io
+    from mom_core import transcribe_audio, translate_text, create_structured_minutes, name_speakers, needs_translation
+    from mom_pipeline import run_translation_and_mom
+    from transcript_builder import create_transcript
+
+    start_time = time.perf_counter()
+    response = transcribe_audio(io.BytesIO(audio_bytes), use_cache=False)
+    transcribe_time = time.perf_counter() - start_time
+    stage_start = time.perf_counter()
+    transcript = create_transcript(response)
+    transcript_time = time.perf_counter() - stage_start
+    stage_start = time.perf_counter()
+    transcript = name_speakers(transcript, use_cache=False)
+    names_time = time.perf_counter() - stage_start
+    _, _, timings = run_translation_and_mom(
+        transcript,
+        language,
+        lambda text, lang: translate_text(text, lang, use_cache=False),
+        lambda text, lang: create_structured_minutes(text, lang, use_cache=False),
+        translate=needs_translation(language),
+    )
+    timings.update({
+        "transcribe_audio": transcribe_time,
+        "create_transcript": transcript_time,
+        "name_speakers": names_time,
+        "total": time.perf_counter() - start_time,
+    })
+    return timings
+
+# Function to run the Whisper pipeline once (the model is loaded before timing starts)
+def run_whisper_once(audio_path, model_size):
+    from whisper_app import transcribe_and_embed, recluster, generate_mom, create_prompt, get_whisper_model, get_embedding_model
+    get_whisper_model(model_size)
+    get_embedding_model()
+
+    timings = {}
+    start_time = time.perf_counter()
+    segments, embeddings = transcribe_and_embed(audio_path, model_size, 32, False, {}, 1)
+    timings["transcribe_and_embed"] = time.perf_counter() - start_time
+    stage_start = time.perf_counter()
+    transcript = recluster(segments, embeddings)
+    timings["cluster_speakers"] = time.perf_counter() - stage_start
+    stage_start = time.perf_counter()
+    generate_mom(create_prompt(transcript))
+    timings["generate_mom"] = time.perf_counter() - stage_start
+    timings["total"] = time.perf_counter() - start_time
+    return timings
+
+# Function to run one fixture `iterations` times, `concurrency` at a time. The pipeline's
+# debug prints are discarded so they do not end up in the timings.
+def bench_case(name, run_once, audio_seconds, iterations, concurrency):
+    from provider_clients import provider_stats
+    start_time = time.perf_counter()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            runs = list(executor.map(lambda _: run_once(), range(iterations)))
+    wall_seconds = time.perf_counter() - start_time
+    return {
+        "name": name,
+        "iterations": iterations,
+        "concurrency": concurrency,
+        "audio_seconds": audio_seconds,
+        "wall_seconds": wall_seconds,
+        "files_per_hour": iterations * 3600 / wall_seconds,
+        "audio_minutes_per_second": iterations * audio_seconds / 60 / wall_seconds,
+        "peak_rss_mb": peak_rss_mb(),
+        "stages": summarize_stages(runs),
+        # Cumulative over the whole benchmark: waits for the rate limits and retries
+        "providers": provider_stats(),
+    }
+
+def print_case(case, baseline=None):
+    print(f"{case['name']}: {case['iterations']} runs x{case['concurrency']}, "
+          f"{case['files_per_hour']:.0f} files/hour, {case['audio_minutes_per_second']:.2f} audio-min/s, "
+          f"peak RSS {case['peak_rss_mb']:.0f} MB")
+    for provider, stats in case["providers"].items():
+        print(f"  {provider} rate limiter: p95 queue wait {stats['wait_p95']:.2f} s, {stats['retries']} retries")
+    old_stages = (baseline or {}).get("stages", {})
+    for stage, stats in case["stages"].items():
+        line = f"  {stage:<22} p50 {stats['p50'] * 1000:9.1f} ms  p95 {stats['p95'] * 1000:9.1f} ms"
+        if stage in old_stages and old_stages[stage]["p95"] > 0:
+            change = stats["p95"] / old_stages[stage]["p95"] - 1
+            line += f"  (p95 {change:+.0%} vs baseline)"
+        print(line)
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end pipeline benchmark with local stand-in servers")
+    parser.add_argument("--latency", type=float, default=0.2, help="simulated provider latency in seconds")
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, default=1, help="pipelines run at the same time")
+    parser.add_argument("--language", default="English")
+    parser.add_argument("--tokens-per-minute", type=float, default=None, help="OpenAI tokens-per-minute limit (default OPENAI_TOKENS_PER_MINUTE)")
+    parser.add_argument("--long-hours", type=float, default=3.0, help="length of the synthetic long meeting (0 to skip)")
+    parser.add_argument("--whisper-model", default=None, help="also benchmark the Whisper pipeline with this model, e.g. tiny")
+    parser.add_argument("--output", default=None, help="JSON results file (default benchmarks/results/<time>-<commit>.json)")
+    parser.add_argument("--compare", default=None, help="earlier JSON results to compare against")
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp(prefix="mom-bench-")
+    server = start_mock_providers(args.latency, tmp_dir, args.tokens_per_minute)
+    with open(SAMPLE_AUDIO, 'rb') as f:
+        sample_audio = f.read()
+    sample_seconds = server.deepgram_response["metadata"]["duration"]
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = {case["name"]: case for case in json.load(f)["cases"]}
+
+    cases = []
+    # The bundled recording; the mock answers with the transcript of transcript.txt
+    cases.append(bench_case("deepgram/sample", lambda: run_deepgram_once(sample_audio, args.language),
+                            sample_seconds, args.iterations, args.concurrency))
+    print_case(cases[-1], baseline.get(cases[-1]["name"]))
+
+    # A synthetic long meeting (about 165 words per minute), which exercises the chunked MoM
+    if args.long_hours > 0:
+        long_seconds = args.long_hours * 3600
+        server.deepgram_response = synthetic_deepgram_response(int(long_seconds * 165 / 60), long_seconds)
+        cases.append(bench_case(f"deepgram/long-{args.long_hours:g}h", lambda: run_deepgram_once(sample_audio, args.language),
+                                long_seconds, args.iterations, args.concurrency))
+        print_case(cases[-1], baseline.get(cases[-1]["name"]))
+
+    if args.whisper_model:
+        try:
+            cases.append(bench_case(f"whisper/{args.whisper_model}/sample",
+                                    lambda: run_whisper_once(SAMPLE_AUDIO, args.whisper_model),
+                                    sample_seconds, args.iterations, 1))
+            print_case(cases[-1], baseline.get(cases[-1]["name"]))
+        except ImportError as e:
+            print(f"Skipping the Whisper pipeline: {e}")
+
+    results = {
+        "commit": git_commit(),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "latency": args.latency,
+        "cases": cases,
+    }
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{results['commit'] or 'unknown'}.json")
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results saved to {output}")
+    server.shutdown()
+
+if __name__ == "__main__":
+    main()
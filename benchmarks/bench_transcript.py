@@ -0,0 +1,62 @@
+# Benchmark of transcript assembly on synthetic 3-hour Deepgram responses.
+# Run from the repository root: python -m benchmarks.bench_transcript
+import argparse
+import time
+
+from benchmarks.fixtures import synthetic_deepgram_response
+from transcript_builder import create_transcript, TAG
+
+# The original string-concatenation implementation, kept here as the baseline
+def create_transcript_legacy(response):
+    lines = []
+    words = response["results"]["channels"][0]["alternatives"][0]["words"]
+    curr_speaker = 0
+    curr_line = ''
+    for word_struct in words:
+        word_speaker = word_struct["speaker"]
+        word = word_struct["punctuated_word"]
+        if word_speaker == curr_speaker:
+            curr_line += ' ' + word
+        else:
+            tag = TAG + str(curr_speaker) + ':'
+            full_line = tag + curr_line + '\n'
+            curr_speaker = word_speaker
+            lines.append(full_line)
+            curr_line = ' ' + word
+    lines.append(TAG + str(curr_speaker) + ':' + curr_line)
+    return '\n'.join(lines)
+
+def best_of(fn, response, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        fn(response)
+        best = min(best, time.perf_counter() - start_time)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark create_transcript")
+    parser.add_argument("--words", type=int, default=30000)
+    parser.add_argument("--hours", type=float, default=3.0)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    cases = {
+        "meeting (4 speakers)": synthetic_deepgram_response(args.words, args.hours * 3600, num_speakers=4),
+        "monologue (1 speaker)": synthetic_deepgram_response(args.words, args.hours * 3600, num_speakers=1),
+    }
+    implementations = {
+        "legacy": create_transcript_legacy,
+        "words": lambda response: create_transcript(response, source='words'),
+        "utterances": lambda response: create_transcript(response, source='utterances'),
+    }
+
+    print(f"{args.words} words, {args.hours:g} h, best of {args.repeat}")
+    for case_name, response in cases.items():
+        print(case_name)
+        for name, fn in implementations.items():
+            elapsed = best_of(fn, response, args.repeat)
+            print(f"  {name:<12} {elapsed * 1000:8.2f} ms")
+
+if __name__ == "__main__":
+    main()
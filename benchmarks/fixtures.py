@@ -0,0 +1,70 @@
+import random
+
+VOCABULARY = [
+    "okay", "yeah", "so", "the", "deadline", "for", "report", "is", "next", "week",
+    "we", "need", "to", "finish", "data", "pipeline", "model", "review", "team", "meeting",
+    "client", "update", "status", "task", "Gokul", "Avinash", "Friday", "design", "sprint", "demo",
+]
+
+# Function to build a synthetic Deepgram prerecorded response (the to_dict() layout)
+# with `num_words` words spread over `duration` seconds and `num_speakers` speakers.
+def synthetic_deepgram_response(num_words=30000, duration=3 * 60 * 60, num_speakers=4,
+                                mean_turn_words=40, seed=0):
+    rng = random.Random(seed)
+    step = duration / num_words
+    words = []
+    speaker = 0
+    remaining_in_turn = rng.randint(1, 2 * mean_turn_words)
+    for i in range(num_words):
+        if remaining_in_turn == 0:
+            speaker = (speaker + rng.randint(1, num_speakers - 1)) % num_speakers if num_speakers > 1 else 0
+            remaining_in_turn = rng.randint(1, 2 * mean_turn_words)
+        remaining_in_turn -= 1
+        word = rng.choice(VOCABULARY)
+        start = i * step
+        words.append({
+            "word": word.lower(),
+            "start": round(start, 3),
+            "end": round(start + step * 0.8, 3),
+            "confidence": round(rng.uniform(0.6, 1.0), 4),
+            "speaker": speaker,
+            "speaker_confidence": round(rng.uniform(0.3, 1.0), 4),
+            "punctuated_word": word.capitalize() + '.' if remaining_in_turn == 0 else word,
+        })
+
+    # Utterances split on speaker changes and on every ~15 words of one speaker
+    utterances = []
+    current = []
+    for word_struct in words:
+        if current and (current[-1]["speaker"] != word_struct["speaker"] or len(current) >= 15):
+            utterances.append(_utterance(current, len(utterances)))
+            current = []
+        current.append(word_struct)
+    if current:
+        utterances.append(_utterance(current, len(utterances)))
+
+    return {
+        "metadata": {"duration": duration, "channels": 1, "models": ["nova-2"]},
+        "results": {
+            "channels": [{
+                "alternatives": [{
+                    "transcript": ' '.join(w["punctuated_word"] for w in words),
+                    "confidence": 0.95,
+                    "words": words,
+                }],
+            }],
+            "utterances": utterances,
+        },
+    }
+
+def _utterance(words, index):
+    return {
+        "id": str(index),
+        "start": words[0]["start"],
+        "end": words[-1]["end"],
+        "confidence": sum(w["confidence"] for w in words) / len(words),
+        "channel": 0,
+        "speaker": words[0]["speaker"],
+        "transcript": ' '.join(w["punctuated_word"] for w in words),
+        "words": words,
+    }
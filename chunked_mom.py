@@ -0,0 +1,138 @@
+import os
+import re
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from telemetry import propagate
+
+# Constants
+MOM_CHUNK_TOKENS = int(os.getenv("MOM_CHUNK_TOKENS", "3000"))
+MOM_MAX_CONCURRENCY = int(os.getenv("MOM_MAX_CONCURRENCY", "4"))
+CHARS_PER_TOKEN = 4
+TURN_BOUNDARY = re.compile(r'\n\n+|\n+(?=SPEAKER )')
+
+try:
+    import tiktoken
+    _encoding = tiktoken.encoding_for_model("gpt-3.5-turbo")
+except Exception:
+    _encoding = None
+
+# Function to count (or, without tiktoken, estimate) the tokens in a piece of text
+def count_tokens(text):
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+# Function to split a diarized transcript into speaker turns. Works for the Deepgram
+# ("SPEAKER 0: ..." or, once named, "Gokul: ..." separated by blank lines) and the
+# Whisper ("SPEAKER 1 0:00:00\n...") layouts.
+def split_turns(transcript):
+    return [turn.strip() for turn in TURN_BOUNDARY.split(transcript) if turn.strip()]
+
+# Function to cut a single turn that is larger than the budget on word boundaries
+def _split_long_turn(turn, max_tokens):
+    pieces = []
+    words = []
+    size = 0
+    for word in turn.split(' '):
+        word_tokens = count_tokens(word + ' ')
+        if words and size + word_tokens > max_tokens:
+            pieces.append(' '.join(words))
+            words = []
+            size = 0
+        words.append(word)
+        size += word_tokens
+    if words:
+        pieces.append(' '.join(words))
+    return pieces
+
+# Function to pack speaker turns into chunks of at most max_tokens each.
+# Turns are never split unless a single turn is larger than the whole budget.
+def chunk_transcript(transcript, max_tokens=MOM_CHUNK_TOKENS):
+    chunks = []
+    current = []
+    current_tokens = 0
+    for turn in split_turns(transcript):
+        turn_tokens = count_tokens(turn)
+        pieces = [turn] if turn_tokens <= max_tokens else _split_long_turn(turn, max_tokens)
+        for piece in pieces:
+            piece_tokens = count_tokens(piece) if len(pieces) > 1 else turn_tokens
+            if current and current_tokens + piece_tokens > max_tokens:
+                chunks.append('\n\n'.join(current))
+                current = []
+                current_tokens = 0
+            current.append(piece)
+            current_tokens += piece_tokens
+    if current:
+        chunks.append('\n\n'.join(current))
+    return chunks
+
+# Function to create the prompt that summarizes one chunk of the meeting (map step)
+def create_chunk_prompt(chunk, index, total, language='english'):
+    current_date = datetime.now().strftime("%d-%m-%Y")
+    prompt = f"""
+    You are a MoM generator. Below is part {index} of {total} of the transcript of a single meeting. Write the minutes for this part only: the points discussed, the decisions taken, and a table containing the tasks assigned to each person, the status of each task, and the deadlines. Write dates as well in the output table. Today is {current_date}. Identify the speaker names from the meeting transcript. Do not invent anything that is not in this part.
+
+    Generate the output in {language} only.
+
+    {chunk}
+    """
+    return prompt
+
+# Function to create the prompt that merges partial minutes into the final MoM (reduce step)
+def create_reduce_prompt(partial_minutes, language='english'):
+    current_date = datetime.now().strftime("%d-%m-%Y")
+    parts = '\n\n'.join(f"--- Part {i + 1} ---\n{minutes}" for i, minutes in enumerate(partial_minutes))
+    prompt = f"""
+    You are a MoM generator. Below are the minutes of consecutive parts of the same meeting. Merge them into the minutes of the whole meeting and create one detailed table containing the list of tasks assigned to each person, the status of each task, and the deadlines. Remove duplicates, keep the most recent status of every task and write dates as well in the output table. Today is {current_date}.
+
+    Generate the Minutes of Meeting in {language} only.
+
+    {parts}
+    """
+    return prompt
+
+# Function to group partial minutes so each reduce call stays within the token budget
+def _group_for_reduce(partial_minutes, max_tokens):
+    groups = []
+    current = []
+    current_tokens = 0
+    for minutes in partial_minutes:
+        minutes_tokens = count_tokens(minutes)
+        # Always merge at least two partials per group so every round shrinks the list
+        if len(current) >= 2 and current_tokens + minutes_tokens > max_tokens:
+            groups.append(current)
+            current = []
+            current_tokens = 0
+        current.append(minutes)
+        current_tokens += minutes_tokens
+    if current:
+        groups.append(current)
+    return groups
+
+# Function to generate the MoM of a long meeting with map-reduce.
+# `complete_fn(prompt)` is the single-prompt completion call (e.g. generate_mom) and
+# `prompt_fn(transcript, language)` builds the usual prompt for short transcripts.
+# `final_fn(prompt)`, if given, is used for the call that produces the final minutes,
+# e.g. to stream that one call into the UI.
+# Chunks are summarized in parallel, at most `max_concurrency` at a time, so latency
+# grows with the slowest chunk instead of with the length of the meeting.
+def generate_mom_chunked(transcript, complete_fn, prompt_fn, language='english',
+                         chunk_tokens=MOM_CHUNK_TOKENS, max_concurrency=MOM_MAX_CONCURRENCY, final_fn=None):
+    final_fn = final_fn or complete_fn
+    chunks = chunk_transcript(transcript, chunk_tokens)
+    if len(chunks) <= 1:
+        return final_fn(prompt_fn(transcript, language))
+
+    total = len(chunks)
+    with ThreadPoolExecutor(max_workers=max(1, max_concurrency), thread_name_prefix="mom-chunk") as executor:
+        prompts = [create_chunk_prompt(chunk, i + 1, total, language) for i, chunk in enumerate(chunks)]
+        partial_minutes = list(executor.map(propagate(complete_fn), prompts))
+
+        # Reduce hierarchically until the partial minutes fit into one final call
+        groups = _group_for_reduce(partial_minutes, chunk_tokens)
+        while len(groups) > 1:
+            prompts = [create_reduce_prompt(group, language) for group in groups]
+            partial_minutes = list(executor.map(propagate(complete_fn), prompts))
+            groups = _group_for_reduce(partial_minutes, chunk_tokens)
+
+    return final_fn(create_reduce_prompt(groups[0], language))
@@ -0,0 +1,135 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import contextlib
+import threading
+from datetime import datetime
+
+# Constants
+COMPLETION_CACHE_PATH = os.getenv("COMPLETION_CACHE_PATH", "completions.sqlite3")
+COMPLETION_CACHE_TTL_SECONDS = float(os.getenv("COMPLETION_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+COMPLETION_CACHE_MAX_BYTES = int(os.getenv("COMPLETION_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS completions (
+    key TEXT PRIMARY KEY,
+    response TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS completions_accessed ON completions (accessed_at);
+"""
+
+# SQLite cache of LLM completions (translations and minutes), shared by every process
+# using the same database file. Keys are built from the inputs of the prompt rather than
+# the prompt text, because the prompts embed today's date: the date enters the key as a
+# bucket, so the same transcript gives a hit all day and a fresh answer the next day.
+# Entries expire after ttl_seconds and the least recently used ones are evicted once the
+# stored responses exceed max_bytes.
+class CompletionCache:
+    def __init__(self, db_path=COMPLETION_CACHE_PATH, ttl_seconds=COMPLETION_CACHE_TTL_SECONDS,
+                 max_bytes=COMPLETION_CACHE_MAX_BYTES):
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    @contextlib.contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            yield conn
+        finally:
+            conn.close()
+
+    # Function to build the cache key from the normalized prompt inputs. The text is
+    # hashed; dated=True adds today's date (the prompt contains it) as the date bucket.
+    def make_key(self, kind, text, language, model, max_tokens, dated=False, **extra):
+        inputs = {
+            "kind": kind,
+            "text": hashlib.sha256(text.encode('utf-8')).hexdigest(),
+            "language": language.lower(),
+            "model": model,
+            "max_tokens": max_tokens,
+            "date": datetime.now().strftime("%Y-%m-%d") if dated else None,
+            **extra,
+        }
+        return hashlib.sha256(json.dumps(inputs, sort_keys=True).encode('utf-8')).hexdigest()
+
+    # Function to look up a cached completion; returns None on a miss or if it expired
+    def get(self, key):
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT response FROM completions WHERE key = ? AND created_at > ?",
+                (key, now - self.ttl_seconds),
+            ).fetchone()
+            if row is not None:
+                conn.execute("UPDATE completions SET accessed_at = ? WHERE key = ?", (now, key))
+        with self._lock:
+            if row is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return row[0] if row is not None else None
+
+    # Function to store a completion and evict expired and old entries
+    def put(self, key, response):
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO completions (key, response, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, response, len(response.encode('utf-8')), now, now),
+            )
+        self.evict()
+
+    # Function to drop expired entries, then the least recently used ones until the
+    # responses fit in max_bytes
+    def evict(self):
+        with self._connect() as conn:
+            removed = conn.execute("DELETE FROM completions WHERE created_at <= ?", (time.time() - self.ttl_seconds,)).rowcount
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM completions").fetchone()[0]
+            if total <= self.max_bytes:
+                return removed
+            excess = total - self.max_bytes
+            keys = []
+            for key, size in conn.execute("SELECT key, size FROM completions ORDER BY accessed_at"):
+                if excess <= 0:
+                    break
+                keys.append((key,))
+                excess -= size
+            conn.executemany("DELETE FROM completions WHERE key = ?", keys)
+        return removed + len(keys)
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM completions")
+
+    def stats(self):
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        lookups = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / lookups if lookups else 0.0,
+        }
+
+# One cache per process, like the transcription cache
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+def get_completion_cache():
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = CompletionCache()
+        return _default_cache
@@ -0,0 +1,103 @@
+import os
+import json
+import shutil
+import hashlib
+import numpy as np
+
+# On-disk store of the expensive part of the Whisper path: the transcribed segments
+# (segments.json) and their speaker embeddings (embeddings.npy), keyed by a hash of
+# the audio and the settings that produced them. Re-clustering with a different number
+# of speakers only needs these two files. The folder is bounded like the transcription
+# cache: the entry mtime is the LRU timestamp and the oldest entries go first.
+
+# Constants
+DIARIZATION_CACHE_DIR = os.getenv("DIARIZATION_CACHE_DIR", ".diarization_cache")
+DIARIZATION_CACHE_MAX_BYTES = int(os.getenv("DIARIZATION_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+TMP_SUFFIX = '.tmp'
+SEGMENT_FIELDS = ('id', 'start', 'end', 'text', 'words')
+
+# Function to build the cache key from the audio (bytes or a file path) and the settings
+def diarization_key(audio, model_size, vad=False):
+    digest = hashlib.sha256()
+    if isinstance(audio, (bytes, bytearray, memoryview)):
+        digest.update(audio)
+    else:
+        with open(audio, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+    digest.update(json.dumps({"model": model_size, "vad": vad}, sort_keys=True).encode('utf-8'))
+    return digest.hexdigest()
+
+def _entry_dir(key, cache_dir):
+    return os.path.join(cache_dir, key)
+
+# Function to save the segments and embeddings of a recording
+def save_diarization(key, segments, embeddings, cache_dir=DIARIZATION_CACHE_DIR):
+    entry_dir = _entry_dir(key, cache_dir)
+    tmp_dir = f"{entry_dir}.{os.getpid()}{TMP_SUFFIX}"
+    os.makedirs(tmp_dir, exist_ok=True)
+    slim_segments = [{field: segment[field] for field in SEGMENT_FIELDS if field in segment} for segment in segments]
+    with open(os.path.join(tmp_dir, "segments.json"), 'w', encoding='utf-8') as f:
+        json.dump(slim_segments, f)
+    np.save(os.path.join(tmp_dir, "embeddings.npy"), np.asarray(embeddings, dtype=np.float32))
+
+    # Publish the entry in one step so readers never see a half-written one
+    if os.path.isdir(entry_dir):
+        shutil.rmtree(entry_dir, ignore_errors=True)
+    try:
+        os.replace(tmp_dir, entry_dir)
+    except OSError:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    evict_diarization(cache_dir)
+
+# Function to load the segments and embeddings of a recording; None if not cached
+def load_diarization(key, cache_dir=DIARIZATION_CACHE_DIR):
+    entry_dir = _entry_dir(key, cache_dir)
+    try:
+        with open(os.path.join(entry_dir, "segments.json"), 'r', encoding='utf-8') as f:
+            segments = json.load(f)
+        embeddings = np.load(os.path.join(entry_dir, "embeddings.npy"))
+    except (OSError, ValueError):
+        return None
+    if len(segments) != len(embeddings):
+        return None
+
+    # Touch the entry so it becomes the most recently used one
+    try:
+        os.utime(entry_dir, None)
+    except OSError:
+        pass
+    return segments, embeddings
+
+def _entry_size(entry_dir):
+    size = 0
+    with os.scandir(entry_dir) as it:
+        for entry in it:
+            size += entry.stat().st_size
+    return size
+
+# Function to drop least recently used entries until the cache fits in max_bytes
+def evict_diarization(cache_dir=DIARIZATION_CACHE_DIR, max_bytes=DIARIZATION_CACHE_MAX_BYTES):
+    entries = []
+    total = 0
+    with os.scandir(cache_dir) as it:
+        for entry in it:
+            if entry.name.endswith(TMP_SUFFIX) or not entry.is_dir():
+                continue
+            try:
+                mtime = entry.stat().st_mtime
+                size = _entry_size(entry.path)
+            except OSError:
+                continue
+            entries.append((mtime, size, entry.path))
+            total += size
+
+    entries.sort()
+    removed = 0
+    for mtime, size, path in entries:
+        if total <= max_bytes:
+            break
+        shutil.rmtree(path, ignore_errors=True)
+        total -= size
+        removed += 1
+    return removed
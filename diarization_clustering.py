@@ -0,0 +1,118 @@
+import os
+import numpy as np
+from sklearn.cluster import AgglomerativeClustering, MiniBatchKMeans
+
+# Speaker clustering for the Whisper path. The number of speakers is estimated from the
+# eigengap of a pruned cosine affinity matrix, or fixed by the caller. Up to
+# DENSE_CLUSTERING_LIMIT segments are clustered directly; longer recordings are first
+# reduced to MICRO_CLUSTERS micro-clusters with mini-batch k-means (linear in the
+# number of segments), which are then clustered and mapped back to their segments.
+
+# Constants
+MAX_SPEAKERS = int(os.getenv("MAX_SPEAKERS", "10"))
+DENSE_CLUSTERING_LIMIT = int(os.getenv("DENSE_CLUSTERING_LIMIT", "1500"))
+MICRO_CLUSTERS = 300
+AFFINITY_PRUNING = 0.1
+
+# Function to L2-normalize embeddings so dot products are cosine similarities.
+# Rows without an embedding (all zeros) stay zero.
+def normalize(embeddings):
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    return embeddings / np.where(norms > 0, norms, 1.0)
+
+# Function to estimate the number of speakers with the eigengap heuristic.
+# The affinity keeps only each row's strongest neighbours, which makes the gap
+# after the true number of speakers stand out in the Laplacian's spectrum.
+def estimate_num_speakers(embeddings, max_speakers=MAX_SPEAKERS, weights=None):
+    n = len(embeddings)
+    if n < 3:
+        return n
+    x = normalize(embeddings)
+    affinity = np.clip(x @ x.T, 0.0, 1.0)
+    if weights is not None:
+        affinity *= np.sqrt(np.outer(weights, weights))
+
+    keep = max(2, int(np.ceil(AFFINITY_PRUNING * n)))
+    if keep < n:
+        cutoff = np.partition(affinity, n - keep, axis=1)[:, n - keep][:, None]
+        affinity = np.where(affinity >= cutoff, affinity, 0.0)
+    affinity = (affinity + affinity.T) / 2
+
+    degree = affinity.sum(axis=1)
+    inv_sqrt = 1.0 / np.sqrt(np.where(degree > 0, degree, 1.0))
+    laplacian = np.eye(n) - inv_sqrt[:, None] * affinity * inv_sqrt[None, :]
+    eigenvalues = np.linalg.eigvalsh(laplacian)
+
+    max_speakers = min(max_speakers, n - 1)
+    gaps = np.diff(eigenvalues[:max_speakers + 1])
+    return int(np.argmax(gaps)) + 1
+
+# Function to cluster (at most DENSE_CLUSTERING_LIMIT) embeddings into num_speakers groups
+def _cluster_dense(embeddings, num_speakers, max_speakers, distance_threshold, weights=None):
+    n = len(embeddings)
+    if n == 0:
+        return np.zeros(0, dtype=int)
+    if n == 1:
+        return np.zeros(1, dtype=int)
+    x = normalize(embeddings)
+    if distance_threshold is not None and num_speakers is None:
+        clustering = AgglomerativeClustering(
+            n_clusters=None, distance_threshold=distance_threshold, metric='cosine', linkage='average')
+        return clustering.fit(x).labels_
+    if num_speakers is None:
+        num_speakers = estimate_num_speakers(x, max_speakers, weights)
+    num_speakers = max(1, min(num_speakers, n))
+    if num_speakers == 1:
+        return np.zeros(n, dtype=int)
+    return AgglomerativeClustering(n_clusters=num_speakers, metric='cosine', linkage='average').fit(x).labels_
+
+# Function to give every segment without a usable embedding the label of the nearest
+# segment (in time order) that has one
+def _fill_from_neighbours(valid_labels, valid):
+    valid_positions = np.flatnonzero(valid)
+    positions = np.arange(len(valid))
+    after = np.clip(np.searchsorted(valid_positions, positions), 0, len(valid_positions) - 1)
+    before = np.clip(after - 1, 0, len(valid_positions) - 1)
+    nearest = np.where(
+        np.abs(valid_positions[before] - positions) <= np.abs(valid_positions[after] - positions), before, after)
+    return valid_labels[nearest]
+
+# Function to assign a speaker label to every segment embedding.
+# num_speakers fixes the count; otherwise it is estimated (eigengap, or a cosine
+# distance_threshold if one is given). Labels are renumbered in order of appearance.
+# pyannote gives NaN embeddings for very short segments; those (and all-zero rows) are
+# left out of the clustering, since cosine distances are undefined for them, and take
+# the label of their nearest neighbour in time.
+def cluster_speakers(embeddings, num_speakers=None, max_speakers=MAX_SPEAKERS,
+                     distance_threshold=None, dense_limit=DENSE_CLUSTERING_LIMIT, seed=0):
+    embeddings = np.asarray(embeddings, dtype=np.float64)
+    if embeddings.ndim != 2:
+        embeddings = embeddings.reshape(len(embeddings), -1)
+    valid = np.isfinite(embeddings).all(axis=1) & (np.abs(embeddings).sum(axis=1) > 0)
+    if not valid.any():
+        return np.zeros(len(embeddings), dtype=int)
+    if not valid.all():
+        labels = cluster_speakers(embeddings[valid], num_speakers, max_speakers, distance_threshold, dense_limit, seed)
+        labels = _fill_from_neighbours(labels, valid)
+        order = {}
+        return np.array([order.setdefault(label, len(order)) for label in labels], dtype=int)
+    n = len(embeddings)
+    if n <= dense_limit:
+        labels = _cluster_dense(embeddings, num_speakers, max_speakers, distance_threshold)
+    else:
+        # Two-stage clustering: micro-clusters first, then cluster their centroids.
+        # Each centroid is weighted by its size when estimating the speaker count.
+        x = normalize(embeddings)
+        num_micro = min(MICRO_CLUSTERS, dense_limit)
+        micro = MiniBatchKMeans(n_clusters=num_micro, random_state=seed, batch_size=4096, n_init=1).fit(x)
+        sizes = np.bincount(micro.labels_, minlength=num_micro).astype(np.float64)
+        used = sizes > 0
+        centroids = micro.cluster_centers_[used]
+        remap = np.cumsum(used) - 1
+        centroid_labels = _cluster_dense(centroids, num_speakers, max_speakers, distance_threshold,
+                                         weights=sizes[used] / sizes[used].max())
+        labels = centroid_labels[remap[micro.labels_]]
+
+    # Renumber so the first speaker to talk is speaker 0
+    order = {}
+    return np.array([order.setdefault(label, len(order)) for label in labels], dtype=int)
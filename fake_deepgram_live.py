@@ -0,0 +1,89 @@
+import os
+import json
+import argparse
+from urllib.parse import urlparse, parse_qs
+from websockets.sync.server import serve
+from websockets.exceptions import ConnectionClosed
+from local_backends import LOCAL_TRANSCRIPT_PATH, deepgram_response_from_transcript
+
+# A local stand-in for Deepgram's live endpoint, for trying the live mode without an API
+# key. It replays a transcript (transcript.txt by default) as final results, releasing
+# each word once the client has sent enough linear16 audio to cover its end time.
+#
+#   python fake_deepgram_live.py --port 8765
+#   DEEPGRAM_LIVE_URL=ws://localhost:8765/v1/listen streamlit run live_app.py
+
+# Constants
+FAKE_LIVE_HOST = os.getenv("FAKE_LIVE_HOST", "localhost")
+FAKE_LIVE_PORT = int(os.getenv("FAKE_LIVE_PORT", "8765"))
+
+# Function to build one final Results message for a batch of words
+def results_message(words, start, end):
+    return json.dumps({
+        "type": "Results",
+        "channel_index": [0, 1],
+        "duration": round(end - start, 3),
+        "start": round(start, 3),
+        "is_final": True,
+        "speech_final": True,
+        "channel": {"alternatives": [{
+            "transcript": ' '.join(w["punctuated_word"] for w in words),
+            "confidence": 0.99,
+            "words": words,
+        }]},
+    })
+
+# Function to serve one live session: audio in, results out at the pace of the audio
+def handle_session(ws, words):
+    query = parse_qs(urlparse(ws.request.path).query)
+    sample_rate = int(query.get("sample_rate", ["16000"])[0])
+    channels = int(query.get("channels", ["1"])[0])
+    bytes_per_second = sample_rate * channels * 2
+
+    received = 0
+    sent = 0
+    last_end = 0.0
+    try:
+        for message in ws:
+            if isinstance(message, bytes):
+                received += len(message)
+                audio_seconds = received / bytes_per_second
+            elif json.loads(message).get("type") == "CloseStream":
+                audio_seconds = float('inf')
+            else:
+                continue
+            ready = sent
+            while ready < len(words) and words[ready]["end"] <= audio_seconds:
+                ready += 1
+            if ready > sent:
+                ws.send(results_message(words[sent:ready], last_end, words[ready - 1]["end"]))
+                last_end = words[ready - 1]["end"]
+                sent = ready
+            if audio_seconds == float('inf'):
+                break
+        ws.send(json.dumps({
+            "type": "Metadata",
+            "duration": round(received / bytes_per_second, 3),
+            "channels": channels,
+            "models": ["fake-live"],
+        }))
+    except ConnectionClosed:
+        pass
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Deepgram live transcription server")
+    parser.add_argument('--host', default=FAKE_LIVE_HOST)
+    parser.add_argument('--port', type=int, default=FAKE_LIVE_PORT)
+    parser.add_argument('--transcript', default=LOCAL_TRANSCRIPT_PATH)
+    args = parser.parse_args()
+
+    with open(args.transcript, 'r', encoding='utf-8') as f:
+        response = deepgram_response_from_transcript(f.read())
+    words = response["results"]["channels"][0]["alternatives"][0]["words"]
+
+    with serve(lambda ws: handle_session(ws, words), args.host, args.port, max_size=None) as server:
+        print(f"Fake Deepgram live server on ws://{args.host}:{args.port}/v1/listen ({len(words)} words)")
+        server.serve_forever()
+
+if __name__ == "__main__":
+    main()
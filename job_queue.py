@@ -0,0 +1,375 @@
+import os
+import json
+import time
+import uuid
+import socket
+import sqlite3
+import logging
+import argparse
+import importlib
+import contextlib
+import threading
+import traceback
+from chunked_mom import MOM_CHUNK_TOKENS, MOM_MAX_CONCURRENCY
+
+# Constants
+JOB_DB_PATH = os.getenv("JOB_DB_PATH", "jobs.sqlite3")
+JOB_DIR = os.getenv("JOB_DIR", ".jobs")
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_STALE_SECONDS = float(os.getenv("JOB_STALE_SECONDS", "120"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+HEARTBEAT_SECONDS = 15.0
+POLL_SECONDS = 0.5
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+FINISHED_STATES = (DONE, FAILED)
+
+# Job kinds and the functions that process them, as "module:function" so heavy
+# dependencies (torch, whisper) are only imported by the workers that need them.
+# A handler is called as handler(job, progress) and returns a JSON-serializable result.
+JOB_HANDLERS = {
+    'deepgram': 'job_queue:run_deepgram_job',
+    'whisper': 'job_queue:run_whisper_job',
+}
+
+# Per-kind limit on jobs running at the same time in one worker pool
+JOB_KIND_LIMITS = {
+    'whisper': int(os.getenv("JOB_WHISPER_WORKERS", "1")),
+}
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    status TEXT NOT NULL,
+    params TEXT NOT NULL,
+    input_path TEXT NOT NULL,
+    progress TEXT,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    heartbeat_at REAL,
+    worker_id TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created_at);
+"""
+
+# Columns added after the first release, for databases created before them
+MIGRATIONS = {
+    "worker_id": "ALTER TABLE jobs ADD COLUMN worker_id TEXT",
+    "attempts": "ALTER TABLE jobs ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0",
+}
+
+def _row_to_job(row):
+    if row is None:
+        return None
+    job = dict(row)
+    job["params"] = json.loads(job["params"])
+    job["result"] = json.loads(job["result"]) if job["result"] else None
+    return job
+
+# SQLite-backed job store. Every call opens its own short-lived connection, so one
+# store can be shared by the Streamlit script thread, the worker threads and other
+# processes pointing at the same database file.
+class JobStore:
+    def __init__(self, db_path=JOB_DB_PATH, job_dir=JOB_DIR):
+        self.db_path = db_path
+        self.job_dir = job_dir
+        os.makedirs(self.job_dir, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+            for column, statement in MIGRATIONS.items():
+                if column not in columns:
+                    conn.execute(statement)
+
+    @contextlib.contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            yield conn
+        finally:
+            conn.close()
+
+    # Function to store an upload and enqueue a job for it; returns the job ID
+    def submit(self, kind, input_bytes, filename, params=None):
+        job_id = uuid.uuid4().hex
+        job_path = os.path.join(self.job_dir, job_id)
+        os.makedirs(job_path, exist_ok=True)
+        input_path = os.path.join(job_path, "input" + os.path.splitext(filename)[1].lower())
+        with open(input_path, 'wb') as f:
+            f.write(input_bytes)
+
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, kind, status, params, input_path, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, kind, QUEUED, json.dumps(params or {}), input_path, time.time()),
+            )
+        return job_id
+
+    def get(self, job_id):
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return _row_to_job(row)
+
+    # Function to atomically move the oldest queued job of one of `kinds` to running.
+    # The job records the worker_id of its claimant; only that worker can finish it.
+    # Every claim counts as an attempt (see requeue_stale).
+    def claim_next(self, kinds, worker_id):
+        if not kinds:
+            return None
+        placeholders = ','.join('?' * len(kinds))
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    f"SELECT id FROM jobs WHERE status = ? AND kind IN ({placeholders}) ORDER BY created_at LIMIT 1",
+                    (QUEUED, *kinds),
+                ).fetchone()
+                job = None
+                if row is not None:
+                    now = time.time()
+                    conn.execute(
+                        "UPDATE jobs SET status = ?, started_at = ?, heartbeat_at = ?, worker_id = ?, attempts = attempts + 1 WHERE id = ?",
+                        (RUNNING, now, now, worker_id, row["id"]),
+                    )
+                    job = conn.execute("SELECT * FROM jobs WHERE id = ?", (row["id"],)).fetchone()
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return _row_to_job(job)
+
+    def set_progress(self, job_id, message):
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET progress = ?, heartbeat_at = ? WHERE id = ?",
+                (message, time.time(), job_id),
+            )
+
+    def heartbeat(self, job_ids):
+        if not job_ids:
+            return
+        now = time.time()
+        with self._connect() as conn:
+            conn.executemany("UPDATE jobs SET heartbeat_at = ? WHERE id = ?", [(now, job_id) for job_id in job_ids])
+
+    # Function to record the result of a job. Returns False if the job is no longer
+    # running for this worker (it was requeued as stale and possibly claimed again), in
+    # which case nothing is changed.
+    def complete(self, job_id, worker_id, result):
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, finished_at = ? WHERE id = ? AND status = ? AND worker_id = ?",
+                (DONE, json.dumps(result), time.time(), job_id, RUNNING, worker_id),
+            )
+            return cursor.rowcount == 1
+
+    # Function to record the error of a job; returns False like complete
+    def fail(self, job_id, worker_id, error):
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ? AND status = ? AND worker_id = ?",
+                (FAILED, error, time.time(), job_id, RUNNING, worker_id),
+            )
+            return cursor.rowcount == 1
+
+    # Function to put jobs whose worker stopped sending heartbeats back in the queue.
+    # A job that already had max_attempts claims (e.g. one that keeps killing its worker
+    # by running out of memory) is failed instead. Returns the number of jobs requeued.
+    def requeue_stale(self, stale_seconds=JOB_STALE_SECONDS, max_attempts=JOB_MAX_ATTEMPTS):
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    "UPDATE jobs SET status = ?, error = ?, finished_at = ?, worker_id = NULL "
+                    "WHERE status = ? AND heartbeat_at < ? AND attempts >= ?",
+                    (FAILED, f"The worker stopped responding in each of {max_attempts} attempts", now,
+                     RUNNING, now - stale_seconds, max_attempts),
+                )
+                cursor = conn.execute(
+                    "UPDATE jobs SET status = ?, started_at = NULL, worker_id = NULL WHERE status = ? AND heartbeat_at < ?",
+                    (QUEUED, RUNNING, now - stale_seconds),
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            return cursor.rowcount
+
+    def counts(self):
+        with self._connect() as conn:
+            rows = conn.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+        return {row["status"]: row["n"] for row in rows}
+
+def _resolve_handler(spec):
+    module_name, function_name = spec.split(':')
+    return getattr(importlib.import_module(module_name), function_name)
+
+# Pool of worker threads that take jobs from the store and run their handlers.
+# The API calls spend their time waiting on the network and Whisper/torch release
+# the GIL, so threads are enough to overlap many jobs in one process.
+class WorkerPool:
+    def __init__(self, store, num_workers=JOB_WORKERS, handlers=None, kind_limits=None):
+        self.store = store
+        self.num_workers = num_workers
+        self.handlers = dict(handlers or JOB_HANDLERS)
+        self.kind_limits = dict(JOB_KIND_LIMITS if kind_limits is None else kind_limits)
+        self._running = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads = []
+        # Every worker thread claims jobs under its own ID: <pool id>/<thread index>
+        self.pool_id = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+    def start(self):
+        if self._threads:
+            return self
+        self.store.requeue_stale()
+        for i in range(self.num_workers):
+            thread = threading.Thread(target=self._work, args=(f"{self.pool_id}/{i}",), name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        thread = threading.Thread(target=self._heartbeat, name="job-heartbeat", daemon=True)
+        thread.start()
+        self._threads.append(thread)
+        return self
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _available_kinds(self):
+        running_kinds = list(self._running.values())
+        return [
+            kind for kind in self.handlers
+            if running_kinds.count(kind) < self.kind_limits.get(kind, self.num_workers)
+        ]
+
+    def _claim(self, worker_id):
+        with self._lock:
+            job = self.store.claim_next(self._available_kinds(), worker_id)
+            if job is not None:
+                self._running[job["id"]] = job["kind"]
+            return job
+
+    def _work(self, worker_id):
+        while not self._stop.is_set():
+            job = self._claim(worker_id)
+            if job is None:
+                self._stop.wait(POLL_SECONDS)
+                continue
+            self.run_job(job)
+
+    # Function to run one claimed job and record its result or error
+    def run_job(self, job):
+        job_id = job["id"]
+        try:
+            handler = _resolve_handler(self.handlers[job["kind"]])
+            result = handler(job, lambda message: self.store.set_progress(job_id, message))
+            recorded = self.store.complete(job_id, job["worker_id"], result)
+        except Exception as e:
+            logger.error("Job %s failed: %s", job_id, traceback.format_exc())
+            recorded = self.store.fail(job_id, job["worker_id"], f"{type(e).__name__}: {e}")
+        finally:
+            with self._lock:
+                self._running.pop(job_id, None)
+        if not recorded:
+            logger.warning("Job %s was taken over by another worker; its outcome here was discarded", job_id)
+
+    def _heartbeat(self):
+        while not self._stop.wait(HEARTBEAT_SECONDS):
+            with self._lock:
+                job_ids = list(self._running)
+            try:
+                self.store.heartbeat(job_ids)
+                self.store.requeue_stale()
+            except sqlite3.Error:
+                logger.exception("Job heartbeat failed")
+
+# One store and one worker pool per process, shared by every Streamlit session.
+# With JOB_WORKERS=0 the app only enqueues jobs and separate worker processes
+# (python job_queue.py) do the processing.
+_store = None
+_pool = None
+_singleton_lock = threading.Lock()
+
+def get_job_store():
+    global _store
+    with _singleton_lock:
+        if _store is None:
+            _store = JobStore()
+        return _store
+
+def get_worker_pool():
+    global _pool
+    store = get_job_store()
+    with _singleton_lock:
+        if _pool is None:
+            _pool = WorkerPool(store, JOB_WORKERS)
+            if JOB_WORKERS > 0:
+                _pool.start()
+        return _pool
+
+def _read_input(job):
+    with open(job["input_path"], 'rb') as f:
+        return f.read()
+
+# Function to process a Deepgram job
+def run_deepgram_job(job, progress):
+    from mom_core import process_recording
+    params = job["params"]
+    return process_recording(
+        _read_input(job),
+        language=params.get("language", "English"),
+        use_cache=params.get("use_cache", True),
+        vad=params.get("vad", False),
+        chunk_tokens=params.get("chunk_tokens", MOM_CHUNK_TOKENS),
+        max_concurrency=params.get("max_concurrency", MOM_MAX_CONCURRENCY),
+        progress=progress,
+        title=params.get("title", "recording"),
+    )
+
+# Function to process a Whisper job
+def run_whisper_job(job, progress):
+    from whisper_app import process_recording
+    params = job["params"]
+    return process_recording(
+        job["input_path"],
+        num_speakers=params.get("num_speakers"),
+        vad=params.get("vad", False),
+        progress=progress,
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description="Run background MoM workers")
+    parser.add_argument("--workers", type=int, default=max(1, JOB_WORKERS), help="number of worker threads")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    from telemetry import start_metrics_server
+    start_metrics_server()
+    pool = WorkerPool(get_job_store(), args.workers).start()
+    logger.info("Started %d workers on %s", args.workers, pool.store.db_path)
+    try:
+        while True:
+            time.sleep(60)
+            logger.info("Jobs: %s", pool.store.counts())
+    except KeyboardInterrupt:
+        pool.stop()
+
+if __name__ == "__main__":
+    main()
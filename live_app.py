@@ -0,0 +1,130 @@
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import streamlit as st
+from live_transcription import LiveTranscript, iter_live_results, iter_file_chunks, iter_microphone_chunks
+from mom_pipeline import run_translation_and_mom
+from mom_core import translate_text, create_minutes, create_rolling_minutes, name_speakers, needs_translation
+from rolling_mom import render_minutes
+
+# Live mode: the audio is streamed to Deepgram while the meeting is running and the
+# diarized transcript grows turn by turn, so it is ready as soon as the meeting ends.
+
+# Constants
+SAMPLE_RECORDING = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sample_conversation.mp3")
+MAX_MIC_MINUTES = 180
+
+# Streamlit app
+st.set_page_config(page_title="Live Minutes of Meeting", page_icon="👄")
+st.title("Live Minutes of Meeting")
+
+source = st.radio("Audio source", ["Sample recording", "Upload", "Microphone"], horizontal=True)
+uploaded_file = st.file_uploader("Upload Audio", type=["mp3", "wav"]) if source == "Upload" else None
+mic_minutes = st.number_input("Stop the microphone after (minutes)", min_value=1, max_value=MAX_MIC_MINUTES, value=60) if source == "Microphone" else None
+realtime = st.checkbox("Replay files at real-time speed", value=True) if source != "Microphone" else True
+language = st.selectbox("Select the language for MoM:", ["English", "Japanese"])
+# Keep the minutes up to date during the meeting; each update only sends the new turns
+rolling = st.checkbox("Update the minutes during the meeting", value=True)
+
+start_button = st.button("Start live transcription")
+# Pressing this button interrupts a running stream; the transcript so far is kept
+finish_button = st.button("Stop and generate Minutes of Meeting")
+
+# The microphone stream runs until its stop event is set: by the Stop button, by the time
+# limit, or when the script run that reads it ends
+if (start_button or finish_button) and "live_stop" in st.session_state:
+    st.session_state.pop("live_stop").set()
+
+transcript_box = st.empty()
+live_status = st.empty()
+minutes_box = st.empty()
+
+if start_button:
+    stop = None
+    if source == "Sample recording":
+        chunks = iter_file_chunks(SAMPLE_RECORDING, realtime=realtime)
+    elif source == "Upload" and uploaded_file is not None:
+        chunks = iter_file_chunks(uploaded_file.getvalue(), realtime=realtime)
+    elif source == "Microphone":
+        stop = st.session_state["live_stop"] = threading.Event()
+        timer = threading.Timer(mic_minutes * 60, stop.set)
+        timer.daemon = True
+        timer.start()
+        chunks = iter_microphone_chunks(stop)
+    else:
+        chunks = None
+        st.warning("Upload a .mp3 / .wav file first.")
+
+    if chunks is not None:
+        # The transcript lives in the session so it survives the rerun caused by the stop button
+        live = LiveTranscript()
+        st.session_state["live_transcript"] = live
+        st.session_state["live_minutes"] = create_rolling_minutes(language) if rolling else None
+        st.session_state.pop("live_mom", None)
+        minutes = st.session_state["live_minutes"]
+        # Minutes updates run on one helper thread so the stream is never held up by the model;
+        # a new update starts only when the previous one has finished and a turn was completed
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rolling-mom")
+        pending = None
+        try:
+            for message in iter_live_results(chunks):
+                if live.add_result(message):
+                    transcript_box.info(live.text())
+                    live_status.caption(f"Transcribed up to {live.duration():.1f} seconds")
+                if minutes is None or (pending is not None and not pending.done()):
+                    continue
+                if pending is not None:
+                    try:
+                        pending.result()
+                        minutes_box.info(render_minutes(minutes.state))
+                    except ValueError as e:
+                        # The turns stay pending and are retried with the next update
+                        live_status.caption(f"Minutes update skipped: {e}")
+                    pending = None
+                if len(live.lines) > minutes.consumed_turns:
+                    pending = executor.submit(minutes.update, live.text())
+            st.session_state["live_ended_at"] = time.time()
+            live_status.caption(f"Stream finished after {live.duration():.1f} seconds of audio")
+        except Exception as e:
+            st.error(f"Error: {e}")
+        finally:
+            executor.shutdown(wait=False)
+            if stop is not None:
+                stop.set()
+                timer.cancel()
+                if st.session_state.get("live_stop") is stop:
+                    del st.session_state["live_stop"]
+
+live = st.session_state.get("live_transcript")
+if live is not None and not start_button:
+    transcript_box.info(live.text() or "No speech transcribed yet.")
+
+if (start_button or finish_button) and live is not None and live.text():
+    ended_at = st.session_state.pop("live_ended_at", time.time())
+    st.caption(f"Transcript ready {time.time() - ended_at:.2f} seconds after the end of the meeting")
+    minutes = st.session_state.get("live_minutes")
+    with st.spinner("Generating MoM..."):
+        try:
+            # With rolling minutes only the turns that are not in the state yet are sent
+            translated_transcript, mom, timings = run_translation_and_mom(
+                name_speakers(live.text()),
+                language,
+                translate_text,
+                (lambda text, lang: minutes.finish(text)) if minutes is not None else create_minutes,
+                translate=needs_translation(language),
+            )
+            st.session_state["live_mom"] = (language, translated_transcript, mom)
+            st.caption(f"Time taken to generate MoM: {timings['generate_mom']:.2f} seconds")
+            if minutes is not None:
+                st.caption(f"Minutes updated {minutes.updates} times, {minutes.prompt_tokens} prompt tokens in total")
+        except Exception as e:
+            st.error(f"Error: {e}")
+
+if "live_mom" in st.session_state:
+    mom_language, translated_transcript, mom = st.session_state["live_mom"]
+    st.subheader(f"Diarized Transcript in {mom_language.capitalize()}")
+    st.info(translated_transcript)
+    st.subheader("Minutes of Meeting")
+    st.info(mom)
+    st.download_button("Download Minutes of Meeting", mom, "minutes_of_meeting.txt", "text/plain")
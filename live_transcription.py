@@ -0,0 +1,147 @@
+import os
+import json
+import time
+import threading
+import subprocess
+from urllib.parse import urlencode
+import numpy as np
+from dotenv import load_dotenv
+from websockets.sync.client import connect
+from websockets.exceptions import ConnectionClosed
+from audio_decode import decode_audio, SAMPLE_RATE
+from transcript_builder import SpeakerTurn, format_turn
+
+# Live transcription over Deepgram's streaming websocket. Audio is sent as 16 kHz mono
+# linear16 while it is being recorded (or replayed), and final results are folded into
+# a rolling diarized transcript, so the transcript is complete when the meeting ends.
+
+# Load environment variables
+load_dotenv()
+
+# Constants
+API_KEY = os.getenv("DG_API_KEY")
+DEEPGRAM_LIVE_URL = os.getenv("DEEPGRAM_LIVE_URL", "wss://api.deepgram.com/v1/listen")
+# ffmpeg input arguments of the microphone, e.g. "-f pulse -i default" (Linux),
+# "-f avfoundation -i :0" (macOS) or "-f dshow -i audio=Microphone" (Windows)
+LIVE_MIC_INPUT = os.getenv("LIVE_MIC_INPUT", "-f pulse -i default")
+CHUNK_SECONDS = 0.1
+BYTES_PER_SECOND = SAMPLE_RATE * 2
+LIVE_OPTIONS = {
+    "model": "nova-2",
+    "encoding": "linear16",
+    "sample_rate": SAMPLE_RATE,
+    "channels": 1,
+    "diarize": "true",
+    "punctuate": "true",
+    "smart_format": "true",
+    "interim_results": "false",
+}
+
+# Rolling diarized transcript built from final streaming results. Finished turns are
+# rendered once and kept; only the turn that is still growing is rendered again.
+class LiveTranscript:
+    def __init__(self):
+        self.lines = []
+        self.turns = []
+        self._speaker = None
+        self._words = []
+        self._start = 0.0
+        self._end = 0.0
+
+    # Function to fold one websocket message into the transcript; returns True if it changed
+    def add_result(self, message):
+        if message.get("type") != "Results" or not message.get("is_final"):
+            return False
+        alternatives = message.get("channel", {}).get("alternatives") or [{}]
+        words = alternatives[0].get("words", [])
+        for word_struct in words:
+            speaker = word_struct.get("speaker", 0)
+            if speaker != self._speaker and self._words:
+                self._close_turn()
+            if not self._words:
+                self._speaker = speaker
+                self._start = word_struct["start"]
+            self._words.append(word_struct.get("punctuated_word") or word_struct["word"])
+            self._end = word_struct["end"]
+        return bool(words)
+
+    def _close_turn(self):
+        turn = SpeakerTurn(self._speaker, self._start, self._end, ' '.join(self._words))
+        self.turns.append(turn)
+        self.lines.append(format_turn(turn))
+        self._words = []
+
+    # Function to render the transcript in the same layout as create_transcript
+    def text(self):
+        if not self._words:
+            return '\n\n'.join(self.lines)
+        current = format_turn(SpeakerTurn(self._speaker, self._start, self._end, ' '.join(self._words)))
+        return '\n\n'.join(self.lines + [current])
+
+    def duration(self):
+        return self._end if self._words else (self.turns[-1].end if self.turns else 0.0)
+
+# Function to convert float32 samples to linear16 bytes
+def to_linear16(waveform):
+    return (np.clip(waveform, -1.0, 1.0) * 32767).astype('<i2').tobytes()
+
+# Function to yield CHUNK_SECONDS of linear16 audio at a time from a recording (path or
+# bytes). With realtime=True the chunks are paced like a live microphone.
+def iter_file_chunks(source, realtime=True):
+    pcm = to_linear16(decode_audio(source))
+    chunk_bytes = int(BYTES_PER_SECOND * CHUNK_SECONDS)
+    start_time = time.monotonic()
+    for offset in range(0, len(pcm), chunk_bytes):
+        if realtime:
+            delay = start_time + offset / BYTES_PER_SECOND - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        yield pcm[offset:offset + chunk_bytes]
+
+# Function to yield linear16 audio from the microphone (through ffmpeg) until stop is set
+def iter_microphone_chunks(stop, mic_input=LIVE_MIC_INPUT):
+    cmd = ['ffmpeg', '-nostdin', '-loglevel', 'error', *mic_input.split(),
+           '-f', 's16le', '-ac', '1', '-ar', str(SAMPLE_RATE), 'pipe:1']
+    proc = subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE)
+    chunk_bytes = int(BYTES_PER_SECOND * CHUNK_SECONDS)
+    try:
+        while not stop.is_set():
+            chunk = proc.stdout.read(chunk_bytes)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        proc.terminate()
+        proc.wait()
+
+# Function to stream audio chunks to the live endpoint and yield every JSON message that
+# comes back. Audio is sent from a helper thread so results are yielded while it is still
+# being sent; when the audio ends the stream is closed and the remaining results drained.
+def iter_live_results(chunks, url=DEEPGRAM_LIVE_URL, api_key=API_KEY, options=None):
+    query = urlencode({**LIVE_OPTIONS, **(options or {})})
+    headers = {"Authorization": f"Token {api_key}"} if api_key else {}
+    with connect(f"{url}?{query}", additional_headers=headers, max_size=None) as ws:
+        errors = []
+
+        def send_audio():
+            try:
+                for chunk in chunks:
+                    ws.send(chunk)
+                ws.send(json.dumps({"type": "CloseStream"}))
+            except ConnectionClosed:
+                pass
+            except Exception as e:
+                errors.append(e)
+                ws.close()
+
+        sender = threading.Thread(target=send_audio, name="live-audio-sender", daemon=True)
+        sender.start()
+        try:
+            for message in ws:
+                if isinstance(message, str):
+                    yield json.loads(message)
+        except ConnectionClosed:
+            pass
+        sender.join()
+        if errors:
+            raise errors[0]
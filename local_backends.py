@@ -0,0 +1,187 @@
+import os
+import re
+import json
+import time
+import hashlib
+from types import SimpleNamespace
+
+# Local stand-ins for the Deepgram and OpenAI clients. They implement only the calls
+# this app makes, need no network or API keys, and answer after a configurable delay.
+# Enable them with MOM_BACKEND=local.
+
+# Constants
+LOCAL_BACKEND_LATENCY = float(os.getenv("LOCAL_BACKEND_LATENCY", "0.5"))
+LOCAL_TRANSCRIPT_PATH = os.getenv("LOCAL_TRANSCRIPT_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "transcript.txt"))
+WORDS_PER_SECOND = 2.5
+TURN = re.compile(r'^([^:\n]+):\s*(.+)$')
+
+# Function to turn a "Name: text" transcript (like transcript.txt) into the to_dict()
+# layout of a Deepgram prerecorded response with words and utterances
+def deepgram_response_from_transcript(text):
+    speakers = {}
+    words = []
+    utterances = []
+    clock = 0.0
+    for line in text.splitlines():
+        match = TURN.match(line.strip())
+        if not match:
+            continue
+        name, turn_text = match.groups()
+        speaker = speakers.setdefault(name, len(speakers))
+        turn_words = []
+        for token in turn_text.split():
+            word = {
+                "word": token.strip('.,?!').lower(),
+                "start": round(clock, 3),
+                "end": round(clock + 0.8 / WORDS_PER_SECOND, 3),
+                "confidence": 0.99,
+                "speaker": speaker,
+                "speaker_confidence": 0.9,
+                "punctuated_word": token,
+            }
+            clock += 1.0 / WORDS_PER_SECOND
+            turn_words.append(word)
+        if not turn_words:
+            continue
+        words.extend(turn_words)
+        utterances.append({
+            "id": str(len(utterances)),
+            "start": turn_words[0]["start"],
+            "end": turn_words[-1]["end"],
+            "confidence": 0.99,
+            "channel": 0,
+            "speaker": speaker,
+            "transcript": ' '.join(w["punctuated_word"] for w in turn_words),
+            "words": turn_words,
+        })
+        clock += 0.5
+
+    return {
+        "metadata": {"duration": round(clock, 3), "channels": 1, "models": ["local"]},
+        "results": {
+            "channels": [{
+                "alternatives": [{
+                    "transcript": ' '.join(w["punctuated_word"] for w in words),
+                    "confidence": 0.99,
+                    "words": words,
+                }],
+            }],
+            "utterances": utterances,
+        },
+    }
+
+class _LocalResponse:
+    def __init__(self, data):
+        self._data = data
+
+    def to_dict(self):
+        return self._data
+
+    def to_json(self):
+        return json.dumps(self._data)
+
+class _LocalPrerecorded:
+    def __init__(self, backend):
+        self._backend = backend
+
+    def v(self, version):
+        return self
+
+    def transcribe_file(self, payload, options=None, timeout=None, **kwargs):
+        self._backend.requests += 1
+        time.sleep(self._backend.latency)
+        return _LocalResponse(self._backend.response_for(payload["buffer"]))
+
+# Stand-in for DeepgramClient: every upload is "transcribed" to the bundled transcript
+class LocalDeepgramClient:
+    def __init__(self, transcript_path=LOCAL_TRANSCRIPT_PATH, latency=LOCAL_BACKEND_LATENCY):
+        with open(transcript_path, 'r', encoding='utf-8') as f:
+            self._response = deepgram_response_from_transcript(f.read())
+        self.latency = latency
+        self.requests = 0
+        self.listen = SimpleNamespace(prerecorded=_LocalPrerecorded(self))
+
+    def response_for(self, buffer_data):
+        return self._response
+
+class _LocalCompletions:
+    def __init__(self, backend):
+        self._backend = backend
+
+    def create(self, model, messages, max_tokens=None, stream=False, **kwargs):
+        self._backend.requests += 1
+        prompt = messages[-1]["content"]
+        text = self._backend.complete(prompt, max_tokens)
+        if not stream:
+            time.sleep(self._backend.latency)
+            return SimpleNamespace(
+                choices=[SimpleNamespace(message=SimpleNamespace(role="assistant", content=text), finish_reason="stop")],
+                usage=SimpleNamespace(
+                    prompt_tokens=len(prompt) // 4,
+                    completion_tokens=len(text) // 4,
+                    total_tokens=(len(prompt) + len(text)) // 4,
+                ),
+            )
+        return self._stream(text)
+
+    def _stream(self, text):
+        words = text.split(' ')
+        # Spend half of the latency before the first token, like a real model
+        time.sleep(self._backend.latency / 2)
+        step = (self._backend.latency / 2) / max(1, len(words))
+        for i, word in enumerate(words):
+            time.sleep(step)
+            delta = word if i == 0 else ' ' + word
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=delta), finish_reason=None)])
+
+# Stand-in for the OpenAI client: returns deterministic minutes built from the prompt
+class LocalOpenAIClient:
+    def __init__(self, latency=LOCAL_BACKEND_LATENCY):
+        self.latency = latency
+        self.requests = 0
+        self.chat = SimpleNamespace(completions=_LocalCompletions(self))
+
+    def complete(self, prompt, max_tokens=None):
+        digest = hashlib.sha256(prompt.encode('utf-8')).hexdigest()[:8]
+        lines = [line.strip() for line in prompt.splitlines() if line.strip()]
+        excerpt = ' '.join(lines[-1].split()[:40]) if lines else ''
+        if "Return the updated state as JSON" in prompt:
+            return self._rolling_state(prompt, excerpt)
+        if "Return the minutes as JSON only" in prompt:
+            lines = [line.strip() for line in prompt.split("Return the minutes as JSON only")[0].splitlines() if line.strip()]
+            return self._structured_minutes(digest, ' '.join(lines[-1].split()[:40]) if lines else '')
+        text = (
+            f"Minutes of Meeting (local backend, prompt {digest})\n\n"
+            f"Summary: {excerpt}\n\n"
+            "| Person | Task | Status | Deadline |\n"
+            "|---|---|---|---|\n"
+            "| Gokul | Fine tune the voice to text project | In progress | Next week |\n"
+            "| Avinash | Fix the Azure deployment of the chatbot | Blocked | Next week |"
+        )
+        if max_tokens:
+            text = text[:max_tokens * 4]
+        return text
+
+    # Structured minutes requests get minutes in the JSON form asked for
+    def _structured_minutes(self, digest, excerpt):
+        return json.dumps({
+            "summary": f"Minutes of Meeting (local backend, prompt {digest}): {excerpt}",
+            "attendees": ["Gokul", "Avinash"],
+            "decisions": ["Continue with the voice to text project"],
+            "action_items": [
+                {"owner": "Gokul", "task": "Fine tune the voice to text project", "status": "in_progress", "deadline": "Next week"},
+                {"owner": "Avinash", "task": "Fix the Azure deployment of the chatbot", "status": "blocked", "deadline": "Next week"},
+            ],
+        })
+
+    # Rolling minutes updates get a running state back: the previous one plus the new excerpt
+    def _rolling_state(self, prompt, excerpt):
+        match = re.search(r'Current state:\s*(\{.*?\})\s*New part of the transcript:', prompt, re.DOTALL)
+        state = json.loads(match.group(1)) if match else {"summary": "", "decisions": [], "action_items": []}
+        state["summary"] = ' '.join((state["summary"] + ' ' + excerpt).split()[-60:])
+        if not state["action_items"]:
+            state["action_items"] = [
+                {"person": "Gokul", "task": "Fine tune the voice to text project", "status": "In progress", "deadline": "Next week"},
+                {"person": "Avinash", "task": "Fix the Azure deployment of the chatbot", "status": "Blocked", "deadline": "Next week"},
+            ]
+        return json.dumps(state)
@@ -0,0 +1,270 @@
+import os
+import re
+import sys
+import json
+import time
+import sqlite3
+import hashlib
+import argparse
+import contextlib
+import threading
+from chunked_mom import split_turns
+from structured_mom import OPEN_STATUSES
+
+# Local archive of every processed meeting: the transcript, its speaker turns and the
+# structured minutes (see structured_mom). Turns and action items are indexed with SQLite
+# FTS5, and action items also by owner and status, so questions such as "open tasks for
+# Avinash across all meetings" are answered from the archive without calling the LLM:
+#
+#   python meeting_archive.py tasks --owner Avinash --open
+#   python meeting_archive.py search "azure deployment"
+
+# Constants
+MEETING_ARCHIVE_PATH = os.getenv("MEETING_ARCHIVE_PATH", "meetings.sqlite3")
+WHISPER_TURN = re.compile(r'^(SPEAKER \d+) [\d:]+\n(.*)$', re.DOTALL)
+NAMED_TURN = re.compile(r'^([^:\n]{1,40}):\s+(.*)$', re.DOTALL)
+FTS_TOKEN = re.compile(r'\w+', re.UNICODE)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meetings (
+    id TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    language TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    transcript TEXT NOT NULL,
+    minutes TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS meetings_created ON meetings (created_at);
+CREATE TABLE IF NOT EXISTS action_items (
+    id INTEGER PRIMARY KEY,
+    meeting_id TEXT NOT NULL REFERENCES meetings (id) ON DELETE CASCADE,
+    owner TEXT NOT NULL,
+    owner_key TEXT NOT NULL,
+    task TEXT NOT NULL,
+    status TEXT NOT NULL,
+    deadline TEXT
+);
+CREATE INDEX IF NOT EXISTS action_items_owner ON action_items (owner_key, status);
+CREATE INDEX IF NOT EXISTS action_items_status ON action_items (status);
+CREATE INDEX IF NOT EXISTS action_items_meeting ON action_items (meeting_id);
+CREATE VIRTUAL TABLE IF NOT EXISTS turns_fts USING fts5 (
+    text, speaker, meeting_id UNINDEXED, position UNINDEXED, tokenize = 'unicode61'
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS action_items_fts USING fts5 (
+    task, owner, tokenize = 'unicode61', content = 'action_items', content_rowid = 'id'
+);
+"""
+
+# Function to split a formatted speaker turn into (speaker, text). Works for the Deepgram
+# ("SPEAKER 0: ..."), the named ("Gokul: ...") and the Whisper layouts.
+def parse_turn(turn):
+    match = WHISPER_TURN.match(turn) or NAMED_TURN.match(turn)
+    if match is None:
+        return '', turn
+    return match.group(1).strip(), match.group(2).strip()
+
+# Function to turn free text into an FTS5 query: every word must match (as a prefix of
+# the last one), and FTS5 operators in the input are treated as plain words
+def fts_query(text):
+    words = FTS_TOKEN.findall(text)
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+def _owner_key(owner):
+    return ' '.join(owner.lower().split())
+
+# Function to turn an owner key into a LIKE pattern matching the keys that start with it
+# as whole words ("avinash" matches "avinash kumar" and "avinash (qa)", not "avinashi")
+def _owner_prefix(owner_key):
+    escaped = owner_key.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return escaped + ' %'
+
+class MeetingArchive:
+    def __init__(self, db_path=MEETING_ARCHIVE_PATH):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    @contextlib.contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            yield conn
+        finally:
+            conn.close()
+
+    # Function to store a meeting with its minutes (validated structured minutes).
+    # Without meeting_id the ID is derived from the title, language and transcript, so archiving
+    # the same meeting again replaces it instead of adding a copy. Returns the ID.
+    def add_meeting(self, title, language, transcript, minutes, meeting_id=None):
+        meeting_id = meeting_id or hashlib.sha256(f"{title}\n{language.lower()}\n{transcript}".encode('utf-8')).hexdigest()[:16]
+        turns = [parse_turn(turn) for turn in split_turns(transcript)]
+        with self._lock, self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._delete(conn, meeting_id)
+                conn.execute(
+                    "INSERT INTO meetings (id, title, language, created_at, transcript, minutes) VALUES (?, ?, ?, ?, ?, ?)",
+                    (meeting_id, title, language, time.time(), transcript, json.dumps(minutes, ensure_ascii=False)),
+                )
+                conn.executemany(
+                    "INSERT INTO turns_fts (text, speaker, meeting_id, position) VALUES (?, ?, ?, ?)",
+                    [(text, speaker, meeting_id, position) for position, (speaker, text) in enumerate(turns)],
+                )
+                for item in minutes["action_items"]:
+                    cursor = conn.execute(
+                        "INSERT INTO action_items (meeting_id, owner, owner_key, task, status, deadline) VALUES (?, ?, ?, ?, ?, ?)",
+                        (meeting_id, item["owner"], _owner_key(item["owner"]), item["task"], item["status"], item["deadline"]),
+                    )
+                    conn.execute(
+                        "INSERT INTO action_items_fts (rowid, task, owner) VALUES (?, ?, ?)",
+                        (cursor.lastrowid, item["task"], item["owner"]),
+                    )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return meeting_id
+
+    def _delete(self, conn, meeting_id):
+        rows = conn.execute("SELECT id, task, owner FROM action_items WHERE meeting_id = ?", (meeting_id,)).fetchall()
+        conn.executemany("INSERT INTO action_items_fts (action_items_fts, rowid, task, owner) VALUES ('delete', ?, ?, ?)", rows)
+        conn.execute("DELETE FROM action_items WHERE meeting_id = ?", (meeting_id,))
+        conn.execute("DELETE FROM turns_fts WHERE meeting_id = ?", (meeting_id,))
+        conn.execute("DELETE FROM meetings WHERE id = ?", (meeting_id,))
+
+    def delete_meeting(self, meeting_id):
+        with self._lock, self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._delete(conn, meeting_id)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    # Function to return one meeting with its minutes, or None
+    def get_meeting(self, meeting_id):
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT id, title, language, created_at, transcript, minutes FROM meetings WHERE id = ?", (meeting_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {"id": row[0], "title": row[1], "language": row[2], "created_at": row[3],
+                "transcript": row[4], "minutes": json.loads(row[5])}
+
+    def list_meetings(self, limit=50):
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT id, title, language, created_at FROM meetings ORDER BY created_at DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [{"id": row[0], "title": row[1], "language": row[2], "created_at": row[3]} for row in rows]
+
+    # Function to list action items across all meetings, newest meetings first.
+    # owner matches case-insensitively, as the full owner or its first words ("Avinash"
+    # finds "Avinash Kumar" and "Avinash (QA)"); open_only keeps open, in-progress and blocked
+    # items; text is a full-text query on the task and the owner.
+    def action_items(self, owner=None, status=None, open_only=False, text=None, limit=100):
+        conditions = []
+        params = []
+        if owner:
+            conditions.append("(a.owner_key = ? OR a.owner_key LIKE ? ESCAPE '\\')")
+            params.extend((_owner_key(owner), _owner_prefix(_owner_key(owner))))
+        if status:
+            conditions.append("a.status = ?")
+            params.append(status)
+        elif open_only:
+            conditions.append(f"a.status IN ({', '.join('?' * len(OPEN_STATUSES))})")
+            params.extend(OPEN_STATUSES)
+        query = fts_query(text) if text else None
+        if query:
+            conditions.append("a.id IN (SELECT rowid FROM action_items_fts WHERE action_items_fts MATCH ?)")
+            params.append(query)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"""SELECT a.owner, a.task, a.status, a.deadline, m.id, m.title, m.created_at
+                    FROM action_items a JOIN meetings m ON m.id = a.meeting_id
+                    {where} ORDER BY m.created_at DESC, a.id LIMIT ?""",
+                (*params, limit),
+            ).fetchall()
+        return [{"owner": row[0], "task": row[1], "status": row[2], "deadline": row[3],
+                 "meeting_id": row[4], "title": row[5], "created_at": row[6]} for row in rows]
+
+    # Function to search the speaker turns of all meetings; best matches first
+    def search(self, text, speaker=None, limit=20):
+        query = fts_query(text)
+        if query is None:
+            return []
+        if speaker:
+            query = f'{query} AND speaker : "{speaker.replace(chr(34), "")}"'
+        with self._connect() as conn:
+            rows = conn.execute(
+                """SELECT t.meeting_id, m.title, t.position, t.speaker,
+                          snippet(turns_fts, 0, '[', ']', '...', 16), bm25(turns_fts)
+                   FROM turns_fts t JOIN meetings m ON m.id = t.meeting_id
+                   WHERE turns_fts MATCH ? ORDER BY bm25(turns_fts) LIMIT ?""",
+                (query, limit),
+            ).fetchall()
+        return [{"meeting_id": row[0], "title": row[1], "position": row[2], "speaker": row[3],
+                 "snippet": row[4], "score": -row[5]} for row in rows]
+
+    def stats(self):
+        with self._connect() as conn:
+            meetings = conn.execute("SELECT COUNT(*) FROM meetings").fetchone()[0]
+            items = conn.execute("SELECT COUNT(*) FROM action_items").fetchone()[0]
+            turns = conn.execute("SELECT COUNT(*) FROM turns_fts").fetchone()[0]
+        return {"meetings": meetings, "action_items": items, "turns": turns}
+
+# One archive per process, like the caches
+_default_archive = None
+_default_archive_lock = threading.Lock()
+
+def get_meeting_archive():
+    global _default_archive
+    with _default_archive_lock:
+        if _default_archive is None:
+            _default_archive = MeetingArchive()
+        return _default_archive
+
+def main():
+    parser = argparse.ArgumentParser(description="Query the archive of processed meetings")
+    parser.add_argument("--db", default=MEETING_ARCHIVE_PATH, help="archive database")
+    commands = parser.add_subparsers(dest="command", required=True)
+    tasks = commands.add_parser("tasks", help="list action items across meetings")
+    tasks.add_argument("--owner", help="person the items are assigned to")
+    tasks.add_argument("--status", choices=("open", "in_progress", "blocked", "done"))
+    tasks.add_argument("--open", action="store_true", help="only items that are not done")
+    tasks.add_argument("--text", help="words in the task")
+    search = commands.add_parser("search", help="full-text search of what was said")
+    search.add_argument("text")
+    search.add_argument("--speaker")
+    commands.add_parser("meetings", help="list the archived meetings")
+    args = parser.parse_args()
+
+    archive = MeetingArchive(args.db)
+    start_time = time.perf_counter()
+    if args.command == "tasks":
+        rows = archive.action_items(args.owner, args.status, args.open, args.text)
+        for row in rows:
+            print(f"{row['owner']}: {row['task']} [{row['status'].replace('_', ' ')}, due {row['deadline'] or '-'}] ({row['title']})")
+    elif args.command == "search":
+        rows = archive.search(args.text, args.speaker)
+        for row in rows:
+            print(f"{row['title']} #{row['position']} {row['speaker']}: {row['snippet']}")
+    else:
+        rows = archive.list_meetings()
+        for row in rows:
+            print(f"{row['id']} {time.strftime('%Y-%m-%d %H:%M', time.localtime(row['created_at']))} {row['language']} {row['title']}")
+    print(f"{len(rows)} results in {(time.perf_counter() - start_time) * 1000:.1f} ms", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
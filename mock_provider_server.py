@@ -0,0 +1,141 @@
+import os
+import json
+import time
+import random
+import argparse
+import threading
+from collections import deque
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from local_backends import LOCAL_TRANSCRIPT_PATH, LocalOpenAIClient, deepgram_response_from_transcript
+
+# A local HTTP server that answers like the Deepgram prerecorded and OpenAI chat
+# completion endpoints, with configurable latency, random 429s and a requests-per-minute
+# limit, to exercise provider_clients (pooling, rate limits, retries) without API keys:
+#
+#   python mock_provider_server.py --port 8080 --error-rate 0.2 --requests-per-minute 60
+#   DEEPGRAM_API_URL=http://localhost:8080 OPENAI_BASE_URL=http://localhost:8080/v1 streamlit run deepgram_app.py
+
+# Constants
+MOCK_SERVER_HOST = os.getenv("MOCK_SERVER_HOST", "localhost")
+MOCK_SERVER_PORT = int(os.getenv("MOCK_SERVER_PORT", "8080"))
+
+class MockProviderHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, data, headers=None):
+        body = json.dumps(data).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    # Function to decide whether this request is rejected with a 429
+    def _rate_limited(self):
+        server = self.server
+        with server.lock:
+            server.stats["requests"] += 1
+            now = time.monotonic()
+            while server.recent and server.recent[0] < now - 60:
+                server.recent.popleft()
+            over_limit = server.requests_per_minute and len(server.recent) >= server.requests_per_minute
+            if over_limit or random.random() < server.error_rate:
+                server.stats["rejected"] += 1
+                return True
+            server.recent.append(now)
+            return False
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if self._rate_limited():
+            self._send_json(429, {"error": {"message": "Rate limit exceeded (mock)"}}, {"Retry-After": "1"})
+            return
+        time.sleep(self.server.latency)
+        path = self.path.split('?', 1)[0]
+        if path == "/v1/listen":
+            self._send_json(200, self.server.deepgram_response)
+        elif path == "/v1/chat/completions":
+            self._chat_completion(json.loads(body or b'{}'))
+        else:
+            self._send_json(404, {"error": {"message": f"Unknown path {path}"}})
+
+    def _chat_completion(self, request):
+        prompt = request["messages"][-1]["content"]
+        text = self.server.llm.complete(prompt, request.get("max_tokens"))
+        created = int(time.time())
+        if not request.get("stream"):
+            self._send_json(200, {
+                "id": "chatcmpl-mock",
+                "object": "chat.completion",
+                "created": created,
+                "model": request.get("model", "mock"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                "usage": {
+                    "prompt_tokens": len(prompt) // 4,
+                    "completion_tokens": len(text) // 4,
+                    "total_tokens": (len(prompt) + len(text)) // 4,
+                },
+            })
+            return
+
+        # Server-sent events, one word per chunk
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        words = text.split(' ')
+        for i, word in enumerate(words):
+            chunk = {
+                "id": "chatcmpl-mock",
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": request.get("model", "mock"),
+                "choices": [{"index": 0, "delta": {"content": word if i == 0 else ' ' + word}, "finish_reason": None}],
+            }
+            self._write_chunk(f"data: {json.dumps(chunk)}\n\n")
+        self._write_chunk("data: [DONE]\n\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _write_chunk(self, text):
+        data = text.encode('utf-8')
+        self.wfile.write(f"{len(data):x}\r\n".encode('ascii') + data + b"\r\n")
+
+# Function to create the server (also used by the benchmarks)
+def create_server(host=MOCK_SERVER_HOST, port=MOCK_SERVER_PORT, latency=0.5, error_rate=0.0,
+                  requests_per_minute=0, transcript_path=LOCAL_TRANSCRIPT_PATH):
+    server = ThreadingHTTPServer((host, port), MockProviderHandler)
+    server.daemon_threads = True
+    with open(transcript_path, 'r', encoding='utf-8') as f:
+        server.deepgram_response = deepgram_response_from_transcript(f.read())
+    server.llm = LocalOpenAIClient(latency=0)
+    server.latency = latency
+    server.error_rate = error_rate
+    server.requests_per_minute = requests_per_minute
+    server.recent = deque()
+    server.stats = {"requests": 0, "rejected": 0}
+    server.lock = threading.Lock()
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock Deepgram and OpenAI HTTP server")
+    parser.add_argument('--host', default=MOCK_SERVER_HOST)
+    parser.add_argument('--port', type=int, default=MOCK_SERVER_PORT)
+    parser.add_argument('--latency', type=float, default=0.5, help="seconds before every answer")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="fraction of requests rejected with 429")
+    parser.add_argument('--requests-per-minute', type=int, default=0, help="reject requests above this rate with 429 (0 = no limit)")
+    args = parser.parse_args()
+
+    server = create_server(args.host, args.port, args.latency, args.error_rate, args.requests_per_minute)
+    print(f"Mock providers on http://{args.host}:{args.port} (Deepgram /v1/listen, OpenAI /v1/chat/completions)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"Requests: {server.stats}")
+
+if __name__ == "__main__":
+    main()
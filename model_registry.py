@@ -0,0 +1,156 @@
+import os
+import gc
+import time
+import threading
+from collections import OrderedDict
+
+# Constants
+MODEL_MEMORY_LIMIT = int(os.getenv("MODEL_MEMORY_LIMIT_MB", "8192")) * 1024 * 1024
+
+# Function to read the resident set size of this process (Linux); 0 when unavailable
+def resident_memory():
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return 0
+
+# Function to estimate the memory held by a model: the size of its torch parameters and
+# buffers when it is (or wraps) an nn.Module, else the RSS growth measured while loading
+def model_memory(model, rss_delta=0):
+    # pyannote's PretrainedSpeakerEmbedding keeps the speechbrain classifier in
+    # .classifier_, which keeps its torch modules in .mods
+    modules = [model]
+    for module in modules:
+        for attribute in ('classifier_', 'model_', 'mods'):
+            if hasattr(module, attribute) and len(modules) < 8:
+                modules.append(getattr(module, attribute))
+
+    size = 0
+    seen = set()
+    for module in modules:
+        tensors = []
+        if hasattr(module, 'parameters'):
+            tensors.extend(module.parameters())
+        if hasattr(module, 'buffers'):
+            tensors.extend(module.buffers())
+        for tensor in tensors:
+            if id(tensor) not in seen:
+                seen.add(id(tensor))
+                size += tensor.numel() * tensor.element_size()
+    return size or max(0, rss_delta)
+
+class _Entry:
+    def __init__(self, model, load_seconds, memory_bytes):
+        self.model = model
+        self.load_seconds = load_seconds
+        self.memory_bytes = memory_bytes
+        self.hits = 0
+        self.last_used = time.time()
+
+# Process-wide registry of loaded models keyed by (name, device). Each model is loaded
+# once and shared by every session; when the models together need more than max_bytes,
+# the least recently used ones are dropped. Sessions that still hold a reference keep
+# using their copy until they are done with it.
+class ModelRegistry:
+    def __init__(self, max_bytes=MODEL_MEMORY_LIMIT):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # (name, device) -> [load lock, threads using it]; an entry only exists while a
+        # model is being loaded or waited for, so the map does not grow with every model
+        self._key_locks = {}
+
+    # Function to return the model for (name, device), calling loader() on the first use
+    def get(self, name, device, loader):
+        key = (name, str(device))
+        with self._lock:
+            entry = self._touch(key)
+            if entry is not None:
+                return entry.model
+            key_lock = self._key_locks.setdefault(key, [threading.Lock(), 0])
+            key_lock[1] += 1
+
+        # Only one thread loads a given model; the others wait for it and reuse it
+        try:
+            with key_lock[0]:
+                with self._lock:
+                    entry = self._touch(key)
+                    if entry is not None:
+                        return entry.model
+
+                rss_before = resident_memory()
+                start_time = time.time()
+                model = loader()
+                load_seconds = time.time() - start_time
+                memory_bytes = model_memory(model, resident_memory() - rss_before)
+                print(f"Loaded {name} on {device} in {load_seconds:.2f} seconds ({memory_bytes / 2**20:.0f} MB)")
+
+                with self._lock:
+                    self._entries[key] = _Entry(model, load_seconds, memory_bytes)
+                    self._evict(keep=key)
+                return model
+        finally:
+            with self._lock:
+                key_lock[1] -= 1
+                if key_lock[1] == 0 and self._key_locks.get(key) is key_lock:
+                    del self._key_locks[key]
+
+    def _touch(self, key):
+        entry = self._entries.get(key)
+        if entry is not None:
+            entry.hits += 1
+            entry.last_used = time.time()
+            self._entries.move_to_end(key)
+        return entry
+
+    def _evict(self, keep):
+        evicted = False
+        while self.total_bytes() > self.max_bytes and len(self._entries) > 1:
+            key = next(iter(self._entries))
+            if key == keep:
+                break
+            del self._entries[key]
+            print(f"Evicted {key[0]} on {key[1]} from the model registry")
+            evicted = True
+        if evicted:
+            gc.collect()
+            try:
+                import torch
+                if torch.cuda.is_available():
+                    torch.cuda.empty_cache()
+            except ImportError:
+                pass
+
+    def total_bytes(self):
+        return sum(entry.memory_bytes for entry in self._entries.values())
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        gc.collect()
+
+    # Function to list the resident models with their load time, memory and usage
+    def stats(self):
+        with self._lock:
+            return [
+                {
+                    "model": name,
+                    "device": device,
+                    "load_seconds": round(entry.load_seconds, 2),
+                    "memory_mb": round(entry.memory_bytes / 2**20, 1),
+                    "hits": entry.hits,
+                    "last_used": time.strftime('%H:%M:%S', time.localtime(entry.last_used)),
+                }
+                for (name, device), entry in self._entries.items()
+            ]
+
+_registry = None
+_registry_lock = threading.Lock()
+
+def get_model_registry():
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = ModelRegistry()
+        return _registry
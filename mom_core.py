@@ -0,0 +1,308 @@
+import os
+import io
+import json
+from dotenv import load_dotenv
+from datetime import datetime
+import httpx
+import time
+from deepgram import PrerecordedOptions
+from transcription_cache import get_transcription_cache
+from completion_cache import get_completion_cache
+from mom_pipeline import run_translation_and_mom
+from transcript_builder import create_transcript
+from chunked_mom import generate_mom_chunked, count_tokens, MOM_CHUNK_TOKENS, MOM_MAX_CONCURRENCY
+from provider_clients import get_deepgram_client, get_openai_client, get_limiter
+from telemetry import traced, span, current_span, annotate_trace, record_transcription, record_completion
+from rolling_mom import RollingMinutes, ROLLING_MOM_MAX_TOKENS
+from structured_mom import with_json_instructions, create_repair_prompt, parse_minutes, render_minutes, STRUCTURED_MOM_MAX_TOKENS
+from meeting_archive import get_meeting_archive
+from speaker_names import resolve_speaker_names, apply_speaker_names, SPEAKER_NAME_LLM, SPEAKER_NAME_MAX_TOKENS
+from multilingual_mom import generate_multilingual_minutes, create_minutes_translation_prompt, MOM_FANOUT_MODE
+from audio_decode import decode_audio, encode_audio, SAMPLE_RATE
+from vad import trim_silence, remap_deepgram_response
+
+# Load environment variables
+load_dotenv()
+
+# Constants
+API_KEY = os.getenv("DG_API_KEY")
+OPENAI_API_KEY = os.getenv("OPEN_AI_TOKEN")
+MOM_BACKEND = os.getenv("MOM_BACKEND", "remote")
+MIMETYPE = 'mp3'
+CHAT_MODEL = "gpt-3.5-turbo"
+SEPARATOR = '--------------------------'
+
+# Initialize the Deepgram and OpenAI clients. MOM_BACKEND=local swaps in the local
+# stand-ins so the pipeline can run without network access or API keys. The real clients
+# share one pooled HTTP client per process, and every call goes through the provider's
+# rate limiter, which also retries rate limits and transient errors.
+if MOM_BACKEND == 'local':
+    from local_backends import LocalDeepgramClient, LocalOpenAIClient
+    deepgram_client = LocalDeepgramClient()
+    openai_client = LocalOpenAIClient()
+else:
+    deepgram_client = get_deepgram_client(API_KEY)
+    openai_client = get_openai_client(OPENAI_API_KEY)
+deepgram_limiter = get_limiter('deepgram')
+openai_limiter = get_limiter('openai')
+
+# Function to transcribe an audio file
+# With vad=True the silence is cut out before upload and the timestamps of the response are
+# mapped back to the original recording; response["metadata"]["vad"] reports what was removed.
+@traced()
+def transcribe_audio(file, use_cache=True, vad=False):
+    buffer_data = file.read()
+    payload = {"buffer": buffer_data}
+    options = PrerecordedOptions(
+        model="nova-2",
+        smart_format=True,
+        utterances=True,
+        punctuate=True,
+        diarize=True,
+    )
+
+    # Re-uploads of the same recording with the same options are served from disk
+    cache = get_transcription_cache()
+    cache_key = cache.make_key(buffer_data, {**options.to_dict(), "vad": True} if vad else options)
+    if use_cache:
+        cached_response = cache.get(cache_key)
+        if cached_response is not None:
+            current_span().set(cache_hit=True)
+            annotate_trace(audio_seconds=cached_response.get("metadata", {}).get("duration"))
+            return cached_response
+
+    if vad:
+        with span("trim_silence"):
+            decoded = decode_audio(buffer_data)
+            waveform, timeline, removed_seconds = trim_silence(decoded, SAMPLE_RATE)
+            payload = {"buffer": encode_audio(waveform)}
+
+    response = deepgram_limiter.call(
+        lambda: deepgram_client.listen.prerecorded.v("1").transcribe_file(payload, options, timeout=httpx.Timeout(300.0, connect=10.0))
+    )
+    response = response.to_dict()
+    # Deepgram bills the audio it receives: the trimmed duration when silence was removed
+    billed_seconds = timeline.trimmed_duration if vad else response.get("metadata", {}).get("duration") or 0.0
+    record_transcription(billed_seconds, len(payload["buffer"]))
+    if vad:
+        annotate_trace(audio_seconds=len(decoded) / SAMPLE_RATE)
+        remap_deepgram_response(response, timeline)
+        response.setdefault("metadata", {})["vad"] = {
+            "removed_seconds": round(removed_seconds, 2),
+            "speech_seconds": round(timeline.trimmed_duration, 2),
+        }
+    cache.put(cache_key, response)
+    return response
+
+# Function to run a chat completion. With on_token the response is streamed and every
+# content delta is passed to on_token as soon as it arrives; the full text is returned.
+# The prompt and the most the answer can use are counted against the tokens-per-minute limit.
+# Token usage comes from the response; streamed answers are counted with count_tokens.
+@traced()
+def chat_completion(prompt, max_tokens, on_token=None):
+    tokens = count_tokens(prompt) + max_tokens
+    if on_token is None:
+        response = openai_limiter.call(lambda: openai_client.chat.completions.create(
+            model=CHAT_MODEL,
+            messages=[{"role": "user", "content": prompt}],
+            max_tokens=max_tokens
+        ), tokens=tokens)
+        text = response.choices[0].message.content
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            record_completion(CHAT_MODEL, usage.prompt_tokens, usage.completion_tokens)
+        else:
+            record_completion(CHAT_MODEL, count_tokens(prompt), count_tokens(text or ''))
+        return text
+
+    # Only opening the stream is retried; tokens that were already shown cannot be taken back
+    stream = openai_limiter.call(lambda: openai_client.chat.completions.create(
+        model=CHAT_MODEL,
+        messages=[{"role": "user", "content": prompt}],
+        max_tokens=max_tokens,
+        stream=True
+    ), tokens=tokens)
+    parts = []
+    for chunk in stream:
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta.content
+        if delta:
+            parts.append(delta)
+            on_token(delta)
+    text = ''.join(parts)
+    record_completion(CHAT_MODEL, count_tokens(prompt), count_tokens(text))
+    return text
+
+# Function to check whether minutes in this language need a translated transcript.
+# The UI passes "English"/"Japanese", other callers may pass lower case.
+def needs_translation(language):
+    return language.strip().lower() != 'english'
+
+# Function to return a completion from the completion cache, or compute and store it.
+# On a hit the cached text is passed to on_token in one piece, so streaming views still fill.
+def cached_completion(key, compute, on_token=None, use_cache=True):
+    cache = get_completion_cache()
+    if use_cache:
+        cached = cache.get(key)
+        if cached is not None:
+            current_span().set(cache_hit=True)
+            if on_token is not None:
+                on_token(cached)
+            return cached
+    response = compute()
+    if response:
+        cache.put(key, response)
+    return response
+
+# Function to replace the SPEAKER tags of a transcript with the speakers' names. The names
+# are found locally from self-introductions; only the speakers that stay unresolved are
+# sent to the LLM, as a short excerpt of their first turns.
+# If a names dict is given it receives the {speaker id: name} map that was applied.
+@traced()
+def name_speakers(transcript, use_llm=SPEAKER_NAME_LLM, use_cache=True, names=None):
+    def complete_names(prompt):
+        key = get_completion_cache().make_key('speaker_names', prompt, 'english', CHAT_MODEL, SPEAKER_NAME_MAX_TOKENS)
+        return cached_completion(key, lambda: chat_completion(prompt, SPEAKER_NAME_MAX_TOKENS), use_cache=use_cache)
+
+    resolved, llm_prompt_tokens = resolve_speaker_names(transcript, complete_names if use_llm else None)
+    current_span().set(speakers_named=len(resolved), llm_prompt_tokens=llm_prompt_tokens)
+    if names is not None:
+        names.update(resolved)
+    return apply_speaker_names(transcript, resolved)
+
+# Function to translate text using OpenAI's GPT
+@traced()
+def translate_text(text, target_language, on_token=None, use_cache=True):
+    key = get_completion_cache().make_key('translate_named', text, target_language, CHAT_MODEL, 2000)
+    return cached_completion(key, lambda: _translate_text(text, target_language, on_token), on_token, use_cache)
+
+# The speakers are already named (name_speakers), so the prompt only asks for the translation
+def _translate_text(text, target_language, on_token=None):
+    prompt = f"Translate the following diarized meeting transcript to {target_language}. Keep the speaker names before the colons unchanged and generate all other words in {target_language} only.\n\n{text}"
+    return chat_completion(prompt, 2000, on_token)
+
+# Function to create a prompt for the MoM generator
+def create_prompt(transcript, language='english'):
+    current_date = datetime.now().strftime("%d-%m-%Y")
+    prompt = f"""
+    You are a MoM generator from the following transcript. Take the below conversation from a meeting and generate the minutes of the meeting and create a detailed table containing the list of tasks assigned to each person, the status of each task, and the deadlines. Write dates as well in the output table. Today is {current_date}. Identify the speaker names from the meeting transcript.
+    
+    Generate the Minutes of Meeting in {language} only.
+
+    {transcript}
+    """
+    return prompt
+
+# Function to generate MoM using OpenAI's GPT
+def generate_mom(prompt, on_token=None):
+    return chat_completion(prompt, 1000, on_token)
+
+# Function to generate the MoM for a transcript of any length. Transcripts longer than
+# chunk_tokens are split on speaker turns and summarized with map-reduce; when streaming,
+# only the final call (the one that produces the minutes) is streamed.
+# The minutes are cached per transcript, language and day (the prompts contain the date).
+@traced("generate_mom")
+def create_minutes(transcript, language='english', chunk_tokens=MOM_CHUNK_TOKENS, max_concurrency=MOM_MAX_CONCURRENCY, on_token=None, use_cache=True):
+    key = get_completion_cache().make_key('minutes', transcript, language, CHAT_MODEL, 1000, dated=True, chunk_tokens=chunk_tokens)
+    return cached_completion(key, lambda: generate_mom_chunked(
+        transcript,
+        generate_mom,
+        create_prompt,
+        language,
+        chunk_tokens=chunk_tokens,
+        max_concurrency=max_concurrency,
+        final_fn=lambda prompt: generate_mom(prompt, on_token),
+    ), on_token, use_cache)
+
+# Function to generate the minutes as structured data (summary, attendees, decisions and
+# action items) validated against structured_mom.MINUTES_SCHEMA. Long transcripts go
+# through the same map-reduce as create_minutes; only the final call asks for JSON.
+# An answer that does not validate is sent back once with the error to be repaired.
+@traced("generate_mom")
+def create_structured_minutes(transcript, language='english', chunk_tokens=MOM_CHUNK_TOKENS, max_concurrency=MOM_MAX_CONCURRENCY, on_token=None, use_cache=True):
+    key = get_completion_cache().make_key('structured_minutes', transcript, language, CHAT_MODEL, STRUCTURED_MOM_MAX_TOKENS, dated=True, chunk_tokens=chunk_tokens)
+
+    def final_minutes(prompt):
+        text = chat_completion(with_json_instructions(prompt), STRUCTURED_MOM_MAX_TOKENS, on_token)
+        try:
+            minutes = parse_minutes(text)
+        except ValueError as e:
+            minutes = parse_minutes(chat_completion(create_repair_prompt(text, e), STRUCTURED_MOM_MAX_TOKENS))
+        return json.dumps(minutes, ensure_ascii=False)
+
+    # Only validated minutes are cached
+    return parse_minutes(cached_completion(key, lambda: generate_mom_chunked(
+        transcript,
+        generate_mom,
+        create_prompt,
+        language,
+        chunk_tokens=chunk_tokens,
+        max_concurrency=max_concurrency,
+        final_fn=final_minutes,
+    ), on_token, use_cache))
+
+# Function to translate finished minutes (much shorter than the transcript)
+@traced()
+def translate_minutes(minutes, target_language, on_token=None, use_cache=True):
+    key = get_completion_cache().make_key('translate_minutes', minutes, target_language, CHAT_MODEL, 2000)
+    prompt = create_minutes_translation_prompt(minutes, target_language)
+    return cached_completion(key, lambda: chat_completion(prompt, 2000, on_token), on_token, use_cache)
+
+# Function to generate the minutes of one transcript in several languages at once without
+# translating the transcript (see multilingual_mom for the two modes). The minutes are
+# generated as structured minutes; besides the result of generate_multilingual_minutes
+# this returns {language: structured minutes} of the languages that were generated rather
+# than translated (the source language in translate mode, every language in generate mode).
+@traced("multilingual_mom")
+def create_multilingual_minutes(transcript, languages, mode=MOM_FANOUT_MODE,
+                                chunk_tokens=MOM_CHUNK_TOKENS, max_concurrency=MOM_MAX_CONCURRENCY):
+    structured = {}
+
+    def minutes_fn(text, lang):
+        structured[lang] = create_structured_minutes(text, lang, chunk_tokens, max_concurrency)
+        return render_minutes(structured[lang])
+
+    minutes, source_minutes, timings = generate_multilingual_minutes(transcript, languages, minutes_fn, translate_minutes, mode=mode)
+    return minutes, source_minutes, timings, structured
+
+# Function to start rolling minutes for a transcript that keeps growing; each update
+# only sends the new turns and the compact running state
+def create_rolling_minutes(language='english'):
+    return RollingMinutes(lambda prompt: chat_completion(prompt, ROLLING_MOM_MAX_TOKENS), language)
+
+# Function to run the whole Deepgram pipeline on the bytes of a recording without any UI.
+# Used by the background job workers; the result only holds JSON-serializable values.
+# The meeting and its structured minutes are added to the meeting archive.
+@traced("deepgram_pipeline")
+def process_recording(buffer_data, language='English', use_cache=True, vad=False,
+                      chunk_tokens=MOM_CHUNK_TOKENS, max_concurrency=MOM_MAX_CONCURRENCY, progress=None, title='recording'):
+    progress = progress or (lambda message: None)
+
+    start_time = time.time()
+    progress("Transcribing audio...")
+    response = transcribe_audio(io.BytesIO(buffer_data), use_cache=use_cache, vad=vad)
+    with span("create_transcript"):
+        transcript = create_transcript(response)
+    transcript = name_speakers(transcript, use_cache=use_cache)
+    transcribe_time = time.time() - start_time
+
+    progress("Generating MoM...")
+    translated_transcript, minutes, timings = run_translation_and_mom(
+        transcript,
+        language,
+        translate_text,
+        lambda text, lang: create_structured_minutes(text, lang, chunk_tokens, max_concurrency),
+        translate=needs_translation(language),
+    )
+    timings["transcribe_audio"] = transcribe_time
+    meeting_id = get_meeting_archive().add_meeting(title, language, translated_transcript, minutes)
+    return {
+        "transcript": transcript,
+        "translated_transcript": translated_transcript,
+        "mom": render_minutes(minutes),
+        "minutes": minutes,
+        "meeting_id": meeting_id,
+        "timings": timings,
+        "vad": response.get("metadata", {}).get("vad"),
+    }
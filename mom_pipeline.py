@@ -0,0 +1,75 @@
+import time
+import queue
+from concurrent.futures import ThreadPoolExecutor
+from telemetry import propagate
+
+# Function to run a single pipeline stage and record its wall-clock time under `name`
+def timed_stage(timings, name, fn, *args, **kwargs):
+    start_time = time.perf_counter()
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        timings[name] = time.perf_counter() - start_time
+
+# Function to translate the displayed transcript and generate the MoM at the same time.
+# The MoM prompt already names the output language, so `mom_fn(transcript, language)` gets
+# the original transcript and does not have to wait for the translation. Only the blocking
+# API calls run in the worker threads; callers keep all Streamlit calls on the script thread.
+def run_translation_and_mom(transcript, language, translate_fn, mom_fn, translate=True):
+    timings = {}
+    start_time = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=2, thread_name_prefix="mom-pipeline") as executor:
+        # The stages run in the caller's trace
+        mom_future = executor.submit(propagate(timed_stage), timings, "generate_mom", mom_fn, transcript, language)
+        if translate:
+            translation_future = executor.submit(propagate(timed_stage), timings, "translate_text", translate_fn, transcript, language)
+            translated_transcript = translation_future.result()
+        else:
+            translated_transcript = transcript
+        mom = mom_future.result()
+
+    timings["translation_and_mom"] = time.perf_counter() - start_time
+    return translated_transcript, mom, timings
+
+# Function to run the same fan-out as run_translation_and_mom while streaming tokens.
+# Both stage functions get an `on_token` callback. Tokens are handed to the caller's thread
+# through a queue and yielded as (stage, delta) pairs, so the caller can render them with
+# Streamlit as they arrive. The last item is ("done", (translated_transcript, mom, timings)).
+# timings also holds "<stage>_ttft", the time to first token of each stage.
+def stream_translation_and_mom(transcript, language, translate_fn, mom_fn, translate=True):
+    timings = {}
+    tokens = queue.Queue()
+    start_time = time.perf_counter()
+
+    def run_stage(name, fn):
+        ttft_key = name + "_ttft"
+
+        def on_token(delta):
+            if ttft_key not in timings:
+                timings[ttft_key] = time.perf_counter() - start_time
+            tokens.put((name, delta))
+
+        try:
+            return timed_stage(timings, name, fn, transcript, language, on_token=on_token)
+        finally:
+            tokens.put((name, None))
+
+    with ThreadPoolExecutor(max_workers=2, thread_name_prefix="mom-pipeline") as executor:
+        futures = {"generate_mom": executor.submit(propagate(run_stage), "generate_mom", mom_fn)}
+        if translate:
+            futures["translate_text"] = executor.submit(propagate(run_stage), "translate_text", translate_fn)
+
+        running = len(futures)
+        while running:
+            name, delta = tokens.get()
+            if delta is None:
+                running -= 1
+                continue
+            yield name, delta
+
+        translated_transcript = futures["translate_text"].result() if translate else transcript
+        mom = futures["generate_mom"].result()
+
+    timings["translation_and_mom"] = time.perf_counter() - start_time
+    yield "done", (translated_transcript, mom, timings)
@@ -0,0 +1,99 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from chunked_mom import count_tokens
+from telemetry import propagate
+
+# Minutes of one meeting in several languages. The usual path translates the whole
+# diarized transcript for every non-English language and then generates the minutes of
+# each language from the transcript again. The fan-out here never translates the
+# transcript:
+#
+#   translate: the minutes are generated once (in the source language) and that short
+#              text is translated into the other languages concurrently
+#   generate:  the minutes of every language are generated from the original transcript
+#              concurrently (the prompt already names the output language)
+
+# Constants
+MOM_FANOUT_MODE = os.getenv("MOM_FANOUT_MODE", "translate")
+MOM_FANOUT_CONCURRENCY = int(os.getenv("MOM_FANOUT_CONCURRENCY", "4"))
+FANOUT_MODES = ('translate', 'generate')
+TRANSCRIPT_TRANSLATION_MAX_TOKENS = 2000
+
+# Function to create the prompt that translates finished minutes into another language
+def create_minutes_translation_prompt(minutes, language):
+    prompt = f"""
+    Translate the following Minutes of Meeting to {language}. Keep the structure, the headings and the table exactly as they are; translate the text in the table cells as well, but keep person names and dates unchanged. Return only the translated minutes.
+
+    {minutes}
+    """
+    return prompt
+
+def _same_language(language, other):
+    return language.strip().lower() == other.strip().lower()
+
+# Function to generate the minutes in every language of `languages`.
+# `minutes_fn(transcript, language)` generates minutes from the transcript and
+# `translate_fn(minutes, language)` translates finished minutes. Returns
+# ({language: minutes}, source_minutes, timings): the minutes in the order of `languages`
+# and, in translate mode, the minutes that were translated (None in generate mode).
+def generate_multilingual_minutes(transcript, languages, minutes_fn, translate_fn, mode=MOM_FANOUT_MODE,
+                                  source_language='English', max_workers=MOM_FANOUT_CONCURRENCY):
+    if mode not in FANOUT_MODES:
+        raise ValueError(f"Unknown fan-out mode {mode!r}, expected one of {', '.join(FANOUT_MODES)}")
+    timings = {}
+    start_time = time.perf_counter()
+    minutes = {}
+    source_minutes = None
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="mom-fanout") as executor:
+        if mode == 'generate':
+            futures = {language: executor.submit(propagate(minutes_fn), transcript, language) for language in languages}
+        else:
+            source_minutes = minutes_fn(transcript, source_language)
+            timings["generate_mom"] = time.perf_counter() - start_time
+            futures = {}
+            for language in languages:
+                if _same_language(language, source_language):
+                    minutes[language] = source_minutes
+                else:
+                    futures[language] = executor.submit(propagate(translate_fn), source_minutes, language)
+        for language, future in futures.items():
+            minutes[language] = future.result()
+
+    timings["multilingual_mom"] = time.perf_counter() - start_time
+    return {language: minutes[language] for language in languages}, source_minutes, timings
+
+# Function to estimate the tokens (prompt + completion) of both paths for the same meeting,
+# from the result of generate_multilingual_minutes.
+# The current path costs, per language, one translation of the transcript (non-English
+# only; its answer is capped at TRANSCRIPT_TRANSLATION_MAX_TOKENS) and one minutes call
+# over the transcript. Prompt instructions are left out on both sides, so this is an estimate.
+def token_report(transcript, minutes, source_minutes=None, source_language='English'):
+    transcript_tokens = count_tokens(transcript)
+    languages = list(minutes)
+    minutes_tokens = {language: count_tokens(text) for language, text in minutes.items()}
+
+    current = 0
+    for language in languages:
+        if not _same_language(language, 'English'):
+            current += transcript_tokens + min(transcript_tokens, TRANSCRIPT_TRANSLATION_MAX_TOKENS)
+        current += transcript_tokens + minutes_tokens[language]
+
+    if source_minutes is None:
+        fanout = sum(transcript_tokens + minutes_tokens[language] for language in languages)
+    else:
+        source_tokens = count_tokens(source_minutes)
+        fanout = transcript_tokens + source_tokens
+        for language in languages:
+            if not _same_language(language, source_language):
+                fanout += source_tokens + minutes_tokens[language]
+
+    return {
+        "languages": len(languages),
+        "transcript_tokens": transcript_tokens,
+        "current_tokens": current,
+        "fanout_tokens": fanout,
+        "saved_tokens": current - fanout,
+        "saved_percent": 100.0 * (current - fanout) / current if current else 0.0,
+    }
@@ -0,0 +1,136 @@
+import os
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+from vad import frame_levels
+
+# Parallel Whisper transcription: the recording is split at quiet points into chunks
+# that are transcribed by a pool of worker processes, each holding its own model.
+
+# Constants
+WHISPER_WORKERS = int(os.getenv("WHISPER_WORKERS", "1"))
+WHISPER_CHUNK_SECONDS = float(os.getenv("WHISPER_CHUNK_SECONDS", "300"))
+WHISPER_LANGUAGE = os.getenv("WHISPER_LANGUAGE") or None
+BOUNDARY_SEARCH_SECONDS = 15.0
+CHUNK_OVERLAP_SECONDS = 2.0
+
+# Function to choose chunk boundaries near every chunk_seconds, each moved to the quietest
+# frame within BOUNDARY_SEARCH_SECONDS so cuts fall into pauses rather than into words.
+# Returns a list of (start_sample, end_sample) that covers the waveform without gaps.
+def split_at_silence(waveform, sample_rate, chunk_seconds=WHISPER_CHUNK_SECONDS):
+    num_samples = len(waveform)
+    chunk_samples = int(chunk_seconds * sample_rate)
+    if num_samples <= chunk_samples:
+        return [(0, num_samples)]
+
+    levels, frame_length = frame_levels(waveform, sample_rate)
+    search_frames = int(BOUNDARY_SEARCH_SECONDS * sample_rate) // frame_length
+    cuts = [0]
+    target = chunk_samples
+    while target < num_samples - chunk_samples // 4:
+        frame = target // frame_length
+        low = max(cuts[-1] // frame_length + 1, frame - search_frames)
+        high = min(len(levels), frame + search_frames + 1)
+        if low < high:
+            frame = low + int(np.argmin(levels[low:high]))
+        cut = frame * frame_length + frame_length // 2
+        cuts.append(cut)
+        target = cut + chunk_samples
+    cuts.append(num_samples)
+    return list(zip(cuts[:-1], cuts[1:]))
+
+# Worker process state: the model is loaded once by the pool initializer
+_worker_model = None
+
+def _init_worker(model_size, device, num_threads):
+    global _worker_model
+    import torch
+    import whisper
+    torch.set_num_threads(num_threads)
+    _worker_model = whisper.load_model(model_size, device=device)
+
+# Function run in a worker: transcribe one chunk read from shared memory and keep only
+# the segments whose midpoint falls inside the chunk's own range [core_start, core_end).
+# The audio given to Whisper extends CHUNK_OVERLAP_SECONDS past both ends, so a segment
+# that straddles a cut is transcribed whole by the chunk that owns its midpoint.
+def _transcribe_chunk(shm_name, num_samples, sample_rate, core_start, core_end, language):
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        waveform = np.ndarray((num_samples,), dtype=np.float32, buffer=shm.buf)
+        overlap = int(CHUNK_OVERLAP_SECONDS * sample_rate)
+        start = max(0, core_start - overlap)
+        end = min(num_samples, core_end + overlap)
+        # Whisper pads and converts the audio itself; give it its own copy of the slice
+        # so nothing references the shared buffer after it is closed
+        result = _worker_model.transcribe(np.array(waveform[start:end]), language=language)
+    finally:
+        shm.close()
+
+    offset = start / sample_rate
+    core_start_seconds = core_start / sample_rate
+    core_end_seconds = core_end / sample_rate
+    segments = []
+    for segment in result["segments"]:
+        segment["start"] += offset
+        segment["end"] += offset
+        for word in segment.get("words", []):
+            word["start"] += offset
+            word["end"] += offset
+        midpoint = (segment["start"] + segment["end"]) / 2
+        if core_start_seconds <= midpoint < core_end_seconds:
+            segments.append(segment)
+    return {"segments": segments, "language": result.get("language")}
+
+# Long-lived pools, one per (model_size, device, workers), so worker models stay resident
+_pools = {}
+_pools_lock = threading.Lock()
+
+def get_whisper_pool(model_size, device='cpu', num_workers=WHISPER_WORKERS):
+    key = (model_size, device, num_workers)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            num_threads = max(1, (os.cpu_count() or 1) // num_workers)
+            pool = ProcessPoolExecutor(
+                max_workers=num_workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker,
+                initargs=(model_size, device, num_threads),
+            )
+            _pools[key] = pool
+        return pool
+
+# Function to transcribe a 16 kHz mono float32 waveform with a pool of Whisper processes.
+# Returns a dict shaped like whisper's transcribe() result (text, segments, language)
+# with timestamps on the timeline of the whole waveform.
+def transcribe_parallel(waveform, sample_rate, model_size='large', device='cpu',
+                        num_workers=WHISPER_WORKERS, chunk_seconds=WHISPER_CHUNK_SECONDS, language=WHISPER_LANGUAGE):
+    chunks = split_at_silence(waveform, sample_rate, chunk_seconds)
+    pool = get_whisper_pool(model_size, device, num_workers)
+
+    shm = shared_memory.SharedMemory(create=True, size=max(1, waveform.nbytes))
+    try:
+        np.ndarray(waveform.shape, dtype=np.float32, buffer=shm.buf)[:] = waveform
+        futures = [
+            pool.submit(_transcribe_chunk, shm.name, len(waveform), sample_rate, start, end, language)
+            for start, end in chunks
+        ]
+        results = [future.result() for future in futures]
+    finally:
+        shm.close()
+        shm.unlink()
+
+    segments = []
+    for result in results:
+        segments.extend(result["segments"])
+    segments.sort(key=lambda segment: segment["start"])
+    for i, segment in enumerate(segments):
+        segment["id"] = i
+
+    return {
+        "text": ''.join(segment["text"] for segment in segments),
+        "segments": segments,
+        "language": results[0]["language"] if results else language,
+    }
@@ -0,0 +1,236 @@
+import os
+import time
+import random
+import logging
+import threading
+from collections import deque
+from types import SimpleNamespace
+import httpx
+
+# Process-wide access to Deepgram and OpenAI: one pooled HTTP client per process (kept
+# across Streamlit reruns and sessions), token-bucket limits on requests and tokens per
+# minute shared by every caller, and retries with exponential backoff and full jitter on
+# rate limits, server errors and dropped connections.
+
+# Constants
+DEEPGRAM_API_URL = os.getenv("DEEPGRAM_API_URL", "https://api.deepgram.com")
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "20"))
+DEEPGRAM_REQUESTS_PER_MINUTE = float(os.getenv("DEEPGRAM_REQUESTS_PER_MINUTE", "100"))
+OPENAI_REQUESTS_PER_MINUTE = float(os.getenv("OPENAI_REQUESTS_PER_MINUTE", "3500"))
+OPENAI_TOKENS_PER_MINUTE = float(os.getenv("OPENAI_TOKENS_PER_MINUTE", "90000"))
+PROVIDER_MAX_RETRIES = int(os.getenv("PROVIDER_MAX_RETRIES", "5"))
+PROVIDER_BACKOFF_SECONDS = float(os.getenv("PROVIDER_BACKOFF_SECONDS", "1.0"))
+PROVIDER_BACKOFF_MAX_SECONDS = float(os.getenv("PROVIDER_BACKOFF_MAX_SECONDS", "30"))
+RETRYABLE_STATUS = (408, 409, 429, 500, 502, 503, 504)
+WAIT_SAMPLES = 1000
+
+logger = logging.getLogger(__name__)
+
+# Token bucket refilled continuously at rate_per_minute, holding at most one minute's worth
+class TokenBucket:
+    def __init__(self, rate_per_minute, capacity=None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or rate_per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    # Function to take `amount` tokens, sleeping until they are available. Requests larger
+    # than the bucket are let through once it is full. Returns the seconds waited.
+    def acquire(self, amount=1.0):
+        amount = min(amount, self.capacity)
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return waited
+                delay = (amount - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+# Rate limits and metrics of one provider. Every call goes through acquire() (the queue
+# wait is recorded) and call() (retries are counted).
+class ProviderLimiter:
+    def __init__(self, name, requests_per_minute, tokens_per_minute=None):
+        self.name = name
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.waits = deque(maxlen=WAIT_SAMPLES)
+        self.counters = {"calls": 0, "retries": 0, "rate_limited": 0, "errors": 0}
+        self._lock = threading.Lock()
+
+    # Function to wait for a request slot (and `tokens` tokens); returns the seconds waited
+    def acquire(self, tokens=0):
+        waited = self.requests.acquire(1)
+        if self.tokens is not None and tokens:
+            waited += self.tokens.acquire(tokens)
+        with self._lock:
+            self.waits.append(waited)
+        return waited
+
+    def count(self, counter):
+        with self._lock:
+            self.counters[counter] += 1
+
+    # Function to run fn() within the limits, retrying retryable errors with backoff
+    def call(self, fn, tokens=0, max_retries=PROVIDER_MAX_RETRIES):
+        self.count("calls")
+        for attempt in range(max_retries + 1):
+            self.acquire(tokens)
+            try:
+                return fn()
+            except Exception as e:
+                status = error_status(e)
+                if status == 429:
+                    self.count("rate_limited")
+                if attempt == max_retries or not is_retryable(e):
+                    self.count("errors")
+                    raise
+                delay = backoff_delay(attempt, retry_after(e))
+                self.count("retries")
+                logger.warning("%s call failed (%s), retrying in %.1f seconds", self.name, status or type(e).__name__, delay)
+                time.sleep(delay)
+
+    def stats(self):
+        with self._lock:
+            waits = sorted(self.waits)
+            counters = dict(self.counters)
+        return {
+            **counters,
+            "wait_mean": sum(waits) / len(waits) if waits else 0.0,
+            "wait_p95": waits[int(0.95 * (len(waits) - 1))] if waits else 0.0,
+            "wait_max": waits[-1] if waits else 0.0,
+        }
+
+# Function to read the HTTP status of a provider error (httpx or the OpenAI SDK), if any
+def error_status(error):
+    status = getattr(error, "status_code", None)
+    if status is None and getattr(error, "response", None) is not None:
+        status = getattr(error.response, "status_code", None)
+    return status
+
+# Function to read the Retry-After header of a provider error, in seconds
+def retry_after(error):
+    response = getattr(error, "response", None)
+    try:
+        return float(response.headers.get("retry-after"))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+def is_retryable(error):
+    status = error_status(error)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    # Timeouts and dropped connections (the OpenAI SDK wraps them in APIConnectionError)
+    return isinstance(error, httpx.TransportError) or type(error).__name__ in ('APIConnectionError', 'APITimeoutError')
+
+# Function to compute the delay before retry number `attempt`: exponential backoff with
+# full jitter, but never shorter than the provider's Retry-After
+def backoff_delay(attempt, retry_after_seconds=None,
+                  base=PROVIDER_BACKOFF_SECONDS, max_delay=PROVIDER_BACKOFF_MAX_SECONDS):
+    delay = random.uniform(0, min(max_delay, base * 2 ** attempt))
+    if retry_after_seconds:
+        delay = max(delay, min(retry_after_seconds, max_delay))
+    return delay
+
+# Process-wide HTTP client and limiters
+_http_client = None
+_limiters = {}
+_clients = {}
+_lock = threading.Lock()
+
+# Function to get the pooled HTTP client shared by both providers
+def get_http_client():
+    global _http_client
+    with _lock:
+        if _http_client is None:
+            _http_client = httpx.Client(
+                limits=httpx.Limits(max_connections=HTTP_MAX_CONNECTIONS, max_keepalive_connections=HTTP_MAX_CONNECTIONS),
+                timeout=httpx.Timeout(300.0, connect=10.0),
+            )
+        return _http_client
+
+# Function to get the limiter of a provider ('deepgram' or 'openai')
+def get_limiter(name):
+    with _lock:
+        limiter = _limiters.get(name)
+        if limiter is None:
+            if name == 'openai':
+                limiter = ProviderLimiter(name, OPENAI_REQUESTS_PER_MINUTE, OPENAI_TOKENS_PER_MINUTE)
+            else:
+                limiter = ProviderLimiter(name, DEEPGRAM_REQUESTS_PER_MINUTE)
+            _limiters[name] = limiter
+        return limiter
+
+# Function to report the metrics of every provider that has been called
+def provider_stats():
+    with _lock:
+        limiters = dict(_limiters)
+    return {name: limiter.stats() for name, limiter in limiters.items()}
+
+class _RestResponse:
+    def __init__(self, data):
+        self._data = data
+
+    def to_dict(self):
+        return self._data
+
+class _RestPrerecorded:
+    def __init__(self, client):
+        self._client = client
+
+    def v(self, version):
+        return self
+
+    def transcribe_file(self, payload, options=None, timeout=None, **kwargs):
+        return _RestResponse(self._client.transcribe(payload["buffer"], options, timeout))
+
+# Deepgram prerecorded transcription over the shared HTTP client. The SDK opens a new
+# connection for every request; this keeps the interface this app uses
+# (listen.prerecorded.v("1").transcribe_file) and reuses pooled connections instead.
+class DeepgramRestClient:
+    def __init__(self, api_key, base_url=DEEPGRAM_API_URL, http_client=None):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip('/')
+        self.http_client = http_client or get_http_client()
+        self.listen = SimpleNamespace(prerecorded=_RestPrerecorded(self))
+
+    def transcribe(self, buffer_data, options=None, timeout=None):
+        options = options.to_dict() if hasattr(options, "to_dict") else dict(options or {})
+        params = {key: str(value).lower() if isinstance(value, bool) else value
+                  for key, value in options.items() if value is not None}
+        response = self.http_client.post(
+            f"{self.base_url}/v1/listen",
+            params=params,
+            content=bytes(buffer_data),
+            headers={"Authorization": f"Token {self.api_key}", "Content-Type": "application/octet-stream"},
+            timeout=timeout or httpx.USE_CLIENT_DEFAULT,
+        )
+        response.raise_for_status()
+        return response.json()
+
+# Function to get the process-wide Deepgram client
+def get_deepgram_client(api_key):
+    http_client = get_http_client()
+    with _lock:
+        client = _clients.get('deepgram')
+        if client is None:
+            client = _clients['deepgram'] = DeepgramRestClient(api_key, http_client=http_client)
+    return client
+
+# Function to get the process-wide OpenAI client on the shared HTTP client. The SDK's own
+# retries are turned off because ProviderLimiter.call retries in coordination with the limits.
+def get_openai_client(api_key):
+    from openai import OpenAI
+    http_client = get_http_client()
+    with _lock:
+        client = _clients.get('openai')
+        if client is None:
+            client = _clients['openai'] = OpenAI(api_key=api_key, base_url=OPENAI_BASE_URL,
+                                                 http_client=http_client, max_retries=0)
+    return client
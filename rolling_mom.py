@@ -0,0 +1,131 @@
+import os
+import re
+import json
+import threading
+from datetime import datetime
+from chunked_mom import count_tokens, split_turns
+
+# Incremental minutes for transcripts that keep growing (live capture, appended recordings,
+# follow-up sessions). Instead of sending the whole transcript again, a compact running
+# state (summary, decisions, action items) is kept and only the new turns are folded into
+# it, so every update costs tokens in proportion to the new text plus the bounded state.
+
+# Constants
+ROLLING_MOM_DELTA_TOKENS = int(os.getenv("ROLLING_MOM_DELTA_TOKENS", "1500"))
+ROLLING_MOM_SUMMARY_WORDS = int(os.getenv("ROLLING_MOM_SUMMARY_WORDS", "250"))
+ROLLING_MOM_MAX_TOKENS = 1000
+ACTION_ITEM_FIELDS = ("person", "task", "status", "deadline")
+JSON_OBJECT = re.compile(r'\{.*\}', re.DOTALL)
+
+# Function to create an empty running state
+def empty_state():
+    return {"summary": "", "decisions": [], "action_items": []}
+
+# Function to create the prompt that folds a transcript delta into the running state
+def create_update_prompt(state, delta, language='english'):
+    current_date = datetime.now().strftime("%d-%m-%Y")
+    prompt = f"""
+    You are maintaining the minutes of a meeting that is still going on. Below is the current state of the minutes as JSON, followed by the next part of the transcript. Update the state with what is said in the new part: rewrite the summary so it covers the whole meeting in at most {ROLLING_MOM_SUMMARY_WORDS} words, add new decisions, add new action items and update the status or deadline of existing ones instead of repeating them. Today is {current_date}. Identify the speaker names from the transcript.
+
+    Write the values in {language} only. Return the updated state as JSON only, with the keys "summary" (string), "decisions" (list of strings) and "action_items" (list of objects with the keys "person", "task", "status" and "deadline").
+
+    Current state:
+    {json.dumps(state, ensure_ascii=False)}
+
+    New part of the transcript:
+    {delta}
+    """
+    return prompt
+
+# Function to read the state back from a completion. Raises ValueError if it is not a
+# state object, in which case the caller keeps the previous state.
+def parse_state(text):
+    match = JSON_OBJECT.search(text or '')
+    if match is None:
+        raise ValueError("The minutes update did not contain a JSON object")
+    data = json.loads(match.group(0))
+    if not isinstance(data, dict):
+        raise ValueError("The minutes update is not a JSON object")
+    state = empty_state()
+    state["summary"] = str(data.get("summary") or '')
+    state["decisions"] = [str(decision) for decision in data.get("decisions") or [] if decision]
+    for item in data.get("action_items") or []:
+        if isinstance(item, dict):
+            state["action_items"].append({field: str(item.get(field) or '') for field in ACTION_ITEM_FIELDS})
+    return state
+
+# Function to render a state as minutes (markdown), without another model call
+def render_minutes(state):
+    lines = ["## Summary", "", state["summary"] or "Nothing has been discussed yet."]
+    if state["decisions"]:
+        lines += ["", "## Decisions", ""] + [f"- {decision}" for decision in state["decisions"]]
+    if state["action_items"]:
+        lines += ["", "## Action items", "", "| Person | Task | Status | Deadline |", "|---|---|---|---|"]
+        for item in state["action_items"]:
+            cells = [item[field].replace('|', '/') for field in ACTION_ITEM_FIELDS]
+            lines.append(f"| {' | '.join(cells)} |")
+    return '\n'.join(lines)
+
+# Rolling minutes of one growing transcript. `complete_fn(prompt)` is a single-prompt
+# completion call. The state and the number of turns already folded in can be saved with
+# to_dict() and restored with from_dict() to continue in a follow-up session.
+class RollingMinutes:
+    def __init__(self, complete_fn, language='english', delta_tokens=ROLLING_MOM_DELTA_TOKENS,
+                 state=None, consumed_turns=0):
+        self.complete_fn = complete_fn
+        self.language = language
+        self.delta_tokens = delta_tokens
+        self.state = state or empty_state()
+        self.consumed_turns = consumed_turns
+        self.updates = 0
+        self.prompt_tokens = 0
+        self._lock = threading.Lock()
+
+    # Function to group the new turns into deltas of at most delta_tokens each
+    def _deltas(self, turns):
+        deltas = []
+        current = []
+        current_tokens = 0
+        for turn in turns:
+            turn_tokens = count_tokens(turn)
+            if current and current_tokens + turn_tokens > self.delta_tokens:
+                deltas.append(current)
+                current = []
+                current_tokens = 0
+            current.append(turn)
+            current_tokens += turn_tokens
+        if current:
+            deltas.append(current)
+        return deltas
+
+    # Function to fold the turns of `transcript` that are not in the state yet. Unless
+    # final=True the last turn is left out, since the speaker may still be talking.
+    # Returns the number of turns folded in.
+    def update(self, transcript, final=False):
+        with self._lock:
+            turns = split_turns(transcript)
+            if not final:
+                turns = turns[:-1]
+            folded = 0
+            for delta in self._deltas(turns[self.consumed_turns:]):
+                prompt = create_update_prompt(self.state, '\n\n'.join(delta), self.language)
+                self.prompt_tokens += count_tokens(prompt)
+                self.updates += 1
+                # The turns are only marked as consumed once the new state has been parsed,
+                # so a malformed answer is retried with the next update
+                self.state = parse_state(self.complete_fn(prompt))
+                self.consumed_turns += len(delta)
+                folded += len(delta)
+            return folded
+
+    # Function to fold in everything that is left and render the minutes
+    def finish(self, transcript):
+        self.update(transcript, final=True)
+        return render_minutes(self.state)
+
+    def to_dict(self):
+        return {"language": self.language, "state": self.state, "consumed_turns": self.consumed_turns}
+
+    @classmethod
+    def from_dict(cls, data, complete_fn, delta_tokens=ROLLING_MOM_DELTA_TOKENS):
+        return cls(complete_fn, data["language"], delta_tokens, data["state"], data["consumed_turns"])
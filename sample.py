@@ -1,104 +1,23 @@
-import os
 import streamlit as st
-import logging
-from dotenv import load_dotenv
-from datetime import datetime
-import httpx
-import json
-from deepgram import DeepgramClient, DeepgramClientOptions, PrerecordedOptions
-from openai import OpenAI
 import time
-
-# Load environment variables
-load_dotenv()
+import json
+import datetime
+from transcription_cache import get_transcription_cache
+from completion_cache import get_completion_cache
+from mom_pipeline import run_translation_and_mom, stream_translation_and_mom
+from transcript_builder import create_transcript
+from chunked_mom import MOM_CHUNK_TOKENS, MOM_MAX_CONCURRENCY
+from mom_core import transcribe_audio, translate_text, create_structured_minutes, name_speakers, needs_translation
+from structured_mom import render_minutes
+from meeting_archive import get_meeting_archive
+from stage_results import StageResults, audio_hash
+from word_table import WordTable, memory_report
+from provider_clients import provider_stats
+from telemetry import span, start_metrics_server
+from job_queue import get_job_store, get_worker_pool, DONE, FAILED, FINISHED_STATES
 
 # Constants
-API_KEY = os.getenv("DG_API_KEY")
-OPENAI_API_KEY = os.getenv("OPEN_AI_TOKEN")
-MIMETYPE = 'mp3'
-TAG = 'SPEAKER '
-SEPARATOR = '--------------------------'
-
-# Initialize Deepgram client
-deepgram_client = DeepgramClient(API_KEY, DeepgramClientOptions(verbose=logging.DEBUG))
-
-# Initialize OpenAI client
-openai_client = OpenAI(api_key=OPENAI_API_KEY)
-
-# Function to transcribe an audio file
-def transcribe_audio(file):
-    buffer_data = file.read()
-    payload = {"buffer": buffer_data}
-    options = PrerecordedOptions(
-        model="nova-2",
-        smart_format=True,
-        utterances=True,
-        punctuate=True,
-        diarize=True,
-    )
-
-    response = deepgram_client.listen.prerecorded.v("1").transcribe_file(payload, options, timeout=httpx.Timeout(300.0, connect=10.0))
-    return response.to_dict()
-
-# Function to create a transcript from JSON response
-def create_transcript(response):
-    lines = []
-    words = response["results"]["channels"][0]["alternatives"][0]["words"]
-    curr_speaker = 0
-    curr_line = ''
-    for word_struct in words:
-        word_speaker = word_struct["speaker"]
-        word = word_struct["punctuated_word"]
-        if word_speaker == curr_speaker:
-            curr_line += ' ' + word
-        else:
-            tag = TAG + str(curr_speaker) + ':'
-            full_line = tag + curr_line + '\n'
-            curr_speaker = word_speaker
-            lines.append(full_line)
-            curr_line = ' ' + word
-    lines.append(TAG + str(curr_speaker) + ':' + curr_line)
-    return '\n'.join(lines)
-
-# Function to translate text using OpenAI's GPT
-def translate_text(text, target_language):
-    if(target_language!='english'):
-        sub_prompt =f' Translate the following diarized output to {target_language}'
-    else:
-        sub_prompt =''
- 
-    print("text is ",text)
-    #prompt = f"Translate the following text to {target_language}:\n\n{text}.Instead of 'SPEAKER 0' and 'SPEAKER 1' in text give names Gokul and Avinash. All words should be generated in provided language - {target_language} only"
-    prompt = sub_prompt+f"\n{text}"+f"\n\nThis is the output text having only 2 speakers from a diarization model .Find the person names from the output text given here and replace the speaker ids like SPEAKER 0,SPEAKER 1 etc with corresponding person names.For example: Gokul: 'Okay. Yeah. Hi. I'm Gokul, and I'm I'm into the data science team from Experion.'\n\n\n'Avinash: 'Hi. I'm Avinash, and I'm also in the data science team of Experian.' Generate complete words in {target_language}."
-    
-    print("prompt is",prompt)
-    response = openai_client.chat.completions.create(
-        model="gpt-3.5-turbo",
-        messages=[{"role": "user", "content": prompt}],
-        max_tokens=2000
-    )
-    return response.choices[0].message.content
-
-# Function to create a prompt for the MoM generator
-def create_prompt(transcript, language='english'):
-    current_date = datetime.now().strftime("%d-%m-%Y")
-    prompt = f"""
-    You are a MoM generator from the following transcript. Take the below conversation from a meeting and generate the minutes of the meeting and create a detailed table containing the list of tasks assigned to each person, the status of each task, and the deadlines. Write dates as well in the output table. Today is {current_date}. Identify the speaker names from the meeting transcript.
-    
-    Generate the Minutes of Meeting in {language} only.
-
-    {transcript}
-    """
-    return prompt
-
-# Function to generate MoM using OpenAI's GPT
-def generate_mom(prompt):
-    response = openai_client.chat.completions.create(
-        model="gpt-3.5-turbo", 
-        messages=[{"role": "user", "content": prompt}], 
-        max_tokens=1000
-    )
-    return response.choices[0].message.content
+JOB_POLL_SECONDS = 2
 
 # Streamlit app
 st.set_page_config(page_title="Minutes of Meeting Generator", page_icon="👄")
@@ -137,6 +56,13 @@ st.text("")
 transcript = None
 translated_transcript = None
 mom = None
+minutes = None
+word_table = None
+speaker_names = {}
+
+# Start the process-wide background workers and the metrics endpoint (once per process, not per rerun)
+get_worker_pool()
+start_metrics_server()
 
 with st.form(key="my_form"):
     # File upload
@@ -145,6 +71,23 @@ with st.form(key="my_form"):
     # Language selection
     language = st.selectbox("Select the language for MoM:", ["English", "Japanese"])
 
+    # Skip the transcription cache and always send the audio to Deepgram
+    bypass_cache = st.checkbox("Re-transcribe (ignore cached transcription)", value=False)
+
+    # Cut long silences out of the recording before it is sent to Deepgram
+    vad_enabled = st.checkbox("Trim silence before transcription", value=False)
+
+    # Long meetings are summarized in chunks of at most this many tokens, several at a time
+    with st.expander("Long meeting settings"):
+        chunk_tokens = st.number_input("Tokens per transcript chunk", min_value=500, max_value=12000, value=MOM_CHUNK_TOKENS, step=500)
+        max_concurrency = st.number_input("Chunks summarized in parallel", min_value=1, max_value=16, value=MOM_MAX_CONCURRENCY)
+
+    # Show the minutes and the translated transcript while they are being generated
+    stream_output = st.checkbox("Stream output as it is generated", value=True)
+
+    # Queue the recording for the background workers instead of processing it in this session
+    run_in_background = st.checkbox("Process in the background", value=False)
+
     st.info(
         f"""
         👆 Upload a .mp3 / .wav file. Try a sample: [Sample 01](https://github.com/arjunaju123/MoM-generation-app-using-Deepgram-and-GPT/blob/master/test_audio.mp3?raw=true) | [Sample 02](https://github.com/arjunaju123/MoM-generation-app-using-Deepgram-and-GPT/blob/master/test_audio.wav?raw=true)
@@ -152,42 +95,185 @@ with st.form(key="my_form"):
     )
 
     submit_button = st.form_submit_button(label="Generate Minutes of Meeting")
-    if submit_button and uploaded_file is not None:
-        with st.status("Transcribing and generating MoM...",expanded=True) as status:
+    if submit_button and uploaded_file is not None and run_in_background:
+        # The job ID is kept in the session and in the URL, so the results survive
+        # reruns and a browser refresh
+        job_id = get_job_store().submit(
+            "deepgram",
+            uploaded_file.getvalue(),
+            uploaded_file.name,
+            {
+                "language": language,
+                "use_cache": not bypass_cache,
+                "vad": vad_enabled,
+                "chunk_tokens": int(chunk_tokens),
+                "max_concurrency": int(max_concurrency),
+                "title": uploaded_file.name,
+            },
+        )
+        st.session_state["job_id"] = job_id
+        st.query_params["job"] = job_id
+        st.session_state.pop("displayed_results", None)
+    elif submit_button and uploaded_file is not None:
+        st.session_state.pop("job_id", None)
+        st.query_params.pop("job", None)
+        # Stage results are kept in the session: a stage only runs again when its own
+        # inputs or an upstream stage changed (audio -> transcript -> translation / MoM)
+        results = StageResults(st.session_state.setdefault("stage_results", {}))
+        upload_hash = audio_hash(uploaded_file.getvalue())
+        transcript_key = results.key("transcript", audio=upload_hash, vad=vad_enabled)
+        if bypass_cache:
+            results.discard("transcript")
+        with st.status("Transcribing and generating MoM...",expanded=True) as status, span("deepgram_pipeline") as pipeline_span:
             try:
-                # Transcribe the audio file
-                start_time = time.time()
-                st.write("Transcribing audio...")
-                response = transcribe_audio(uploaded_file)
-                
-                # Create the transcript
-                transcript = create_transcript(response)
-                transcribe_time = time.time() - start_time
-                # Translate the transcript if the selected language is not English
-                if language != 'english':
-                    translated_transcript = translate_text(transcript, language)
+                transcript = results.get("transcript", transcript_key)
+                if transcript is not None:
+                    st.write("Using the transcript of the previous run")
                 else:
-                    translated_transcript = transcript
+                    # Transcribe the audio file
+                    start_time = time.time()
+                    st.write("Transcribing audio...")
+                    response = transcribe_audio(uploaded_file, use_cache=not bypass_cache, vad=vad_enabled)
 
-                st.write(f"Time taken to transcribe: {transcribe_time:.2f} seconds")
+                    # Create the transcript
+                    with span("create_transcript"):
+                        transcript = create_transcript(response)
+                    # Replace the SPEAKER tags with the names people introduce themselves with
+                    transcript = name_speakers(transcript, use_cache=not bypass_cache, names=speaker_names)
+                    results.put("transcript", transcript_key, transcript)
+                    results.put("names", transcript_key, speaker_names)
+                    # The word timings are kept as a compact word table for seeking the player
+                    word_table = results.put("words", transcript_key, WordTable.from_response(response))
+                    transcribe_time = time.time() - start_time
 
-                # Create prompt for MoM generation
-                prompt = create_prompt(translated_transcript, language)
-                
-                st.write("Generating MoM...")
-                start_time = time.time()
-                # Generate MoM
-                mom = generate_mom(prompt)
-                generate_mom_time = time.time() - start_time
-                st.write(f"Time taken to generate MoM: {generate_mom_time:.2f} seconds")
+                    st.write(f"Time taken to transcribe: {transcribe_time:.2f} seconds")
+                    cache_stats = get_transcription_cache().stats()
+                    st.write(f"Transcription cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses")
+                    words_memory = memory_report(response, word_table)
+                    st.write(f"Word timings: {words_memory['words']} words in {words_memory['table_bytes'] / 1e6:.2f} MB "
+                             f"({words_memory['dict_bytes'] / 1e6:.1f} MB as dicts)")
+                    vad_stats = response.get("metadata", {}).get("vad")
+                    if vad_stats:
+                        st.write(f"Silence removed before transcription: {vad_stats['removed_seconds']:.1f} seconds")
+
+                # The downstream stages are keyed by the transcript text itself, so a re-transcription
+                # that changes the transcript never reuses a translation or MoM of the old one
+                transcript_hash = audio_hash(transcript.encode('utf-8'))
+                translation_key = results.key("translation", transcript=transcript_hash, language=language)
+                mom_key = results.key("mom", transcript=transcript_hash, language=language, chunk_tokens=int(chunk_tokens))
+
+                # English minutes need no translation; otherwise reuse a translation that is still valid
+                translate = needs_translation(language)
+                translated_transcript = results.get("translation", translation_key) if translate else transcript
+                minutes = results.get("mom", mom_key)
+                if translated_transcript is not None and minutes is not None:
+                    st.write("Using the translation and MoM of the previous run")
+                else:
+                    # Translate the transcript (if needed) and generate the MoM concurrently
+                    st.write("Generating MoM...")
+                    # The minutes are generated as JSON and shown rendered once they are complete
+                    previous_minutes = minutes
+                    if previous_minutes is not None:
+                        mom_fn = lambda text, lang, on_token=None: previous_minutes
+                    else:
+                        mom_fn = lambda text, lang, on_token=None: create_structured_minutes(text, lang, int(chunk_tokens), int(max_concurrency), on_token)
+                    cached_translation = translated_transcript
+                    translate = cached_translation is None
+                    if stream_output:
+                        # Render the tokens as they arrive
+                        previews = {"generate_mom": st.empty(), "translate_text": st.empty()}
+                        streamed = {"generate_mom": '', "translate_text": ''}
+                        for stage, delta in stream_translation_and_mom(
+                            transcript,
+                            language,
+                            translate_text,
+                            mom_fn,
+                            translate=translate,
+                        ):
+                            if stage == "done":
+                                translated_transcript, minutes, timings = delta
+                                break
+                            streamed[stage] += delta
+                            previews[stage].info(streamed[stage])
+                        for preview in previews.values():
+                            preview.empty()
+                    else:
+                        translated_transcript, minutes, timings = run_translation_and_mom(
+                            transcript,
+                            language,
+                            translate_text,
+                            mom_fn,
+                            translate=translate,
+                        )
+                    # Without translating, the pipeline hands back the untranslated transcript
+                    if translate:
+                        results.put("translation", translation_key, translated_transcript)
+                    else:
+                        translated_transcript = cached_translation
+                    results.put("mom", mom_key, minutes)
+                    # Archived for search across meetings; the same meeting replaces its earlier copy
+                    get_meeting_archive().add_meeting(uploaded_file.name, language, translated_transcript, minutes)
+                    st.write(f"Time taken to generate MoM: {timings['generate_mom']:.2f} seconds")
+                    if 'generate_mom_ttft' in timings:
+                        st.write(f"Time to first token of MoM: {timings['generate_mom_ttft']:.2f} seconds")
+                    if 'translate_text' in timings:
+                        st.write(f"Time taken to translate transcript: {timings['translate_text']:.2f} seconds")
+                    if 'translate_text_ttft' in timings:
+                        st.write(f"Time to first token of translation: {timings['translate_text_ttft']:.2f} seconds")
+                    completion_stats = get_completion_cache().stats()
+                    st.write(f"Completion cache: {completion_stats['hits']} hits, {completion_stats['misses']} misses")
+                    st.write(f"Time taken for translation and MoM (in parallel): {timings['translation_and_mom']:.2f} seconds")
+                    for provider, stats in provider_stats().items():
+                        st.write(f"{provider.capitalize()} rate limiter: {stats['wait_mean']:.2f} s mean / {stats['wait_max']:.2f} s max queue wait, {stats['retries']} retries")
 
+                # Keep what is displayed, so later reruns (any widget interaction) still show it
+                mom = render_minutes(minutes)
+                word_table = results.get("words", transcript_key)
+                speaker_names = results.get("names", transcript_key) or {}
+                st.session_state["displayed_results"] = (upload_hash, language, translated_transcript, mom, minutes, word_table, speaker_names)
                 status.update(label="Transcription and Generation Completed!", state="complete", expanded=False)
             except Exception as e:
+                # Shown here instead of raised, so the trace is marked as failed explicitly
+                pipeline_span.fail(e)
                 st.error(f"Error: {e}")
 
+# Show the results of the last run again after a rerun, as long as the same recording is uploaded
+if mom is None and uploaded_file is not None and "displayed_results" in st.session_state:
+    displayed_hash, *displayed = st.session_state["displayed_results"]
+    if displayed_hash == audio_hash(uploaded_file.getvalue()):
+        language, translated_transcript, mom, minutes, word_table, speaker_names = displayed
+
+# Pick up the state of the background job, if there is one
+job = None
+job_id = st.session_state.get("job_id") or st.query_params.get("job")
+if job_id:
+    job = get_job_store().get(job_id)
+    if job is None:
+        st.warning(f"Job {job_id} was not found.")
+    elif job["status"] == DONE:
+        translated_transcript = job["result"]["translated_transcript"]
+        mom = job["result"]["mom"]
+        minutes = job["result"].get("minutes")
+        language = job["params"]["language"]
+    elif job["status"] == FAILED:
+        st.error(f"Error: {job['error']}")
+    else:
+        st.info(f"Job {job_id} is {job['status']}: {job['progress'] or 'waiting for a worker'}")
+
 # Display the audio player, translated transcript, and MoM if available
-if uploaded_file:
+if uploaded_file and word_table is not None and len(word_table):
+    # Seek the player to the start of the speaker turn at the chosen time
+    seek_seconds = st.slider("Jump to", 0, int(word_table.end[-1]), 0, format="%d s")
+    turn = word_table.turn_at(seek_seconds)
+    start_time = int(turn.start) if turn is not None else 0
+    st.audio(uploaded_file, format="audio/mp3", start_time=start_time)
+    if turn is not None:
+        speaker = speaker_names.get(str(turn.speaker), f"SPEAKER {turn.speaker}")
+        st.caption(f"{speaker} at {datetime.timedelta(seconds=start_time)}: {turn.text[:300]}")
+elif uploaded_file:
     st.audio(uploaded_file, format="audio/mp3")
+elif job is not None:
+    st.audio(job["input_path"])
 
 if translated_transcript:
     st.subheader(f"Diarized Transcript in {language.capitalize()}")
@@ -197,3 +283,25 @@ if mom:
     st.subheader("Minutes of Meeting")
     st.info(mom)
     st.download_button("Download Minutes of Meeting", mom, "minutes_of_meeting.txt", "text/plain")
+    if minutes:
+        st.download_button("Download as JSON", json.dumps(minutes, ensure_ascii=False, indent=2), "minutes_of_meeting.json", "application/json")
+
+# Search the archive of earlier meetings (no model calls)
+with st.expander("Search past meetings"):
+    archive_query = st.text_input("Words said in a meeting")
+    archive_owner = st.text_input("Action items assigned to")
+    archive_open_only = st.checkbox("Only open action items", value=True)
+    if archive_query:
+        for hit in get_meeting_archive().search(archive_query):
+            st.markdown(f"**{hit['title']}** ({hit['speaker'] or 'unknown speaker'}): {hit['snippet']}")
+    if archive_owner:
+        items = get_meeting_archive().action_items(owner=archive_owner, open_only=archive_open_only)
+        if items:
+            st.table([{"Meeting": item["title"], "Task": item["task"], "Status": item["status"].replace('_', ' '), "Deadline": item["deadline"] or '-'} for item in items])
+        else:
+            st.write("No action items found.")
+
+# Poll until the background job has finished
+if job is not None and job["status"] not in FINISHED_STATES:
+    time.sleep(JOB_POLL_SECONDS)
+    st.rerun()
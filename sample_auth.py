@@ -65,7 +65,7 @@ def create_transcript(response):
 
 # Function to translate text using OpenAI's GPT
 def translate_text(text, target_language):
-    if(target_language!='english'):
+    if(target_language.lower()!='english'):
         sub_prompt =f' Translate the following diarized output to {target_language}'
     else:
         sub_prompt =''
@@ -238,7 +238,7 @@ if authenticate_user():
                     transcript = create_transcript(response)
                     transcribe_time = time.time() - start_time
                     # Translate the transcript if the selected language is not English
-                    if language != 'english':
+                    if language.lower() != 'english':
                         translated_transcript = translate_text(transcript, language)
                     else:
                         translated_transcript = transcript
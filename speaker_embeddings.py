@@ -0,0 +1,42 @@
+import os
+import numpy as np
+import torch
+
+# Constants
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "32"))
+EMBEDDING_DIM = 192
+
+# Function to convert Whisper segments to sample ranges of the decoded waveform
+def segment_sample_ranges(segments, num_samples, sample_rate):
+    starts = np.array([segment["start"] for segment in segments], dtype=np.float64)
+    ends = np.array([segment["end"] for segment in segments], dtype=np.float64)
+    starts = np.clip(np.round(starts * sample_rate), 0, num_samples).astype(np.int64)
+    ends = np.clip(np.round(ends * sample_rate), 0, num_samples).astype(np.int64)
+    return starts, np.maximum(starts, ends)
+
+# Function to embed every segment of a decoded waveform in batches.
+# Segments are sorted by length so each batch is padded only up to its own longest
+# segment, and the padding is masked out so it does not change the embeddings.
+# Slicing the waveform creates views; the only copy is into the padded batch buffer.
+def compute_embeddings(embedding_model, waveform, sample_rate, segments, batch_size=EMBEDDING_BATCH_SIZE):
+    embeddings = np.zeros(shape=(len(segments), EMBEDDING_DIM))
+    if not segments:
+        return embeddings
+
+    starts, ends = segment_sample_ranges(segments, len(waveform), sample_rate)
+    lengths = ends - starts
+    order = np.argsort(lengths, kind='stable')
+
+    for batch_start in range(0, len(order), batch_size):
+        batch = order[batch_start:batch_start + batch_size]
+        max_length = max(int(lengths[batch].max()), 1)
+        waveforms = np.zeros((len(batch), 1, max_length), dtype=np.float32)
+        masks = np.zeros((len(batch), max_length), dtype=np.float32)
+        for row, index in enumerate(batch):
+            clip = waveform[starts[index]:ends[index]]
+            waveforms[row, 0, :len(clip)] = clip
+            masks[row, :len(clip)] = 1.0
+
+        embeddings[batch] = embedding_model(torch.from_numpy(waveforms), masks=torch.from_numpy(masks))
+
+    return embeddings
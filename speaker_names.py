@@ -0,0 +1,158 @@
+import os
+import re
+import json
+from collections import Counter, defaultdict
+from chunked_mom import count_tokens, split_turns
+
+# Speaker names without sending the transcript to the LLM. Diarized transcripts tag turns
+# as "SPEAKER 0", "SPEAKER 1", ...; people usually introduce themselves early on ("Hi, I'm
+# Gokul, and ..."), so the first turns are scanned for introductions. Only the speakers the
+# local pass cannot settle (conflicting or missing introductions) are sent to the LLM, as
+# a short excerpt of their first turns. The tags are then replaced deterministically.
+
+# Constants
+SPEAKER_NAME_SCAN_TURNS = int(os.getenv("SPEAKER_NAME_SCAN_TURNS", "30"))
+SPEAKER_NAME_EXCERPT_TOKENS = int(os.getenv("SPEAKER_NAME_EXCERPT_TOKENS", "500"))
+SPEAKER_NAME_LLM = os.getenv("SPEAKER_NAME_LLM", "1") == "1"
+SPEAKER_NAME_MAX_TOKENS = 100
+EXCERPT_TURNS_PER_SPEAKER = 3
+EXCERPT_WORDS_PER_TURN = 60
+
+# "SPEAKER 0: text" (Deepgram layout) or "SPEAKER 0 0:01:02\ntext" (Whisper layout)
+TAGGED_TURN = re.compile(r'^SPEAKER (\d+)(?::\s*| [\d:]+\n)')
+SPEAKER_TAG = re.compile(r'^SPEAKER (\d+)(?=:| [\d:]+\n)', re.MULTILINE)
+NAME = r"([A-ZÀ-Þ][a-zà-ÿ]+(?:[ -][A-ZÀ-Þ][a-zà-ÿ]+)?)"
+INTRODUCTIONS = [
+    re.compile(r"\b(?:I'm|I am|[Mm]y name is|[Mm]y name's|[Tt]his is|[Ii]t's)\s+" + NAME),
+    re.compile(r"(?:^|[.!?]\s+)(?:(?:Hi|Hello|Hey)[,.!]?\s+)?" + NAME + r"\s+here\b"),
+]
+JSON_OBJECT = re.compile(r'\{.*\}', re.DOTALL)
+
+# Capitalized words that follow "I'm" / "This is" without being names
+NOT_NAMES = {
+    "Okay", "Ok", "Yeah", "Yes", "No", "Not", "Just", "Also", "So", "Sorry", "Sure", "Fine", "Good", "Great",
+    "Glad", "Happy", "Here", "Going", "Currently", "Really", "Actually", "Basically", "Still", "Right", "Well",
+    "Working", "Looking", "Done", "Back", "Ready", "Afraid", "Thinking", "The", "That", "This", "What", "Very",
+    "In", "On", "At", "Into", "From", "With", "About", "For", "And", "But", "Now", "Today", "Again", "Monday",
+    "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday", "English", "Japanese", "Thanks", "Thank",
+}
+
+# Function to return (speaker id, text) of a transcript turn, or (None, turn) if untagged
+def parse_tagged_turn(turn):
+    match = TAGGED_TURN.match(turn)
+    if match is None:
+        return None, turn
+    return match.group(1), turn[match.end():]
+
+# Function to find the names a turn introduces its speaker with
+def find_introductions(text):
+    names = []
+    for pattern in INTRODUCTIONS:
+        for match in pattern.finditer(text):
+            words = re.split(r'[ -]', match.group(1))
+            if words[0] in NOT_NAMES:
+                continue
+            names.append(words[0] if words[-1] in NOT_NAMES else match.group(1))
+    return names
+
+# Function to resolve names from introductions in the first scan_turns turns.
+# Returns ({speaker id: name}, [speaker ids still unresolved]). A speaker is left
+# unresolved when it never introduces itself, when two names tie for it, or when another
+# speaker introduces itself with the same name.
+def resolve_local(transcript, scan_turns=SPEAKER_NAME_SCAN_TURNS):
+    candidates = defaultdict(Counter)
+    speakers = []
+    for position, turn in enumerate(split_turns(transcript)):
+        speaker, text = parse_tagged_turn(turn)
+        if speaker is None:
+            continue
+        if speaker not in speakers:
+            speakers.append(speaker)
+        if position < scan_turns:
+            candidates[speaker].update(find_introductions(text))
+
+    names = {}
+    for speaker, counts in candidates.items():
+        # "Priya" and "Priya Sharma" are the same introduction
+        for name in list(counts):
+            full_names = [other for other in counts if other.startswith(name + ' ')]
+            if len(full_names) == 1:
+                counts[full_names[0]] += counts.pop(name)
+        ranked = counts.most_common(2)
+        if ranked and (len(ranked) == 1 or ranked[0][1] > ranked[1][1]):
+            names[speaker] = ranked[0][0]
+    claimed = Counter(names.values())
+    names = {speaker: name for speaker, name in names.items() if claimed[name] == 1}
+    return names, [speaker for speaker in speakers if speaker not in names]
+
+# Function to build a short excerpt with the first turns of the unresolved speakers,
+# at most max_tokens long
+def create_excerpt(transcript, speakers, max_tokens=SPEAKER_NAME_EXCERPT_TOKENS):
+    taken = Counter()
+    lines = []
+    tokens = 0
+    for turn in split_turns(transcript):
+        speaker, text = parse_tagged_turn(turn)
+        if speaker not in speakers or taken[speaker] >= EXCERPT_TURNS_PER_SPEAKER:
+            continue
+        line = f"SPEAKER {speaker}: {' '.join(text.split()[:EXCERPT_WORDS_PER_TURN])}"
+        line_tokens = count_tokens(line)
+        if lines and tokens + line_tokens > max_tokens:
+            break
+        lines.append(line)
+        tokens += line_tokens
+        taken[speaker] += 1
+    return '\n'.join(lines)
+
+# Function to create the prompt for the speakers the local pass could not name
+def create_names_prompt(excerpt, speakers, names):
+    known = ', '.join(f"SPEAKER {speaker} is {name}" for speaker, name in names.items()) or 'none'
+    wanted = ', '.join(f'"SPEAKER {speaker}"' for speaker in speakers)
+    prompt = f"""
+    Below are the first turns of some speakers of a diarized meeting transcript. Already known: {known}. Find the person names of {wanted} from what is said (self-introductions, or being addressed by name). Use null when the name is not clear from the excerpt.
+
+    Return the speaker names as JSON only, for example {{"SPEAKER 1": "Avinash", "SPEAKER 2": null}}.
+
+    {excerpt}
+    """
+    return prompt
+
+# Function to read the names back from the completion; anything unusable is ignored
+def parse_names(text, speakers, names):
+    match = JSON_OBJECT.search(text or '')
+    if match is None:
+        return {}
+    try:
+        data = json.loads(match.group(0))
+    except ValueError:
+        return {}
+    if not isinstance(data, dict):
+        return {}
+    taken = set(names.values())
+    found = {}
+    for speaker in speakers:
+        name = data.get(f"SPEAKER {speaker}")
+        if isinstance(name, str) and 0 < len(name.strip()) <= 40 and ':' not in name and name.strip() not in taken:
+            found[speaker] = name.strip()
+            taken.add(found[speaker])
+    return found
+
+# Function to map speaker ids to names. `complete_fn(prompt)`, if given, is asked about
+# the speakers the local pass left unresolved (only an excerpt of their turns is sent).
+# Returns ({speaker id: name}, prompt tokens sent to the LLM).
+def resolve_speaker_names(transcript, complete_fn=None):
+    names, unresolved = resolve_local(transcript)
+    if not unresolved or complete_fn is None:
+        return names, 0
+    excerpt = create_excerpt(transcript, unresolved)
+    if not excerpt:
+        return names, 0
+    prompt = create_names_prompt(excerpt, unresolved, names)
+    names.update(parse_names(complete_fn(prompt), unresolved, names))
+    return names, count_tokens(prompt)
+
+# Function to replace the speaker tags of the resolved speakers with their names
+def apply_speaker_names(transcript, names):
+    if not names:
+        return transcript
+    return SPEAKER_TAG.sub(lambda match: names.get(match.group(1), match.group(0)), transcript)
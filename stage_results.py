@@ -0,0 +1,36 @@
+import json
+import hashlib
+
+# Memoized pipeline stages for one UI session. Every stage result is stored with a key
+# built from its own inputs and the keys of the stages it depends on
+# (audio -> transcript -> translation / minutes), so changing an input gives new keys for
+# exactly the stages downstream of it and everything upstream is reused. Only the latest
+# result of each stage is kept, which bounds the memory of a long-lived session.
+
+# Function to hash the bytes of a recording
+def audio_hash(buffer_data):
+    return hashlib.sha256(buffer_data).hexdigest()
+
+class StageResults:
+    # `store` is a dict-like owned by the caller, e.g. a dict kept in st.session_state
+    def __init__(self, store):
+        self.store = store
+
+    # Function to build the key of a stage from its inputs (upstream keys included)
+    def key(self, stage, **inputs):
+        data = json.dumps({"stage": stage, **inputs}, sort_keys=True, default=str)
+        return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+    # Function to return the stored result of a stage if it was computed for this key
+    def get(self, stage, key):
+        entry = self.store.get(stage)
+        if entry is not None and entry["key"] == key:
+            return entry["value"]
+        return None
+
+    def put(self, stage, key, value):
+        self.store[stage] = {"key": key, "value": value}
+        return value
+
+    def discard(self, stage):
+        self.store.pop(stage, None)
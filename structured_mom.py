@@ -0,0 +1,119 @@
+import os
+import re
+import json
+
+# Minutes as data instead of free text: the final minutes call is asked for a JSON object
+# (summary, attendees, decisions, action items with owner/status/deadline) that is checked
+# against MINUTES_SCHEMA before it is used, cached or archived. The markdown shown in the
+# UI is rendered from the data.
+
+# Constants
+STRUCTURED_MOM_MAX_TOKENS = int(os.getenv("STRUCTURED_MOM_MAX_TOKENS", "1500"))
+STATUSES = ("open", "in_progress", "blocked", "done")
+OPEN_STATUSES = ("open", "in_progress", "blocked")
+JSON_OBJECT = re.compile(r'\{.*\}', re.DOTALL)
+
+# JSON Schema of the minutes (the subset checked by validate)
+MINUTES_SCHEMA = {
+    "type": "object",
+    "required": ["summary", "attendees", "decisions", "action_items"],
+    "properties": {
+        "summary": {"type": "string"},
+        "attendees": {"type": "array", "items": {"type": "string"}},
+        "decisions": {"type": "array", "items": {"type": "string"}},
+        "action_items": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "required": ["owner", "task", "status", "deadline"],
+                "properties": {
+                    "owner": {"type": "string"},
+                    "task": {"type": "string"},
+                    "status": {"type": "string", "enum": list(STATUSES)},
+                    "deadline": {"type": ["string", "null"]},
+                },
+            },
+        },
+    },
+}
+
+# The words models use for the statuses, mapped onto the schema's values
+STATUS_ALIASES = {
+    "open": "open", "todo": "open", "to do": "open", "not started": "open", "pending": "open", "new": "open",
+    "in progress": "in_progress", "in_progress": "in_progress", "ongoing": "in_progress", "started": "in_progress",
+    "blocked": "blocked", "on hold": "blocked", "waiting": "blocked",
+    "done": "done", "completed": "done", "complete": "done", "closed": "done", "finished": "done",
+}
+
+JSON_INSTRUCTIONS = """
+
+    Return the minutes as JSON only, without any other text, in this form:
+    {"summary": "<what the meeting was about and its outcome>", "attendees": ["<name>", ...], "decisions": ["<decision>", ...], "action_items": [{"owner": "<person>", "task": "<task>", "status": "open" | "in_progress" | "blocked" | "done", "deadline": "<DD-MM-YYYY or as said in the meeting, or null>"}, ...]}
+    """
+
+# Function to ask a minutes prompt (single transcript or reduce step) for JSON output
+def with_json_instructions(prompt):
+    return prompt + JSON_INSTRUCTIONS
+
+# Function to create the prompt that fixes an answer that did not validate
+def create_repair_prompt(text, error):
+    return f"""
+    The following answer should be Minutes of Meeting as a JSON object, but it is invalid: {error}. Return the corrected JSON object only.
+    {JSON_INSTRUCTIONS}
+    Answer:
+    {text}
+    """
+
+_TYPES = {"object": dict, "array": list, "string": str, "null": type(None)}
+
+# Function to check a value against a (subset of) JSON Schema; raises ValueError naming
+# the first offending path
+def validate(value, schema=MINUTES_SCHEMA, path="minutes"):
+    types = schema.get("type")
+    if types is not None:
+        types = [types] if isinstance(types, str) else types
+        if not any(isinstance(value, _TYPES[name]) for name in types):
+            raise ValueError(f"{path} should be of type {' or '.join(types)}")
+    if "enum" in schema and value not in schema["enum"]:
+        raise ValueError(f"{path} should be one of {', '.join(schema['enum'])}, not {value!r}")
+    if isinstance(value, dict):
+        for name in schema.get("required", ()):
+            if name not in value:
+                raise ValueError(f"{path} is missing {name!r}")
+        for name, property_schema in schema.get("properties", {}).items():
+            if name in value:
+                validate(value[name], property_schema, f"{path}.{name}")
+    if isinstance(value, list) and "items" in schema:
+        for i, item in enumerate(value):
+            validate(item, schema["items"], f"{path}[{i}]")
+
+# Function to read the minutes from a completion: the JSON object is extracted, the
+# statuses are normalized and the result is validated. Raises ValueError otherwise.
+def parse_minutes(text):
+    match = JSON_OBJECT.search(text or '')
+    if match is None:
+        raise ValueError("the answer does not contain a JSON object")
+    data = json.loads(match.group(0))
+    if isinstance(data, dict):
+        for item in data.get("action_items") or []:
+            if isinstance(item, dict) and isinstance(item.get("status"), str):
+                status = item["status"].strip().lower()
+                item["status"] = STATUS_ALIASES.get(status, status)
+            if isinstance(item, dict) and item.get("deadline") == '':
+                item["deadline"] = None
+    validate(data)
+    return data
+
+# Function to render the minutes as markdown, without another model call
+def render_minutes(minutes):
+    lines = ["## Summary", "", minutes["summary"] or "-"]
+    if minutes["attendees"]:
+        lines += ["", "## Attendees", "", ', '.join(minutes["attendees"])]
+    if minutes["decisions"]:
+        lines += ["", "## Decisions", ""] + [f"- {decision}" for decision in minutes["decisions"]]
+    if minutes["action_items"]:
+        lines += ["", "## Action items", "", "| Owner | Task | Status | Deadline |", "|---|---|---|---|"]
+        for item in minutes["action_items"]:
+            cells = [item["owner"], item["task"], item["status"].replace('_', ' '), item["deadline"] or '-']
+            lines.append(f"| {' | '.join(cell.replace('|', '/') for cell in cells)} |")
+    return '\n'.join(lines)
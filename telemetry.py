@@ -0,0 +1,237 @@
+import os
+import json
+import time
+import uuid
+import logging
+import functools
+import threading
+import contextlib
+import contextvars
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Tracing, metrics and cost accounting for the pipelines. Stages are wrapped in nested
+# spans; every finished trace (a span without a parent) is appended to a JSON-lines log,
+# and span durations, audio durations, uploaded bytes, tokens and estimated costs are
+# kept as Prometheus metrics, served in the text format on METRICS_PORT.
+
+# Constants
+TRACE_LOG_PATH = os.getenv("TRACE_LOG_PATH", "traces.jsonl")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9464"))
+DEEPGRAM_PRICE_PER_MINUTE = float(os.getenv("DEEPGRAM_PRICE_PER_MINUTE", "0.0043"))
+OPENAI_PROMPT_PRICE_PER_1K = float(os.getenv("OPENAI_PROMPT_PRICE_PER_1K", "0.0005"))
+OPENAI_COMPLETION_PRICE_PER_1K = float(os.getenv("OPENAI_COMPLETION_PRICE_PER_1K", "0.0015"))
+LATENCY_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+REALTIME_FACTOR_BUCKETS = (0.01, 0.02, 0.05, 0.1, 0.2, 0.3, 0.5, 1, 2, 5)
+
+logger = logging.getLogger(__name__)
+
+# Counter or histogram with labels, rendered in the Prometheus text format
+class Metric:
+    def __init__(self, name, help_text, kind='counter', buckets=None):
+        self.name = name
+        self.help_text = help_text
+        self.kind = kind
+        self.buckets = buckets
+        self.values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1.0, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self.values[key] = self.values.get(key, 0.0) + amount
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            counts, total, count = self.values.get(key, ((0,) * len(self.buckets), 0.0, 0))
+            counts = tuple(bucket_count + (value <= bound) for bucket_count, bound in zip(counts, self.buckets))
+            self.values[key] = (counts, total + value, count + 1)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            values = sorted(self.values.items())
+        for key, value in values:
+            if self.kind == 'counter':
+                lines.append(f"{self.name}{_labels(key)} {value:g}")
+                continue
+            counts, total, count = value
+            for bound, bucket_count in zip(self.buckets, counts):
+                lines.append(f"{self.name}_bucket{_labels(key, le=f'{bound:g}')} {bucket_count}")
+            lines.append(f"{self.name}_bucket{_labels(key, le='+Inf')} {count}")
+            lines.append(f"{self.name}_sum{_labels(key)} {total:g}")
+            lines.append(f"{self.name}_count{_labels(key)} {count}")
+        return '\n'.join(lines)
+
+def _labels(key, **extra):
+    items = list(key) + list(extra.items())
+    if not items:
+        return ''
+    return '{' + ','.join(f'{name}="{value}"' for name, value in items) + '}'
+
+STAGE_SECONDS = Metric("mom_stage_seconds", "Duration of pipeline stages", 'histogram', LATENCY_BUCKETS)
+REALTIME_FACTOR = Metric("mom_realtime_factor", "Processing time divided by audio duration", 'histogram', REALTIME_FACTOR_BUCKETS)
+AUDIO_SECONDS = Metric("mom_audio_seconds_total", "Seconds of audio processed")
+UPLOAD_BYTES = Metric("mom_upload_bytes_total", "Bytes of audio uploaded to a provider")
+LLM_TOKENS = Metric("mom_llm_tokens_total", "Prompt and completion tokens")
+COST_USD = Metric("mom_cost_usd_total", "Estimated provider cost in US dollars")
+ERRORS = Metric("mom_stage_errors_total", "Pipeline stages that raised an error")
+METRICS = [STAGE_SECONDS, REALTIME_FACTOR, AUDIO_SECONDS, UPLOAD_BYTES, LLM_TOKENS, COST_USD, ERRORS]
+
+# One timed step of a trace, with attributes and child spans
+class Span:
+    def __init__(self, name, parent=None, **attributes):
+        self.name = name
+        self.parent = parent
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex
+        self.attributes = attributes
+        self.children = []
+        self.start = time.time()
+        self.duration = None
+        self.error = None
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    # Function to mark the span as failed, for callers that handle the error themselves
+    # inside the span (e.g. to show it in the UI) instead of letting it propagate
+    def fail(self, error):
+        self.error = f"{type(error).__name__}: {error}"
+        ERRORS.inc(stage=self.name)
+
+    def root(self):
+        span = self
+        while span.parent is not None:
+            span = span.parent
+        return span
+
+    def to_dict(self):
+        data = {"name": self.name, "start": self.start, "duration": self.duration, **self.attributes}
+        if self.error:
+            data["error"] = self.error
+        if self.children:
+            data["children"] = [child.to_dict() for child in self.children]
+        return data
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+_trace_lock = threading.Lock()
+
+def current_span():
+    return _current_span.get()
+
+# Function to time a block as a span nested under the current one
+@contextlib.contextmanager
+def span(name, **attributes):
+    parent = _current_span.get()
+    current = Span(name, parent, **attributes)
+    if parent is not None:
+        parent.children.append(current)
+    token = _current_span.set(current)
+    start_time = time.perf_counter()
+    try:
+        yield current
+    except Exception as e:
+        current.fail(e)
+        raise
+    finally:
+        current.duration = time.perf_counter() - start_time
+        _current_span.reset(token)
+        STAGE_SECONDS.observe(current.duration, stage=name)
+        if parent is None:
+            _finish_trace(current)
+
+# Decorator to run a function as a span (named after the function unless name is given)
+def traced(name=None):
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name or fn.__name__):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+# Function to record a finished trace: realtime factor and one line in the trace log
+def _finish_trace(root):
+    audio_seconds = root.attributes.get("audio_seconds")
+    if audio_seconds:
+        root.set(realtime_factor=root.duration / audio_seconds)
+        REALTIME_FACTOR.observe(root.duration / audio_seconds, pipeline=root.name)
+    if not TRACE_LOG_PATH:
+        return
+    record = {"trace_id": root.trace_id, **root.to_dict()}
+    try:
+        with _trace_lock, open(TRACE_LOG_PATH, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, default=str) + '\n')
+    except OSError as e:
+        logger.warning("Could not write the trace log: %s", e)
+
+# Function to run fn in worker threads as part of the caller's trace. Call it on the
+# caller's thread; each call of the returned function runs in its own copy of the context.
+def propagate(fn):
+    context = contextvars.copy_context()
+    return lambda *args, **kwargs: context.copy().run(fn, *args, **kwargs)
+
+# Function to add attributes to the root span of the current trace (e.g. audio_seconds)
+def annotate_trace(**attributes):
+    current = _current_span.get()
+    if current is not None:
+        current.root().set(**attributes)
+
+# Function to count audio sent to Deepgram and its estimated cost
+def record_transcription(audio_seconds, upload_bytes, provider='deepgram'):
+    AUDIO_SECONDS.inc(audio_seconds, provider=provider)
+    UPLOAD_BYTES.inc(upload_bytes, provider=provider)
+    cost = audio_seconds / 60 * DEEPGRAM_PRICE_PER_MINUTE if provider == 'deepgram' else 0.0
+    COST_USD.inc(cost, provider=provider)
+    current = _current_span.get()
+    if current is not None:
+        current.set(audio_seconds=audio_seconds, upload_bytes=upload_bytes, cost_usd=cost)
+    annotate_trace(audio_seconds=audio_seconds)
+    return cost
+
+# Function to count the tokens of one completion and its estimated cost
+def record_completion(model, prompt_tokens, completion_tokens):
+    LLM_TOKENS.inc(prompt_tokens, model=model, kind='prompt')
+    LLM_TOKENS.inc(completion_tokens, model=model, kind='completion')
+    cost = prompt_tokens / 1000 * OPENAI_PROMPT_PRICE_PER_1K + completion_tokens / 1000 * OPENAI_COMPLETION_PRICE_PER_1K
+    COST_USD.inc(cost, provider='openai')
+    current = _current_span.get()
+    if current is not None:
+        current.set(model=model, prompt_tokens=prompt_tokens, completion_tokens=completion_tokens, cost_usd=cost)
+    return cost
+
+def render_metrics():
+    return '\n'.join(metric.render() for metric in METRICS) + '\n'
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split('?', 1)[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = render_metrics().encode('utf-8')
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+# The metrics endpoint is started once per process; 0 disables it
+_metrics_server = None
+_metrics_lock = threading.Lock()
+
+def start_metrics_server(port=METRICS_PORT):
+    global _metrics_server
+    with _metrics_lock:
+        if _metrics_server is not None or not port:
+            return _metrics_server
+        try:
+            _metrics_server = ThreadingHTTPServer(('', port), _MetricsHandler)
+        except OSError as e:
+            logger.warning("Metrics endpoint not started on port %d: %s", port, e)
+            return None
+        _metrics_server.daemon_threads = True
+        threading.Thread(target=_metrics_server.serve_forever, name="metrics-server", daemon=True).start()
+        return _metrics_server
@@ -0,0 +1,27 @@
+import numpy as np
+from diarization_clustering import cluster_speakers
+
+# Two tight speaker clusters and one segment without an embedding (pyannote returns NaN
+# for very short segments); cosine clustering must not see the empty row
+def _embeddings_with_nan_row():
+    rng = np.random.default_rng(0)
+    a = np.array([1.0, 0.0, 0.0, 0.0])
+    b = np.array([0.0, 1.0, 0.0, 0.0])
+    rows = [a + rng.normal(0, 0.01, 4) for _ in range(20)] + [b + rng.normal(0, 0.01, 4) for _ in range(20)]
+    rows.insert(25, np.full(4, np.nan))
+    return np.array(rows)
+
+def test_nan_embedding_with_fixed_speaker_count():
+    labels = cluster_speakers(_embeddings_with_nan_row(), num_speakers=2)
+    assert labels.tolist() == [0] * 20 + [1] * 21
+
+def test_nan_embedding_with_estimated_speaker_count():
+    embeddings = _embeddings_with_nan_row()
+    labels = cluster_speakers(embeddings)
+    expected = cluster_speakers(np.delete(embeddings, 25, axis=0))
+    assert np.delete(labels, 25).tolist() == expected.tolist()
+    assert labels[25] in (labels[24], labels[26])
+
+def test_zero_and_nan_rows_only():
+    embeddings = np.array([[np.nan] * 4, [0.0] * 4])
+    assert cluster_speakers(embeddings, num_speakers=2).tolist() == [0, 0]
@@ -0,0 +1,38 @@
+import pytest
+from job_queue import JobStore, QUEUED, RUNNING, DONE, FAILED
+
+@pytest.fixture
+def store(tmp_path):
+    return JobStore(str(tmp_path / "jobs.sqlite3"), str(tmp_path / "jobs"))
+
+def test_claim_marks_the_job_running_for_the_worker(store):
+    job_id = store.submit("deepgram", b"audio", "meeting.mp3", {"language": "English"})
+    job = store.claim_next(["deepgram"], "worker-1")
+    assert (job["id"], job["status"], job["worker_id"], job["attempts"]) == (job_id, RUNNING, "worker-1", 1)
+    assert store.claim_next(["deepgram"], "worker-2") is None
+    assert store.complete(job_id, "worker-1", {"mom": "minutes"})
+    assert store.get(job_id)["status"] == DONE
+
+def test_stale_job_is_requeued_and_the_old_worker_cannot_finish_it(store):
+    job_id = store.submit("deepgram", b"audio", "meeting.mp3")
+    store.claim_next(["deepgram"], "worker-1")
+    assert store.requeue_stale(stale_seconds=-1) == 1
+    assert store.get(job_id)["status"] == QUEUED
+    store.claim_next(["deepgram"], "worker-2")
+
+    assert not store.complete(job_id, "worker-1", {"mom": "old"})
+    assert not store.fail(job_id, "worker-1", "old error")
+    assert store.get(job_id)["status"] == RUNNING
+    assert store.complete(job_id, "worker-2", {"mom": "new"})
+    assert store.get(job_id)["result"] == {"mom": "new"}
+    assert not store.fail(job_id, "worker-2", "too late")
+
+def test_job_fails_after_max_attempts(store):
+    job_id = store.submit("whisper", b"audio", "meeting.wav")
+    for attempt in range(3):
+        assert store.claim_next(["whisper"], f"worker-{attempt}")["attempts"] == attempt + 1
+        store.requeue_stale(stale_seconds=-1, max_attempts=3)
+    job = store.get(job_id)
+    assert job["status"] == FAILED
+    assert "3 attempts" in job["error"]
+    assert store.claim_next(["whisper"], "worker-4") is None
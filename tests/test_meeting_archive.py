@@ -0,0 +1,21 @@
+from meeting_archive import MeetingArchive
+
+def _minutes(*owners):
+    return {
+        "summary": "Release planning",
+        "attendees": list(owners),
+        "decisions": [],
+        "action_items": [{"owner": owner, "task": f"Task of {owner}", "status": "open", "deadline": None} for owner in owners],
+    }
+
+def test_owner_filter_matches_the_first_words_of_the_owner(tmp_path):
+    archive = MeetingArchive(str(tmp_path / "meetings.sqlite3"))
+    archive.add_meeting("Planning", "English", "Gokul: Hi.", _minutes("Avinash", "Avinash Kumar", "Avinash (QA)", "Avinashi", "Gokul"))
+    owners = {item["owner"] for item in archive.action_items(owner="avinash")}
+    assert owners == {"Avinash", "Avinash Kumar", "Avinash (QA)"}
+    assert [item["owner"] for item in archive.action_items(owner="Avinash  Kumar")] == ["Avinash Kumar"]
+
+def test_owner_filter_treats_like_wildcards_as_text(tmp_path):
+    archive = MeetingArchive(str(tmp_path / "meetings.sqlite3"))
+    archive.add_meeting("Planning", "English", "Gokul: Hi.", _minutes("A_b Lee", "Axb Lee"))
+    assert [item["owner"] for item in archive.action_items(owner="a_b")] == ["A_b Lee"]
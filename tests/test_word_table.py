@@ -0,0 +1,25 @@
+import json
+from local_backends import deepgram_response_from_transcript
+from word_table import WordTable, pack_words, unpack_words
+
+TRANSCRIPT = "Gokul: Hi, I'm Gokul.\nAvinash: Hello, Avinash here.\nGokul: Let's start."
+
+def test_pack_round_trip_stores_utterances_as_ranges():
+    response = deepgram_response_from_transcript(TRANSCRIPT)
+    packed = json.loads(json.dumps(pack_words(response)))
+    assert all("words" not in utterance for utterance in packed["results"]["utterances"])
+    assert unpack_words(packed) == json.loads(json.dumps(response))
+
+def test_utterances_that_do_not_match_the_words_stay_dicts():
+    response = deepgram_response_from_transcript(TRANSCRIPT)
+    response["results"]["utterances"][1]["words"] = [dict(word, word="other") for word in response["results"]["utterances"][1]["words"]]
+    packed = pack_words(response)
+    assert "words" in packed["results"]["utterances"][1]
+    assert unpack_words(json.loads(json.dumps(packed))) == json.loads(json.dumps(response))
+
+def test_turn_at_finds_the_turn_being_spoken():
+    table = WordTable.from_response(deepgram_response_from_transcript(TRANSCRIPT))
+    turn = table.turn_at(float(table.start[4]))
+    assert (turn.speaker, turn.text) == (1, "Hello, Avinash here.")
+    assert table.turn_at(-1) is None
+    assert table.turn_bounds() is table.turn_bounds()
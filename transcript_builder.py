@@ -0,0 +1,65 @@
+from collections import namedtuple
+from itertools import groupby
+
+# Constants
+TAG = 'SPEAKER '
+
+# One diarized speaker turn: consecutive words of the same speaker
+SpeakerTurn = namedtuple('SpeakerTurn', ['speaker', 'start', 'end', 'text'])
+
+def _alternative(response):
+    return response["results"]["channels"][0]["alternatives"][0]
+
+# Function to yield speaker turns from the word-level results
+def iter_turns_from_words(words):
+    curr_speaker = None
+    curr_words = []
+    start = end = 0.0
+    for word_struct in words:
+        word_speaker = word_struct.get("speaker", 0)
+        if word_speaker != curr_speaker:
+            if curr_words:
+                yield SpeakerTurn(curr_speaker, start, end, ' '.join(curr_words))
+            curr_speaker = word_speaker
+            curr_words = []
+            start = word_struct["start"]
+        curr_words.append(word_struct.get("punctuated_word") or word_struct["word"])
+        end = word_struct["end"]
+    if curr_words:
+        yield SpeakerTurn(curr_speaker, start, end, ' '.join(curr_words))
+
+# Function to yield speaker turns from the utterance-level results. Deepgram also splits
+# a single speaker's speech on pauses, so consecutive utterances of one speaker are merged.
+def iter_turns_from_utterances(utterances):
+    for speaker, group in groupby(utterances, key=lambda utterance: utterance.get("speaker", 0)):
+        group = list(group)
+        yield SpeakerTurn(
+            speaker,
+            group[0]["start"],
+            group[-1]["end"],
+            ' '.join(utterance["transcript"] for utterance in group),
+        )
+
+# Function to yield the speaker turns of a Deepgram response one at a time.
+# source is 'utterances', 'words' or 'auto' (utterances when the response has them).
+def iter_speaker_turns(response, source='auto'):
+    utterances = response["results"].get("utterances")
+    if source == 'utterances' or (source == 'auto' and utterances):
+        return iter_turns_from_utterances(utterances or [])
+    if source in ('words', 'auto'):
+        return iter_turns_from_words(_alternative(response)["words"])
+    raise ValueError(f"Unknown transcript source: {source}")
+
+# Function to format a single speaker turn the way it is shown in the app
+def format_turn(turn):
+    return f"{TAG}{turn.speaker}: {turn.text}"
+
+# Function to yield the formatted transcript lines incrementally
+def iter_transcript_lines(response, source='auto'):
+    for turn in iter_speaker_turns(response, source):
+        if turn.text:
+            yield format_turn(turn)
+
+# Function to create a transcript from JSON response
+def create_transcript(response, source='auto'):
+    return '\n\n'.join(iter_transcript_lines(response, source))
@@ -0,0 +1,122 @@
+import os
+import json
+import hashlib
+import threading
+from word_table import pack_words, unpack_words
+
+# Constants
+CACHE_DIR = os.getenv("TRANSCRIPTION_CACHE_DIR", ".transcription_cache")
+CACHE_MAX_BYTES = int(os.getenv("TRANSCRIPTION_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+CACHE_SUFFIX = '.json'
+
+# Persistent on-disk cache of Deepgram responses keyed by audio bytes + request options.
+# Entries are JSON files in which the word list is stored as a serialized word table and
+# the utterances refer to index ranges of it (see word_table), which is several times
+# smaller and faster to load; the file mtime doubles as the LRU timestamp so the recency
+# order survives restarts and is shared by every process using the same folder.
+class TranscriptionCache:
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    # Function to build the cache key from the audio buffer and the request options
+    def make_key(self, buffer_data, options):
+        if hasattr(options, "to_dict"):
+            options = options.to_dict()
+        digest = hashlib.sha256()
+        digest.update(buffer_data)
+        digest.update(b'\0')
+        digest.update(json.dumps(options, sort_keys=True, default=str).encode('utf-8'))
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + CACHE_SUFFIX)
+
+    # Function to look up a cached response; returns None on a miss
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                response = unpack_words(json.load(f))
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        # Touch the entry so it becomes the most recently used one
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        with self._lock:
+            self.hits += 1
+        return response
+
+    # Function to store a response and evict old entries if the cache is too big
+    def put(self, key, response):
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(pack_words(response), f)
+        os.replace(tmp_path, path)
+        self.evict()
+
+    # Function to drop least recently used entries until the cache fits in max_bytes
+    def evict(self):
+        entries = []
+        total = 0
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                if not entry.name.endswith(CACHE_SUFFIX):
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+
+        entries.sort()
+        removed = 0
+        for mtime, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        return removed
+
+    def clear(self):
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                if entry.name.endswith(CACHE_SUFFIX):
+                    os.remove(entry.path)
+
+    def stats(self):
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        lookups = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / lookups if lookups else 0.0,
+        }
+
+# One cache per process. Streamlit re-executes the app script on every rerun but keeps
+# imported modules, so the counters accumulate across reruns and sessions.
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+def get_transcription_cache():
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = TranscriptionCache()
+        return _default_cache
@@ -0,0 +1,123 @@
+import os
+import bisect
+import numpy as np
+
+# Energy-based voice activity detection on a decoded mono float32 waveform.
+# Frames whose level stays close to the recording's noise floor for at least
+# VAD_MIN_SILENCE_SECONDS are cut out; shorter pauses are kept so sentences
+# and turn-taking stay intact for the ASR engine.
+
+# Constants
+VAD_FRAME_SECONDS = 0.03
+VAD_MIN_SILENCE_SECONDS = float(os.getenv("VAD_MIN_SILENCE_SECONDS", "1.0"))
+VAD_PADDING_SECONDS = float(os.getenv("VAD_PADDING_SECONDS", "0.25"))
+VAD_THRESHOLD_DB = float(os.getenv("VAD_THRESHOLD_DB", "12"))
+VAD_MIN_SPEECH_DB = -55.0
+
+# Function to compute the level of every frame in dBFS
+def frame_levels(waveform, sample_rate, frame_seconds=VAD_FRAME_SECONDS):
+    frame_length = max(1, int(sample_rate * frame_seconds))
+    num_frames = len(waveform) // frame_length
+    if num_frames == 0:
+        return np.zeros(0, dtype=np.float32), frame_length
+    frames = waveform[:num_frames * frame_length].reshape(num_frames, frame_length)
+    rms = np.sqrt(np.mean(np.square(frames, dtype=np.float32), axis=1))
+    return 20.0 * np.log10(rms + 1e-10), frame_length
+
+# Function to find speech regions; returns a list of (start_sample, end_sample)
+def detect_speech(waveform, sample_rate, min_silence=VAD_MIN_SILENCE_SECONDS,
+                  padding=VAD_PADDING_SECONDS, threshold_db=VAD_THRESHOLD_DB):
+    levels, frame_length = frame_levels(waveform, sample_rate)
+    if len(levels) == 0:
+        return [(0, len(waveform))] if len(waveform) else []
+
+    # The noise floor adapts to the recording; anything clearly above it is speech
+    noise_floor = np.percentile(levels, 10)
+    threshold = max(noise_floor + threshold_db, VAD_MIN_SPEECH_DB)
+    voiced = levels > threshold
+
+    # Bridge pauses shorter than min_silence and pad every region on both sides
+    pad_frames = int(round(padding / VAD_FRAME_SECONDS))
+    min_silence_frames = int(round(min_silence / VAD_FRAME_SECONDS))
+    regions = []
+    voiced_frames = np.flatnonzero(voiced)
+    if len(voiced_frames) == 0:
+        return []
+    start = prev = voiced_frames[0]
+    for frame in voiced_frames[1:]:
+        if frame - prev > min_silence_frames:
+            regions.append((start, prev + 1))
+            start = frame
+        prev = frame
+    regions.append((start, prev + 1))
+
+    speech = []
+    for start, end in regions:
+        start_sample = max(0, int(start - pad_frames) * frame_length)
+        end_sample = min(len(waveform), int(end + pad_frames) * frame_length)
+        if speech and start_sample <= speech[-1][1]:
+            speech[-1] = (speech[-1][0], end_sample)
+        else:
+            speech.append((start_sample, end_sample))
+
+    # Keep the tail that did not fill a whole frame when speech runs up to the end
+    if speech and speech[-1][1] >= len(levels) * frame_length:
+        speech[-1] = (speech[-1][0], len(waveform))
+    return speech
+
+# Maps timestamps of the trimmed audio back to the original recording
+class Timeline:
+    def __init__(self, regions, sample_rate):
+        self.trimmed_starts = []
+        self.original_starts = []
+        offset = 0
+        for start, end in regions:
+            self.trimmed_starts.append(offset / sample_rate)
+            self.original_starts.append(start / sample_rate)
+            offset += end - start
+        self.trimmed_duration = offset / sample_rate
+
+    def to_original(self, seconds):
+        if not self.trimmed_starts:
+            return seconds
+        index = max(0, bisect.bisect_right(self.trimmed_starts, seconds) - 1)
+        return self.original_starts[index] + (seconds - self.trimmed_starts[index])
+
+# Function to cut the silence out of a waveform.
+# Returns the trimmed waveform, the Timeline to map timestamps back and the seconds removed.
+def trim_silence(waveform, sample_rate, **kwargs):
+    regions = detect_speech(waveform, sample_rate, **kwargs)
+    if not regions:
+        regions = [(0, len(waveform))]
+    if len(regions) == 1 and regions[0] == (0, len(waveform)):
+        trimmed = waveform
+    else:
+        trimmed = np.concatenate([waveform[start:end] for start, end in regions])
+    removed_seconds = (len(waveform) - len(trimmed)) / sample_rate
+    return trimmed, Timeline(regions, sample_rate), removed_seconds
+
+# Function to move the start/end of every item back to the original timeline.
+# Items shared between lists (e.g. words referenced by utterances) are moved only once.
+def _remap_items(items, timeline, seen):
+    for item in items:
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+        item["start"] = timeline.to_original(item["start"])
+        item["end"] = timeline.to_original(item["end"])
+        _remap_items(item.get("words", []), timeline, seen)
+
+# Function to move the timestamps of Whisper segments (and their words) back to the original timeline
+def remap_segments(segments, timeline):
+    _remap_items(segments, timeline, set())
+    return segments
+
+# Function to move the timestamps of a Deepgram response (to_dict layout) back to the original timeline
+def remap_deepgram_response(response, timeline):
+    seen = set()
+    results = response["results"]
+    for channel in results.get("channels", []):
+        for alternative in channel.get("alternatives", []):
+            _remap_items(alternative.get("words", []), timeline, seen)
+    _remap_items(results.get("utterances") or [], timeline, seen)
+    return response
@@ -1,85 +1,130 @@
 import streamlit as st
-import subprocess
 import datetime
 import torch
-import wave
-import contextlib
-import numpy as np
 from pyannote.audio.pipelines.speaker_verification import PretrainedSpeakerEmbedding
-from pyannote.audio import Audio
-from pyannote.core import Segment
-from sklearn.cluster import AgglomerativeClustering
-from pydub import AudioSegment
-import struct
 import whisper
 import os
 from openai import OpenAI
 import time
+import contextlib
+from job_queue import get_job_store, get_worker_pool, DONE, FAILED
+from model_registry import get_model_registry, resident_memory
+from speaker_embeddings import compute_embeddings, EMBEDDING_BATCH_SIZE
+from audio_decode import decode_audio, SAMPLE_RATE
+from vad import trim_silence, remap_segments
+from diarization_clustering import cluster_speakers
+from diarization_cache import diarization_key, save_diarization, load_diarization
+from parallel_whisper import transcribe_parallel, WHISPER_WORKERS, WHISPER_CHUNK_SECONDS
+from telemetry import traced, span, current_span, record_transcription, record_completion, start_metrics_server
 
 OPENAI_API_KEY = os.getenv("OPEN_AI_TOKEN")
-print(OPENAI_API_KEY)
+JOB_POLL_SECONDS = 2
+EMBEDDING_MODEL = "speechbrain/spkrec-ecapa-voxceleb"
+DEVICE = os.getenv("WHISPER_DEVICE", "cpu")
+
+# Function to get the Whisper model; loaded once per process and shared by all sessions
+def get_whisper_model(model_size='large', device=DEVICE):
+    return get_model_registry().get(
+        f"whisper-{model_size}",
+        device,
+        lambda: whisper.load_model(model_size, device=device))
 
-# Function to perform speaker diarization and transcription
-def speaker_diarization(path, model_size='large', num_speakers=2):
-    embedding_model = PretrainedSpeakerEmbedding(
-        "speechbrain/spkrec-ecapa-voxceleb",
-        device=torch.device("cpu"))
+# Function to get the speaker embedding model; loaded once per process and shared by all sessions
+def get_embedding_model(device=DEVICE):
+    return get_model_registry().get(
+        EMBEDDING_MODEL,
+        device,
+        lambda: PretrainedSpeakerEmbedding(EMBEDDING_MODEL, device=torch.device(device)))
 
-    if path[-3:] != 'wav':
-        subprocess.call(['ffmpeg', '-i', path, 'audio.wav', '-y'], shell=True)
-        path = 'audio.wav'
+# Function to perform speaker diarization and transcription.
+# audio is the path of a recording or the bytes of an upload; returns the transcript text.
+# num_speakers=None estimates the number of speakers. The segments and embeddings are
+# cached by audio hash, so running again (e.g. with another num_speakers) only re-clusters.
+# If a stats dict is given it receives the cache key and the seconds of silence removed.
+@traced()
+def speaker_diarization(audio, model_size='large', num_speakers=None, embedding_batch_size=EMBEDDING_BATCH_SIZE,
+                        vad=False, stats=None, parallel_workers=WHISPER_WORKERS, use_cache=True):
+    stats = {} if stats is None else stats
+    key = diarization_key(audio, model_size, vad)
+    stats["diarization_key"] = key
 
-    with open(path, 'rb') as f1:
-        header_beginning = f1.read(0x18)
-        num_channels, = struct.unpack_from('<H', header_beginning, 0x16)
+    cached = load_diarization(key) if use_cache else None
+    if cached is not None:
+        print("Using cached segments and embeddings")
+        current_span().set(cache_hit=True)
+        segments, embeddings = cached
+    else:
+        segments, embeddings = transcribe_and_embed(audio, model_size, embedding_batch_size, vad, stats, parallel_workers)
+        save_diarization(key, segments, embeddings)
 
-    if num_channels > 1:
-        out_path = 'audio_1_channel_converted.wav'
-        sound = AudioSegment.from_wav(path)
-        sound = sound.set_channels(1)
-        sound.export(out_path, format="wav")
-        path = out_path
+    return recluster(segments, embeddings, num_speakers)
 
-    model = whisper.load_model(model_size)
+# Function to transcribe a recording and compute one speaker embedding per segment.
+# With vad=True only the speech regions are transcribed. With parallel_workers > 1,
+# recordings longer than one chunk are transcribed in a pool of worker processes.
+def transcribe_and_embed(audio, model_size, embedding_batch_size, vad, stats, parallel_workers):
+    embedding_model = get_embedding_model()
+
+    # Decode once into a 16 kHz mono buffer shared by Whisper and the embedding model
+    with span("decode_audio"):
+        waveform = decode_audio(audio)
+    record_transcription(len(waveform) / SAMPLE_RATE, 0, provider='whisper')
+    # Only timed when it runs, so recordings without VAD do not add empty trim_silence spans
+    with span("trim_silence") if vad else contextlib.nullcontext():
+        speech, timeline, removed_seconds = trim_silence(waveform, SAMPLE_RATE) if vad else (waveform, None, 0.0)
+    if vad:
+        print(f"Removed {removed_seconds:.1f} seconds of silence")
+    stats["vad_removed_seconds"] = removed_seconds
 
     start_time = time.time()
     print("Transcribing starts..")
-    result = model.transcribe(path)
+    with span("whisper_transcribe", model=model_size):
+        if parallel_workers > 1 and len(speech) > WHISPER_CHUNK_SECONDS * SAMPLE_RATE:
+            result = transcribe_parallel(speech, SAMPLE_RATE, model_size, DEVICE, parallel_workers)
+        else:
+            model = get_whisper_model(model_size)
+            result = model.transcribe(speech)
 
     load_time = time.time() - start_time
     print(f"Model tTranscribed in {load_time:.2f} seconds")
     segments = result["segments"]
+    if timeline is not None:
+        remap_segments(segments, timeline)
 
-    with contextlib.closing(wave.open(path, 'r')) as f:
-        frames = f.getnframes()
-        rate = f.getframerate()
-        duration = frames / float(rate)
-
-    audio = Audio()
-
-    def segment_embedding(segment):
-        start = segment["start"]
-        end = min(duration, segment["end"])
-        clip = Segment(start, end)
-        waveform, sample_rate = audio.crop(path, clip)
-        return embedding_model(waveform[None])
-
-    embeddings = np.zeros(shape=(len(segments), 192))
-    for i, segment in enumerate(segments):
-        embeddings[i] = segment_embedding(segment)
+    # Embed the segments in batches
+    start_time = time.time()
+    with span("speaker_embeddings", segments=len(segments)):
+        embeddings = compute_embeddings(embedding_model, waveform, SAMPLE_RATE, segments, embedding_batch_size)
+    print(f"Embedded {len(segments)} segments in {time.time() - start_time:.2f} seconds")
+    return segments, embeddings
 
-    embeddings = np.nan_to_num(embeddings)
-    clustering = AgglomerativeClustering(num_speakers).fit(embeddings)
-    labels = clustering.labels_
+# Function to cluster the segments by speaker and render the transcript.
+# The speaker count is estimated when num_speakers is None.
+def recluster(segments, embeddings, num_speakers=None):
+    with span("cluster_speakers"):
+        labels = cluster_speakers(embeddings, num_speakers)
 
     for i in range(len(segments)):
         segments[i]["speaker"] = 'SPEAKER ' + str(labels[i] + 1)
 
-    with open("transcript.txt", "w") as f:
-        for (i, segment) in enumerate(segments):
-            if i == 0 or segments[i - 1]["speaker"] != segment["speaker"]:
-                f.write("\n" + segment["speaker"] + ' ' + str(datetime.timedelta(seconds=round(segment["start"]))) + '\n')
-            f.write(segment["text"][1:] + ' ')
+    return render_transcript(segments)
+
+# Function to re-cluster a cached recording with another number of speakers without
+# transcribing or embedding it again; returns None if the recording is not cached
+def rediarize(key, num_speakers=None):
+    cached = load_diarization(key)
+    if cached is None:
+        return None
+    return recluster(*cached, num_speakers)
+
+# Function to render diarized segments in the transcript.txt layout
+def render_transcript(segments):
+    parts = []
+    for (i, segment) in enumerate(segments):
+        if i == 0 or segments[i - 1]["speaker"] != segment["speaker"]:
+            parts.append("\n" + segment["speaker"] + ' ' + str(datetime.timedelta(seconds=round(segment["start"]))) + '\n')
+        parts.append(segment["text"][1:] + ' ')
+    return ''.join(parts)
 
 def read_transcript(file_path):
     with open(file_path, 'r') as file:
@@ -94,6 +139,7 @@ def create_prompt(transcript, current_date="12-12-2023"):
     """
     return prompt
 
+@traced()
 def generate_mom(prompt):
     # client = OpenAI(api_key=os.getenv('OPEN_AI_TOKEN'))
     client = OpenAI(api_key=OPENAI_API_KEY)
@@ -101,37 +147,121 @@ def generate_mom(prompt):
     response = client.chat.completions.create(
         model="gpt-3.5-turbo", 
         messages=[{"role": "user", "content": prompt}], max_tokens=1000)
+    if response.usage is not None:
+        record_completion("gpt-3.5-turbo", response.usage.prompt_tokens, response.usage.completion_tokens)
     
     return response.choices[0].message.content
 
+# Function to run the Whisper pipeline on a recording without any UI (used by background jobs)
+@traced("whisper_pipeline")
+def process_recording(path, num_speakers=None, vad=False, progress=None):
+    progress = progress or (lambda message: None)
+    progress("Transcribing and diarizing audio...")
+    stats = {}
+    transcript = speaker_diarization(path, num_speakers=num_speakers, vad=vad, stats=stats)
+    progress("Generating MoM...")
+    mom = generate_mom(create_prompt(transcript))
+    return {
+        "transcript": transcript,
+        "mom": mom,
+        "vad_removed_seconds": stats.get("vad_removed_seconds"),
+        "diarization_key": stats["diarization_key"],
+    }
+
+# Function to display the generated MoM with a download button
+def show_mom(mom):
+    st.subheader("Minutes of Meeting")
+    st.write(mom)
+
+    st.download_button(
+        label="Download MoM",
+        data=mom,
+        file_name="minutes_of_meeting.txt",
+        mime="text/plain"
+    )
+
+# Function to display the state of a background job and poll until it has finished
+def show_job(job_id):
+    job = get_job_store().get(job_id)
+    if job is None:
+        st.warning(f"Job {job_id} was not found.")
+    elif job["status"] == DONE:
+        st.session_state["diarization_key"] = job["result"].get("diarization_key")
+        show_mom(job["result"]["mom"])
+    elif job["status"] == FAILED:
+        st.error(f"Error: {job['error']}")
+    else:
+        st.info(f"Job {job_id} is {job['status']}: {job['progress'] or 'waiting for a worker'}")
+        time.sleep(JOB_POLL_SECONDS)
+        st.rerun()
+
 def main():
     st.title("Minutes of Meeting Generator - WHISPER")
 
+    # Start the process-wide background workers and the metrics endpoint (once per process, not per rerun)
+    get_worker_pool()
+    start_metrics_server()
+
     uploaded_file = st.file_uploader("Upload an audio file", type=["mp3", "wav"])
+    run_in_background = st.checkbox("Process in the background", value=False)
+    vad_enabled = st.checkbox("Trim silence before transcription", value=False)
+    num_speakers = st.number_input("Number of speakers (0 = detect automatically)", min_value=0, max_value=20, value=0)
+    num_speakers = int(num_speakers) or None
 
     if uploaded_file is not None:
-        with open("temp_audio." + uploaded_file.name.split(".")[-1], "wb") as f:
-            f.write(uploaded_file.getbuffer())
-
         if st.button("Generate MoM"):
-            with st.spinner('Processing...'):
-                speaker_diarization("temp_audio." + uploaded_file.name.split(".")[-1])
-                transcript = read_transcript("transcript.txt")
-                prompt = create_prompt(transcript)
-                mom = generate_mom(prompt)
-
-                st.subheader("Minutes of Meeting")
-                st.write(mom)
-
-                with open("minutes_of_meeting.txt", "w") as f:
-                    f.write(mom)
-
-                st.download_button(
-                    label="Download MoM",
-                    data=mom,
-                    file_name="minutes_of_meeting.txt",
-                    mime="text/plain"
-                )
+            if run_in_background:
+                # The job ID is kept in the session and in the URL, so the results
+                # survive reruns and a browser refresh
+                job_id = get_job_store().submit("whisper", uploaded_file.getvalue(), uploaded_file.name, {"vad": vad_enabled, "num_speakers": num_speakers})
+                st.session_state["job_id"] = job_id
+                st.query_params["job"] = job_id
+            else:
+                st.session_state.pop("job_id", None)
+                st.query_params.pop("job", None)
+                with st.spinner('Processing...'), span("whisper_pipeline"):
+                    stats = {}
+                    transcript = speaker_diarization(uploaded_file.getvalue(), num_speakers=num_speakers, vad=vad_enabled, stats=stats)
+                    st.session_state["diarization_key"] = stats["diarization_key"]
+                    if vad_enabled and "vad_removed_seconds" in stats:
+                        st.write(f"Silence removed before transcription: {stats['vad_removed_seconds']:.1f} seconds")
+                    prompt = create_prompt(transcript)
+                    mom = generate_mom(prompt)
+
+                    show_mom(mom)
+
+    job_id = st.session_state.get("job_id") or st.query_params.get("job")
+    if job_id:
+        show_job(job_id)
+
+    # Fix a wrong speaker count by re-clustering the cached segments and embeddings.
+    # Re-clustering only re-renders the transcript; the MoM is regenerated on request.
+    key = st.session_state.get("diarization_key")
+    if key:
+        with st.form(key="recluster_form"):
+            recluster_speakers = st.number_input("Re-cluster with N speakers", min_value=1, max_value=20, value=2)
+            recluster_button = st.form_submit_button("Re-cluster")
+        if recluster_button:
+            start_time = time.time()
+            transcript = rediarize(key, int(recluster_speakers))
+            if transcript is None:
+                st.session_state.pop("reclustered", None)
+                st.warning("The segments of this recording are no longer cached. Generate the MoM again.")
+            else:
+                st.session_state["reclustered"] = (key, transcript)
+                st.write(f"Re-clustered in {time.time() - start_time:.2f} seconds")
+
+        reclustered = st.session_state.get("reclustered")
+        if reclustered is not None and reclustered[0] == key:
+            with st.expander("Diarized transcript", expanded=True):
+                st.text(reclustered[1])
+            if st.button("Generate MoM from re-clustered transcript"):
+                with st.spinner('Generating MoM...'):
+                    show_mom(generate_mom(create_prompt(reclustered[1])))
+
+    with st.expander("Loaded models"):
+        st.table(get_model_registry().stats())
+        st.write(f"Process resident memory: {resident_memory() / 2**20:.0f} MB")
 
 if __name__ == "__main__":
     main()
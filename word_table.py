@@ -0,0 +1,320 @@
+import io
+import base64
+import sys
+import json
+import time
+import argparse
+import numpy as np
+from transcript_builder import SpeakerTurn, format_turn
+
+# Columnar form of the word-level results of a Deepgram response. The dict form keeps one
+# Python dict (with its own float and string objects) per word, several hundred bytes per
+# word; here every field is one NumPy array and the words are indexes into a table of
+# interned strings, so a multi-hour recording takes a few MB. Words are kept in time
+# order, which makes time lookups a binary search and speaker turns a vectorized diff.
+
+# Constants
+NO_SPEAKER = -1
+FORMAT_VERSION = 1
+# Confidences are float32 and given back rounded to this many decimals (0.99, not 0.9900000095)
+CONFIDENCE_DECIMALS = 6
+# Float columns; the times stay float64 so multi-hour recordings keep millisecond precision
+FLOAT_FIELDS = {"start": np.float64, "end": np.float64, "confidence": np.float32, "speaker_confidence": np.float32}
+
+def _alternative(response):
+    return response["results"]["channels"][0]["alternatives"][0]
+
+class WordTable:
+    def __init__(self, start, end, confidence, speaker_confidence, speaker, word_ids, punctuated_ids, strings):
+        self.start = start
+        self.end = end
+        self.confidence = confidence
+        self.speaker_confidence = speaker_confidence
+        self.speaker = speaker
+        self.word_ids = word_ids
+        self.punctuated_ids = punctuated_ids
+        # Object array, so a slice of ids maps to its strings in one indexing operation
+        self.strings = np.array(strings, dtype=object)
+        self._turn_bounds = None
+
+    # Function to build the table from a list of Deepgram word dicts
+    @classmethod
+    def from_words(cls, words):
+        interned = {}
+        intern = lambda text: interned.setdefault(text, len(interned))
+        count = len(words)
+        columns = {name: np.empty(count, dtype=dtype) for name, dtype in FLOAT_FIELDS.items()}
+        speaker = np.empty(count, dtype=np.int16)
+        word_ids = np.empty(count, dtype=np.int32)
+        punctuated_ids = np.empty(count, dtype=np.int32)
+        for i, word in enumerate(words):
+            columns["start"][i] = word["start"]
+            columns["end"][i] = word["end"]
+            columns["confidence"][i] = word.get("confidence", np.nan)
+            columns["speaker_confidence"][i] = word.get("speaker_confidence", np.nan)
+            speaker[i] = word.get("speaker", NO_SPEAKER)
+            word_ids[i] = intern(word["word"])
+            punctuated_ids[i] = intern(word.get("punctuated_word") or word["word"])
+        # Deepgram returns the words in time order; VAD remapping keeps it
+        order = np.argsort(columns["start"], kind='stable')
+        if not np.array_equal(order, np.arange(count)):
+            columns = {name: column[order] for name, column in columns.items()}
+            speaker, word_ids, punctuated_ids = speaker[order], word_ids[order], punctuated_ids[order]
+        strings = [None] * len(interned)
+        for text, index in interned.items():
+            strings[index] = text
+        return cls(columns["start"], columns["end"], columns["confidence"], columns["speaker_confidence"],
+                   speaker, word_ids, punctuated_ids, strings)
+
+    @classmethod
+    def from_response(cls, response):
+        return cls.from_words(_alternative(response).get("words", []))
+
+    def __len__(self):
+        return len(self.start)
+
+    # Function to rebuild the word dicts of the index range [lo, hi) (for code that needs
+    # the dict form). The columns are converted to Python values in bulk, not per word.
+    def to_words(self, lo=0, hi=None):
+        strings = self.strings
+        columns = zip(
+            strings[self.word_ids[lo:hi]].tolist(),
+            self.start[lo:hi].tolist(),
+            self.end[lo:hi].tolist(),
+            np.round(self.confidence[lo:hi].astype(np.float64), CONFIDENCE_DECIMALS).tolist(),
+            self.speaker[lo:hi].tolist(),
+            np.round(self.speaker_confidence[lo:hi].astype(np.float64), CONFIDENCE_DECIMALS).tolist(),
+            strings[self.punctuated_ids[lo:hi]].tolist(),
+        )
+        words = []
+        for text, start, end, confidence, speaker, speaker_confidence, punctuated in columns:
+            word = {"word": text, "start": start, "end": end}
+            # NaN and NO_SPEAKER mark fields the word did not have
+            if confidence == confidence:
+                word["confidence"] = confidence
+            if speaker != NO_SPEAKER:
+                word["speaker"] = speaker
+            if speaker_confidence == speaker_confidence:
+                word["speaker_confidence"] = speaker_confidence
+            word["punctuated_word"] = punctuated
+            words.append(word)
+        return words
+
+    # Function to return word i in the dict form of the response
+    def word(self, i):
+        return self.to_words(i, i + 1)[0]
+
+    # Function to join the punctuated words of the index range [lo, hi)
+    def text(self, lo=0, hi=None):
+        return ' '.join(self.strings[self.punctuated_ids[lo:hi]])
+
+    # Function to return the (lo, hi) word index ranges of the speaker turns. The columns
+    # are never modified, so the bounds are computed on the first call only.
+    def turn_bounds(self):
+        if self._turn_bounds is None:
+            if not len(self):
+                self._turn_bounds = np.empty((0, 2), dtype=np.int64)
+            else:
+                changes = np.flatnonzero(self.speaker[1:] != self.speaker[:-1]) + 1
+                starts = np.concatenate(([0], changes))
+                ends = np.concatenate((changes, [len(self)]))
+                self._turn_bounds = np.stack((starts, ends), axis=1)
+        return self._turn_bounds
+
+    # Function to return the speaker turns, the same ones iter_turns_from_words gives
+    def turns(self):
+        return [
+            SpeakerTurn(int(max(self.speaker[lo], 0)), float(self.start[lo]), float(self.end[hi - 1]), self.text(lo, hi))
+            for lo, hi in self.turn_bounds()
+        ]
+
+    # Function to create the transcript in the create_transcript layout
+    def transcript(self):
+        return '\n\n'.join(format_turn(turn) for turn in self.turns() if turn.text)
+
+    # Function to find the word spoken at (or last started before) `seconds`; -1 if none
+    def index_at(self, seconds):
+        return int(np.searchsorted(self.start, seconds, side='right')) - 1
+
+    # Function to return the (lo, hi) index range of the words starting in [begin, end)
+    def range_between(self, begin, end):
+        return int(np.searchsorted(self.start, begin, side='left')), int(np.searchsorted(self.start, end, side='left'))
+
+    # Function to return the speaker turn being spoken at `seconds`, to seek the audio
+    # player to its start; None before the first word
+    def turn_at(self, seconds):
+        i = self.index_at(seconds)
+        if i < 0:
+            return None
+        bounds = self.turn_bounds()
+        turn = int(np.searchsorted(bounds[:, 0], i, side='right')) - 1
+        lo, hi = bounds[turn]
+        return SpeakerTurn(int(max(self.speaker[lo], 0)), float(self.start[lo]), float(self.end[hi - 1]), self.text(lo, hi))
+
+    # Function to serialize the table: the arrays in an uncompressed .npz, the strings as
+    # one UTF-8 blob separated by NUL characters
+    def to_bytes(self):
+        blob = '\0'.join(self.strings).encode('utf-8')
+        buffer = io.BytesIO()
+        np.savez(
+            buffer,
+            version=np.array([FORMAT_VERSION]),
+            start=self.start, end=self.end, confidence=self.confidence, speaker_confidence=self.speaker_confidence,
+            speaker=self.speaker, word_ids=self.word_ids, punctuated_ids=self.punctuated_ids,
+            strings=np.frombuffer(blob, dtype=np.uint8), string_count=np.array([len(self.strings)]),
+        )
+        return buffer.getvalue()
+
+    @classmethod
+    def from_bytes(cls, data):
+        with np.load(io.BytesIO(data), allow_pickle=False) as arrays:
+            if int(arrays["version"][0]) != FORMAT_VERSION:
+                raise ValueError(f"Unsupported word table version {int(arrays['version'][0])}")
+            strings = arrays["strings"].tobytes().decode('utf-8').split('\0') if int(arrays["string_count"][0]) else []
+            return cls(arrays["start"], arrays["end"], arrays["confidence"], arrays["speaker_confidence"],
+                       arrays["speaker"], arrays["word_ids"], arrays["punctuated_ids"], strings)
+
+    # Function to count the bytes held by the table (arrays and strings)
+    def nbytes(self):
+        arrays = (self.start, self.end, self.confidence, self.speaker_confidence, self.speaker, self.word_ids, self.punctuated_ids)
+        return sum(array.nbytes for array in arrays) + self.strings.nbytes + sum(sys.getsizeof(text) for text in self.strings)
+
+# Fields an utterance word must share with the table word at the same index for the
+# utterance to be stored as an index range (the confidences are rounded like the table's)
+UTTERANCE_WORD_FIELDS = ("word", "start", "end", "speaker", "punctuated_word")
+
+# Function to find the (lo, hi) index range of the table holding exactly the words of an
+# utterance; None when they are not a contiguous run of the table's words
+def _utterance_range(table, words, table_words):
+    if not words:
+        return None
+    lo = int(np.searchsorted(table.start, words[0]["start"], side='left'))
+    hi = lo + len(words)
+    if hi > len(table_words):
+        return None
+    for word, table_word in zip(words, table_words[lo:hi]):
+        if word.keys() != table_word.keys() or any(word.get(field) != table_word.get(field) for field in UTTERANCE_WORD_FIELDS):
+            return None
+    return lo, hi
+
+# Function to return a copy of a response for storage, with the word dicts of the first
+# alternative replaced by the serialized word table (base64) and the word lists of the
+# utterances replaced by their index range in that table, so no word dicts are stored.
+# Only the containers on the path to the words are copied; the rest is shared with the
+# original response.
+def pack_words(response):
+    try:
+        alternative = _alternative(response)
+    except (KeyError, IndexError, TypeError):
+        return response
+    if not alternative.get("words"):
+        return response
+    table = WordTable.from_words(alternative["words"])
+    packed = {key: value for key, value in alternative.items() if key != "words"}
+    packed["words_table"] = base64.b64encode(table.to_bytes()).decode('ascii')
+    channels = response["results"]["channels"]
+    channel = {**channels[0], "alternatives": [packed] + channels[0]["alternatives"][1:]}
+    results = {**response["results"], "channels": [channel] + channels[1:]}
+
+    if results.get("utterances"):
+        table_words = table.to_words()
+        utterances = []
+        for utterance in results["utterances"]:
+            bounds = _utterance_range(table, utterance.get("words"), table_words)
+            if bounds is None:
+                utterances.append(utterance)
+            else:
+                utterances.append({**{key: value for key, value in utterance.items() if key != "words"}, "words_range": list(bounds)})
+        results["utterances"] = utterances
+    return {**response, "results": results}
+
+# Function to restore the word dicts of a response stored with pack_words (in place).
+# The utterances get slices of the same word dicts, as in the response Deepgram returns.
+def unpack_words(response):
+    try:
+        alternative = _alternative(response)
+    except (KeyError, IndexError, TypeError):
+        return response
+    data = alternative.pop("words_table", None)
+    if data is not None:
+        words = WordTable.from_bytes(base64.b64decode(data)).to_words()
+        alternative["words"] = words
+        for utterance in response["results"].get("utterances") or []:
+            bounds = utterance.pop("words_range", None)
+            if bounds is not None:
+                utterance["words"] = words[bounds[0]:bounds[1]]
+    return response
+
+# Function to measure the memory of nested dicts/lists the way they are held in Python;
+# objects shared between containers (interned strings, small ints) are counted once
+def deep_size(obj, seen=None):
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_size(key, seen) + deep_size(value, seen) for key, value in obj.items())
+    elif isinstance(obj, (list, tuple)):
+        size += sum(deep_size(item, seen) for item in obj)
+    return size
+
+# Function to compare the memory of the word dicts of a response with the word table
+def memory_report(response, table=None):
+    words = _alternative(response).get("words", [])
+    table = table if table is not None else WordTable.from_words(words)
+    dict_bytes = deep_size(words)
+    table_bytes = table.nbytes()
+    return {
+        "words": len(words),
+        "strings": len(table.strings),
+        "dict_bytes": dict_bytes,
+        "table_bytes": table_bytes,
+        "serialized_bytes": len(table.to_bytes()),
+        "ratio": dict_bytes / table_bytes if table_bytes else 0.0,
+    }
+
+# Function to make a synthetic response of the given length from transcript.txt
+def _synthetic_response(hours):
+    from local_backends import LOCAL_TRANSCRIPT_PATH, deepgram_response_from_transcript
+    with open(LOCAL_TRANSCRIPT_PATH, 'r', encoding='utf-8') as f:
+        text = f.read()
+    one = deepgram_response_from_transcript(text)
+    repeats = max(1, round(hours * 3600 / one["metadata"]["duration"]))
+    return deepgram_response_from_transcript('\n'.join([text] * repeats))
+
+def main():
+    parser = argparse.ArgumentParser(description="Report the memory of the word results as dicts and as a word table")
+    parser.add_argument("response", nargs="?", help="Deepgram response JSON (default: a synthetic one from transcript.txt)")
+    parser.add_argument("--hours", type=float, default=3.0, help="length of the synthetic recording")
+    args = parser.parse_args()
+
+    if args.response:
+        with open(args.response, 'r', encoding='utf-8') as f:
+            response = json.load(f)
+    else:
+        response = _synthetic_response(args.hours)
+
+    start_time = time.perf_counter()
+    table = WordTable.from_response(response)
+    build_time = time.perf_counter() - start_time
+    report = memory_report(response, table)
+    start_time = time.perf_counter()
+    WordTable.from_bytes(table.to_bytes())
+    round_trip_time = time.perf_counter() - start_time
+    start_time = time.perf_counter()
+    json.loads(json.dumps(_alternative(response)["words"]))
+    json_time = time.perf_counter() - start_time
+    start_time = time.perf_counter()
+    turns = table.turns()
+    turns_time = time.perf_counter() - start_time
+
+    print(f"{report['words']} words, {report['strings']} distinct strings, {len(turns)} turns")
+    print(f"Word dicts: {report['dict_bytes'] / 1e6:.1f} MB, word table: {report['table_bytes'] / 1e6:.2f} MB "
+          f"({report['ratio']:.0f}x smaller), serialized: {report['serialized_bytes'] / 1e6:.2f} MB")
+    print(f"Build {build_time * 1000:.0f} ms, turns {turns_time * 1000:.0f} ms, "
+          f"serialize + load {round_trip_time * 1000:.0f} ms (JSON round trip of the dicts: {json_time * 1000:.0f} ms)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())